@@ -1,60 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import cv2
-import numpy as np
 import os
 
-# ==========================================================
-# FUNGSI PENGOLAHAN CITRA (AUGMENTASI)
-# ==========================================================
+# rotate_image / zoom_image dan generator variasi ada di augmentasi.py (tanpa GUI)
+from augmentasi import FLIPS, ROTATIONS, ZOOMS, augmented_feature_rows, save_variants, variant_params
+from pipeline import FEATURE_BANK, LABELS, csv_header, feature_fingerprint
+import feature_store
+from variant_archive import write_archive
 
-def rotate_image(image, angle):
-    """Memutar gambar tanpa menyisakan ruang hitam (Auto-Crop)"""
-    h, w = image.shape[:2]
-    matrix = cv2.getRotationMatrix2D((w/2, h/2), angle, 1.0)
-    
-    # Menghitung sin dan cos dari sudut rotasi
-    abs_cos = abs(matrix[0, 0])
-    abs_sin = abs(matrix[0, 1])
-    
-    # Menghitung lebar dan tinggi baru agar tidak terpotong
-    new_w = int(h * abs_sin + w * abs_cos)
-    new_h = int(h * abs_cos + w * abs_sin)
-    
-    # Menyesuaikan matriks rotasi ke pusat yang baru
-    matrix[0, 2] += (new_w - w) / 2
-    matrix[1, 2] += (new_h - h) / 2
-    
-    rotated = cv2.warpAffine(image, matrix, (new_w, new_h), borderMode=cv2.BORDER_REPLICATE)
-    
-    # Kembalikan ke ukuran asli (cropping center) agar dimensi tetap konsisten
-    start_x = (new_w - w) // 2
-    start_y = (new_h - h) // 2
-    return rotated[start_y:start_y+h, start_x:start_x+w]
-
-def zoom_image(image, zoom_factor):
-    """Melakukan zoom in atau zoom out pada gambar"""
-    h, w = image.shape[:2]
-    
-    if zoom_factor == 1.0:
-        return image
-    
-    # Mengubah ukuran gambar
-    new_h, new_w = int(h * zoom_factor), int(w * zoom_factor)
-    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-    
-    if zoom_factor > 1.0:
-        # Zoom In: Potong bagian tengah agar ukuran kembali ke asli
-        start_x = (new_w - w) // 2
-        start_y = (new_h - h) // 2
-        return resized[start_y:start_y+h, start_x:start_x+w]
-    else:
-        # Zoom Out: Tambahkan padding agar ukuran kembali ke asli
-        pad_h = (h - new_h) // 2
-        pad_w = (w - new_w) // 2
-        # Menggunakan BORDER_REPLICATE agar pinggiran terlihat natural seperti X-ray
-        return cv2.copyMakeBorder(resized, pad_h, h-new_h-pad_h, pad_w, w-new_w-pad_w, 
-                                  cv2.BORDER_REPLICATE)
+# Format keluaran variasi: file JPEG satu per variasi, atau arsip shard .npz
+# (lossless, dengan tabel index) yang bisa langsung dibaca train_folder.py/evaluate.py
+OUTPUT_FORMATS = {
+    "File JPEG (folder variasi)": "jpeg",
+    "Arsip NPZ (folder variasi.arsip)": "arsip",
+    "Tidak disimpan": None,
+}
+ARCHIVE_FOLDER = "variasi.arsip"
 
 # ==========================================================
 # FUNGSI UTAMA PROSES BATCH
@@ -70,58 +32,61 @@ def start_batch_augmentation():
     if not file_paths:
         return
 
+    # Mode database: variasi langsung diekstraksi fiturnya di memori (satu kali
+    # decode per gambar); file variasi hanya dibuat jika format keluaran dipilih.
+    selected_label = label_combobox.get()
+    output_format = OUTPUT_FORMATS[format_combobox.get()]
+    if not selected_label and not output_format:
+        messagebox.showwarning("Peringatan", "Pilih label diagnosa atau format penyimpanan variasi!")
+        return
+
     # Siapkan folder output
-    output_folder = "variasi"
-    if not os.path.exists(output_folder):
+    output_folder = "variasi" if output_format == "jpeg" else ARCHIVE_FOLDER
+    if output_format and not os.path.exists(output_folder):
         os.makedirs(output_folder)
 
     total_files = len(file_paths)
     btn_select.config(state="disabled")
     
-    # Daftar parameter sesuai kesepakatan
-    flips = [False, True]
-    rotations = [-10, -5, 0, 5, 10]
-    zooms = [0.95, 1.0, 1.05]
+    # Daftar parameter sesuai kesepakatan (2 x 5 x 3 = 30 variasi)
+    params = variant_params(FLIPS, ROTATIONS, ZOOMS)
+    saved_rows = 0
     
     try:
+        if output_format == "arsip":
+            def show_progress(done, total):
+                lbl_status.config(text=f"Menulis arsip {done}/{total} Gambar Asli...")
+                root.update()
+            write_archive([(path, selected_label or None) for path in file_paths], output_folder, params,
+                          progress=show_progress)
+
         for i, path in enumerate(file_paths):
             # Update label loading
             lbl_status.config(text=f"Memproses {i+1}/{total_files} Gambar Asli...")
             root.update()
+
+            if selected_label:
+                rows = list(augmented_feature_rows(path, selected_label, feature_bank=FEATURE_BANK, params=params))
+                if rows:
+                    saved_rows += feature_store.append_rows(feature_store.DEFAULT_STORE, rows, csv_header(FEATURE_BANK),
+                                                            feature_fingerprint())
+            if output_format != "jpeg":
+                continue
             
-            # Baca gambar
+            # Baca gambar (berwarna, dengan atau tanpa label)
             original_img = cv2.imread(path)
             if original_img is None: continue
             
             base_name = os.path.splitext(os.path.basename(path))[0]
             
-            # Loop kombinasi (2 x 5 x 3 = 30 variasi)
-            for flip in flips:
-                for angle in rotations:
-                    for zoom in zooms:
-                        # 1. Terapkan Flip
-                        img_processed = cv2.flip(original_img, 1) if flip else original_img.copy()
-                        
-                        # 2. Terapkan Rotasi
-                        if angle != 0:
-                            img_processed = rotate_image(img_processed, angle)
-                        
-                        # 3. Terapkan Zoom
-                        if zoom != 1.0:
-                            img_processed = zoom_image(img_processed, zoom)
-                        
-                        # Buat Nama File
-                        flip_tag = "hz-flip" if flip else "no-flip"
-                        rot_tag = f"rot-{angle}"
-                        zoom_tag = f"zoom-{int(zoom*100)}"
-                        
-                        filename = f"{base_name}-{flip_tag}-{rot_tag}-{zoom_tag}.jpg"
-                        save_path = os.path.join(output_folder, filename)
-                        
-                        # Simpan hasil
-                        cv2.imwrite(save_path, img_processed)
+            # Flip + rotasi + zoom dalam satu warpAffine per variasi, dibuat dan
+            # disimpan paralel oleh beberapa thread
+            save_variants(original_img, base_name, output_folder, params)
         
-        messagebox.showinfo("Selesai", f"Berhasil membuat variasi gambar!\nCek folder: '{output_folder}'")
+        if selected_label:
+            messagebox.showinfo("Selesai", f"{saved_rows} data variasi ({selected_label}) disimpan ke database.")
+        else:
+            messagebox.showinfo("Selesai", f"Berhasil membuat variasi gambar!\nCek folder: '{output_folder}'")
     
     except Exception as e:
         messagebox.showerror("Error", f"Terjadi kesalahan: {str(e)}")
@@ -137,7 +102,7 @@ def start_batch_augmentation():
 if __name__ == "__main__":
     root = tk.Tk()
     root.title("Augmentasi Citra Batch")
-    root.geometry("400x200")
+    root.geometry("400x340")
     root.resizable(False, False)
 
     style = ttk.Style(root)
@@ -149,8 +114,17 @@ if __name__ == "__main__":
     ttk.Label(main_frame, text="Data Augmentation Tool", font=("Arial", 12, "bold")).pack(pady=5)
     ttk.Label(main_frame, text="Variasi: Flip x 5 Rotasi x 3 Zoom", font=("Arial", 9)).pack()
 
+    ttk.Label(main_frame, text="Label diagnosa (kosongkan jika hanya membuat file):", font=("Arial", 9)).pack(pady=(10, 0))
+    label_combobox = ttk.Combobox(main_frame, values=[""] + LABELS, state="readonly")
+    label_combobox.pack(fill='x')
+
+    ttk.Label(main_frame, text="Simpan variasi sebagai:", font=("Arial", 9)).pack(pady=(5, 0))
+    format_combobox = ttk.Combobox(main_frame, values=list(OUTPUT_FORMATS), state="readonly")
+    format_combobox.pack(fill='x')
+    format_combobox.current(0)
+
     btn_select = ttk.Button(main_frame, text="Pilih Gambar", command=start_batch_augmentation)
-    btn_select.pack(pady=20, ipady=5, fill='x')
+    btn_select.pack(pady=10, ipady=5, fill='x')
 
     lbl_status = ttk.Label(main_frame, text="Siap memproses", font=("Arial", 10, "italic"))
     lbl_status.pack()
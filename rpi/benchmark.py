@@ -0,0 +1,460 @@
+import os
+os.environ.setdefault("MPLBACKEND", "Agg") # Tanpa layar (SSH / Raspberry Pi), sebelum matplotlib terimpor
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+from flat_forest import export_forest
+from model_store import FEATURE_NAMES, RF_PARAMS
+import pipeline
+from pipeline import extract_features_complete, fit_image_gmm, pipeline_fingerprint, preprocess_array
+from segmentasi import FIT_MODES, segment_image
+from train_folder import IMAGE_EXTENSIONS, collect_labelled_images
+
+# ==========================================================
+# BENCHMARK PER TAHAP PIPELINE (TANPA GUI)
+# ==========================================================
+# Mengukur waktu setiap tahap pipeline diagnosa pada dataset bawaan tanpa
+# memakai cache fitur/model, lalu menulis hasilnya sebagai JSON yang bisa
+# dibandingkan antar commit atau antar mesin (PC x86 vs Raspberry Pi):
+#   python benchmark.py                          -> benchmark.json
+#   python benchmark.py --compare lama.json      -> rasio p50 terhadap hasil lama
+#
+# Tahap per gambar: imread, preprocess (CLAHE + blur), gmm_fit, label (predict
+# + urutan kelas lewat LUT), features (GLCM + statistik), rf_predict (satu
+# baris seperti tombol diagnosa, lewat forest datar flat_forest.py). Tahap
+# model: rf_train (termasuk ekspor forest datar) dan rf_predict_batch pada
+# fitur semua dataset berlabel. Peak RSS adalah puncak memori proses
+# sampai tahap itu selesai (kumulatif, bukan per tahap).
+
+DATASETS = ("data-uji", "data-uji-2", "cd")
+PERCENTILES = (50, 90, 95, 99)
+IMAGE_STAGES = ("imread", "preprocess", "gmm_fit", "label", "features", "rf_predict")
+MODEL_STAGES = ("rf_train", "rf_predict_batch")
+
+
+def default_datasets():
+    """Path dataset bawaan, relatif terhadap folder repo"""
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    return [os.path.normpath(os.path.join(root, name)) for name in DATASETS]
+
+
+def collect_images(root_dir):
+    """Daftar (path, label) semua gambar; label None untuk folder tanpa label (mis. cd/)"""
+    labels = dict(collect_labelled_images(root_dir))
+    images = []
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(dirpath, name)
+                images.append((path, labels.get(path)))
+    return images
+
+
+def peak_rss_mb():
+    """Puncak resident set size proses ini (MB), atau None jika tidak didukung"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux melaporkan KB, macOS melaporkan byte
+        return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize / (1 << 20)
+    return None
+
+
+def summarize(samples, n_items=None):
+    """Ringkasan latensi (ms) dan throughput dari daftar durasi (detik)"""
+    if not samples:
+        return {"n": 0}
+    ms = np.asarray(samples) * 1000
+    total = float(np.sum(samples))
+    n_items = len(samples) if n_items is None else n_items
+    summary = {"n": len(samples), "mean_ms": float(ms.mean()), "min_ms": float(ms.min()), "max_ms": float(ms.max())}
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = float(np.percentile(ms, p))
+    summary["total_s"] = total
+    summary["throughput_per_s"] = n_items / total if total > 0 else None
+    summary["peak_rss_mb"] = peak_rss_mb()
+    return summary
+
+
+# ==========================================================
+# TAHAP-TAHAP PIPELINE
+# ==========================================================
+def time_image(path, n_clusters, feature_bank, times, iterations):
+    """Menjalankan semua tahap per gambar sekali; fitur citra, atau None jika gagal dibaca"""
+    clock = time.perf_counter
+
+    t0 = clock()
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    t1 = clock()
+    if img is None:
+        return None
+    img = preprocess_array(img)
+    t2 = clock()
+    gmm = fit_image_gmm(img, n_clusters)
+    t3 = clock()
+    segmented_image, class_counts = segment_image(img, gmm)
+    t4 = clock()
+    features = extract_features_complete(img, segmented_image, class_counts, feature_bank)
+    t5 = clock()
+
+    for stage, dt in zip(IMAGE_STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+        times[stage].append(dt)
+    iterations.append(gmm.n_iter_)
+    return features
+
+
+def _time_predict_one(forest, features):
+    # Sama seperti tombol diagnosa: satu baris, label + probabilitas dari forest datar
+    start = time.perf_counter()
+    forest.predict_with_proba([features])
+    return time.perf_counter() - start
+
+
+def train_reference_model(X, y):
+    """Random Forest dengan hyperparameter aplikasi (tanpa cache model)"""
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+
+    model = RandomForestClassifier(**RF_PARAMS)
+    model.fit(pd.DataFrame(X, columns=FEATURE_NAMES), y)
+    return model
+
+
+def time_model(X, y, repeat):
+    """(forest datar, waktu rf_train dan rf_predict_batch) pada seluruh fitur berlabel"""
+    times = {stage: [] for stage in MODEL_STAGES}
+    forest = None
+    for _ in range(repeat):
+        # rf_train mencakup ekspor ke forest datar, seperti save_model di aplikasi
+        start = time.perf_counter()
+        forest = export_forest(train_reference_model(X, y))
+        times["rf_train"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        forest.predict_with_proba(X)
+        times["rf_predict_batch"].append(time.perf_counter() - start)
+    return forest, times
+
+
+# ==========================================================
+# BENCHMARK LENGKAP
+# ==========================================================
+def environment_info():
+    """Informasi mesin & versi agar hasil antar commit/mesin bisa dibandingkan"""
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "sklearn": sklearn.__version__,
+        "cv2_threads": cv2.getNumThreads(),
+    }
+
+
+def run_benchmark(dataset_dirs, n_clusters=3, feature_bank=False, repeat=1, rf_repeat=3, limit=None, progress=None):
+    """Menjalankan semua tahap pada setiap dataset; hasil berupa dict siap ditulis ke JSON"""
+    datasets = {}
+    labelled = {}
+    for root_dir in dataset_dirs:
+        images = collect_images(root_dir)[:limit]
+        if not images:
+            print(f"Lewati {root_dir}: tidak ada gambar.", file=sys.stderr)
+            continue
+        labelled[root_dir] = [(path, label) for path, label in images if label]
+        datasets[root_dir] = images
+
+    if not datasets:
+        return None
+
+    # Tahap 1: semua tahap per gambar (fitur berlabel dikumpulkan untuk melatih RF)
+    results = {"environment": environment_info(),
+               "config": {"n_clusters": n_clusters, "feature_bank": feature_bank, "repeat": repeat,
+                          "rf_repeat": rf_repeat, "limit": limit, "gmm_fit_mode": pipeline.GMM_FIT_MODE,
+                          "gmm_init": "prior" if pipeline.gmm_prior() is not None else "kmeans",
+                          "pipeline_fingerprint": pipeline_fingerprint(n_clusters, feature_bank)},
+               "datasets": {}}
+    X, y = [], []
+    per_dataset_times = {}
+    per_dataset_features = {}
+    for root_dir, images in datasets.items():
+        times = {stage: [] for stage in IMAGE_STAGES}
+        iterations = []
+        all_features = []
+        start = time.perf_counter()
+        n_images = 0
+        for r in range(repeat):
+            for i, (path, label) in enumerate(images):
+                features = time_image(path, n_clusters, feature_bank, times, iterations)
+                if features is None:
+                    continue
+                n_images += 1
+                if r == 0:
+                    all_features.append(features[:len(FEATURE_NAMES)])
+                    if label:
+                        X.append(features[:len(FEATURE_NAMES)])
+                        y.append(label)
+                if progress:
+                    progress(os.path.basename(root_dir), r * len(images) + i + 1, repeat * len(images))
+        per_dataset_times[root_dir] = (times, n_images, time.perf_counter() - start, iterations)
+        per_dataset_features[root_dir] = all_features
+
+    # Tahap 2: model (dilatih dari semua dataset berlabel), lalu prediksi satu baris per gambar
+    if len(set(y)) >= 2:
+        forest, model_times = time_model(np.asarray(X, dtype=np.float64), np.asarray(y), rf_repeat)
+        results["model"] = {"n_samples": len(y), "labels": sorted(set(y)),
+                            "stages": {stage: summarize(model_times[stage], len(y) if stage == "rf_predict_batch" else 1)
+                                       for stage in MODEL_STAGES}}
+        for root_dir, all_features in per_dataset_features.items():
+            times = per_dataset_times[root_dir][0]
+            for features in all_features:
+                times["rf_predict"].append(_time_predict_one(forest, features))
+    else:
+        print("Kurang dari 2 label: tahap Random Forest dilewati.", file=sys.stderr)
+
+    for root_dir, (times, n_images, wall, iterations) in per_dataset_times.items():
+        results["datasets"][os.path.basename(root_dir)] = {
+            "path": root_dir,
+            "n_images": len(datasets[root_dir]),
+            "n_labelled": len(labelled[root_dir]),
+            "wall_s": wall,
+            "images_per_s": n_images / wall if wall > 0 else None,
+            "gmm_n_iter_mean": float(np.mean(iterations)) if iterations else None,
+            "stages": {stage: summarize(times[stage]) for stage in IMAGE_STAGES},
+        }
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+# ==========================================================
+# LAPORAN & PERBANDINGAN
+# ==========================================================
+def _rows(results):
+    for name, data in results.get("datasets", {}).items():
+        for stage, s in data["stages"].items():
+            yield name, stage, s
+    for stage, s in results.get("model", {}).get("stages", {}).items():
+        yield "model", stage, s
+
+
+def print_report(results):
+    print(f"\n{'dataset':<12} {'tahap':<17} {'n':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'per detik':>10}")
+    for name, stage, s in _rows(results):
+        if not s["n"]:
+            continue
+        throughput = s["throughput_per_s"]
+        print(f"{name:<12} {stage:<17} {s['n']:>5} {s['p50_ms']:>9.2f} {s['p90_ms']:>9.2f} {s['p99_ms']:>9.2f} "
+              f"{throughput if throughput is not None else float('nan'):>10.1f}")
+    for name, data in results.get("datasets", {}).items():
+        if data.get("gmm_n_iter_mean") is not None:
+            print(f"Iterasi EM rata-rata {name}: {data['gmm_n_iter_mean']:.2f}")
+    peak = results.get("peak_rss_mb")
+    print(f"\nPeak RSS: {peak:.1f} MB" if peak is not None else "\nPeak RSS: tidak didukung")
+
+
+def compare_results(old, new):
+    """Rasio p50 baru/lama per (dataset, tahap); > 1 berarti lebih lambat"""
+    old_p50 = {(name, stage): s.get("p50_ms") for name, stage, s in _rows(old)}
+    ratios = {}
+    for name, stage, s in _rows(new):
+        before = old_p50.get((name, stage))
+        if before and s.get("p50_ms") is not None:
+            ratios[f"{name}/{stage}"] = s["p50_ms"] / before
+    # Iterasi EM (mis. warm start dari prior vs K-Means)
+    for name, data in new.get("datasets", {}).items():
+        before = old.get("datasets", {}).get(name, {}).get("gmm_n_iter_mean")
+        if before and data.get("gmm_n_iter_mean") is not None:
+            ratios[f"{name}/gmm_n_iter"] = data["gmm_n_iter_mean"] / before
+    return ratios
+
+
+# ==========================================================
+# CEK ANGGARAN MEMORI (MODE HEMAT MEMORI)
+# ==========================================================
+# Peak RSS hanya bisa naik, jadi setiap pengukuran berjalan di proses anak
+# yang baru: pustaka dan cache dimuat dulu (pemanasan dengan citra kecil),
+# lalu kenaikan peak RSS selama satu film besar melewati preprocess, GMM,
+# pelabelan dan fitur dibandingkan dengan pipeline.MEMORY_BUDGET_MB.
+#
+# Nilai fitur mode hemat memori tidak bit per bit sama dengan mode biasa:
+# mean/variance dari histogram dijumlahkan dengan urutan lain daripada
+# np.mean/np.var pada seluruh piksel, jadi stat_mean dan stat_variance bisa
+# bergeser di digit terakhir (selisih relatif di bawah LOW_MEMORY_TOLERANCE).
+# Fitur rasio dan GLCM identik. Karena itu LOW_MEMORY ikut membentuk kunci
+# cache fitur, tetapi tidak sidik database latih (pipeline.feature_fingerprint).
+MEMORY_FILM_SIZE = (3000, 2500) # lebar x tinggi film sinar-X
+LOW_MEMORY_TOLERANCE = 1e-9
+
+
+def _film_image(path, size):
+    """Film sintetis berukuran size dari gambar dataset pertama (histogram realistis)"""
+    images = [p for d in default_datasets() if os.path.isdir(d) for p, _ in collect_images(d)]
+    src = cv2.imread(images[0], cv2.IMREAD_GRAYSCALE) if images else None
+    if src is None:
+        src = cv2.GaussianBlur(np.random.default_rng(0).integers(0, 256, (256, 256), dtype=np.uint8), (0, 0), 4)
+    cv2.imwrite(path, cv2.resize(src, size, interpolation=cv2.INTER_LINEAR))
+
+
+def memory_probe(path, low_memory):
+    """Kenaikan peak RSS (MB) per tahap untuk satu film; dijalankan di proses anak"""
+    pipeline.LOW_MEMORY = low_memory
+    pipeline.IMAGE_CACHE = False # Decode + CLAHE ikut diukur, tanpa menulis cache_citra
+    small = cv2.resize(cv2.imread(path, cv2.IMREAD_GRAYSCALE), (256, 256))
+    img = pipeline.preprocess_array(small)
+    extract_features_complete(img, *segment_image(img, fit_image_gmm(img)))
+    del small, img
+
+    baseline = peak_rss_mb()
+    stages = {}
+    img = pipeline.preprocess_image(path)
+    stages["preprocess"] = peak_rss_mb() - baseline
+    gmm = fit_image_gmm(img)
+    stages["gmm_fit"] = peak_rss_mb() - baseline
+    segmented_image, class_counts = segment_image(img, gmm)
+    stages["label"] = peak_rss_mb() - baseline
+    features = extract_features_complete(img, segmented_image, class_counts)
+    stages["features"] = peak_rss_mb() - baseline
+    return {"baseline_mb": baseline, "stages_mb": stages, "image_mb": img.nbytes / 2**20,
+            "label_dtype": str(segmented_image.dtype), "features": [float(v) for v in features]}
+
+
+def memory_results(size=MEMORY_FILM_SIZE):
+    """Hasil memory_probe {"full": ..., "low": ...} untuk satu film sintetis; RuntimeError jika probe gagal"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "film.png")
+        _film_image(path, size)
+        results = {}
+        for mode in ("full", "low"):
+            # Proses anak baru per mode: peak RSS tidak bisa di-reset di dalam satu proses
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--memory-probe", path, mode],
+                                 capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            if out.returncode != 0:
+                raise RuntimeError(out.stderr)
+            results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+    return results
+
+
+def max_feature_diff(results):
+    """Selisih relatif maksimum fitur mode hemat memori terhadap mode biasa"""
+    return max(abs(a - b) / max(abs(a), 1e-12) for a, b in zip(results["full"]["features"], results["low"]["features"]))
+
+
+def memory_check(size=MEMORY_FILM_SIZE, budget_mb=None):
+    """Membandingkan mode biasa dan hemat memori; True jika mode hemat memori di bawah anggaran"""
+    budget_mb = budget_mb or pipeline.MEMORY_BUDGET_MB
+    try:
+        results = memory_results(size)
+    except RuntimeError as e:
+        print(e)
+        return False
+
+    print(f"Film {size[0]}x{size[1]} ({results['low']['image_mb']:.1f} MB uint8), kenaikan peak RSS (MB):")
+    print(f"  {'tahap':<12}{'biasa':>8}{'hemat':>8}")
+    for stage in results["low"]["stages_mb"]:
+        print(f"  {stage:<12}{results['full']['stages_mb'][stage]:8.1f}{results['low']['stages_mb'][stage]:8.1f}")
+    peak = results["low"]["stages_mb"]["features"]
+    diff = max_feature_diff(results)
+    ok = peak <= budget_mb and results["low"]["label_dtype"] == "uint8" and diff < LOW_MEMORY_TOLERANCE
+    print(f"Selisih fitur relatif maksimum: {diff:.1e}, label {results['low']['label_dtype']}")
+    print(f"{'OK' if ok else 'GAGAL'}: mode hemat memori {peak:.1f} MB (anggaran {budget_mb} MB)")
+    return ok
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--memory-probe":
+        print(json.dumps(memory_probe(sys.argv[2], sys.argv[3] == "low")))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Benchmark per tahap pipeline diagnosa (headless)")
+    parser.add_argument("datasets", nargs="*", help="Folder dataset (default: data-uji, data-uji-2, cd)")
+    parser.add_argument("--output", default="benchmark.json", help="File hasil JSON")
+    parser.add_argument("--compare", help="Hasil JSON lama untuk dibandingkan")
+    parser.add_argument("--repeat", type=int, default=1, help="Jumlah pengulangan tahap per gambar")
+    parser.add_argument("--rf-repeat", type=int, default=3, help="Jumlah pengulangan training Random Forest")
+    parser.add_argument("--limit", type=int, help="Maksimum gambar per dataset (uji cepat)")
+    parser.add_argument("--feature-bank", action="store_true", help="Ikut mengukur bank fitur GLCM")
+    parser.add_argument("--gmm-mode", choices=FIT_MODES, default=pipeline.GMM_FIT_MODE,
+                        help="Data pelatihan GMM (seluruh piksel / sampel / piramida)")
+    parser.add_argument("--gmm-init", choices=("kmeans", "prior"), default=pipeline.GMM_INIT,
+                        help=f"Inisialisasi EM (prior = warm start dari {pipeline.GMM_PRIOR_FILE})")
+    parser.add_argument("--threads", type=int, help="Jumlah thread OpenCV (default: bawaan OpenCV)")
+    parser.add_argument("--memory-check", action="store_true",
+                        help="Hanya cek peak RSS mode hemat memori (LOW_MEMORY) terhadap anggaran")
+    parser.add_argument("--film", default="x".join(map(str, MEMORY_FILM_SIZE)), help="Ukuran film cek memori, LxT")
+    parser.add_argument("--budget-mb", type=float, help=f"Anggaran cek memori (default: {pipeline.MEMORY_BUDGET_MB})")
+    args = parser.parse_args()
+
+    if args.memory_check:
+        width, height = map(int, args.film.lower().split("x"))
+        sys.exit(0 if memory_check((width, height), args.budget_mb) else 1)
+
+    pipeline.GMM_FIT_MODE = args.gmm_mode
+    pipeline.GMM_INIT = args.gmm_init
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+
+    def show_progress(name, done, total):
+        print(f"\r{name}: {done}/{total}...", end="", flush=True)
+
+    results = run_benchmark(args.datasets or default_datasets(), feature_bank=args.feature_bank,
+                            repeat=args.repeat, rf_repeat=args.rf_repeat, limit=args.limit,
+                            progress=show_progress)
+    if results is None:
+        print("Tidak ada dataset yang bisa diukur.")
+        sys.exit(1)
+
+    print_report(results)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Hasil ditulis ke {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        print(f"\nRasio p50 terhadap {args.compare} (commit {old.get('environment', {}).get('commit')}):")
+        for key, ratio in sorted(compare_results(old, results).items()):
+            print(f"  {key:<30} {ratio:6.2f}x{'  (lebih lambat)' if ratio > 1.1 else ''}")
@@ -1,22 +1,72 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import cv2
-import numpy as np
-import pandas as pd
-from sklearn.mixture import GaussianMixture
-from sklearn.ensemble import RandomForestClassifier
-from skimage.feature import graycomatrix, graycoprops
-import matplotlib
-matplotlib.use('TkAgg')
-
-import matplotlib.pyplot as plt
-from matplotlib.widgets import Button
 import os
 
+from lazy_imports import BackgroundLoader
+import profiling
+from worker import WorkerClient
+
+# ==========================================================
+# PUSTAKA BERAT (DIMUAT DI LATAR BELAKANG)
+# ==========================================================
+# Mengimpor OpenCV, sklearn, pandas dan matplotlib memakan beberapa detik di
+# Raspberry Pi. Agar jendela langsung muncul saat dibuka dari launcher, semua
+# impor berat dikumpulkan di fungsi ini dan dijalankan di thread latar belakang
+# (lazy_imports.py) selama pengguna memilih citra. sklearn dan pandas bahkan tidak
+# diimpor di sini: prediksi memakai forest datar (flat_forest.py), dan keduanya
+# baru diimpor di train_ai_model() jika model harus dilatih ulang.
+def load_libraries():
+    global cv2, np, plt, Button, segment_image
+    global CLAHE_CLIP_LIMIT, CLAHE_TILE_GRID, BLUR_KERNEL, GLCM_DISTANCE, GLCM_ANGLE, GLCM_LEVELS
+    global LOW_MEMORY, DIAGNOSE_IMAGE_CACHE, chunk_pixels, image_mean_var, decode_image, preprocess_fingerprint
+    global image_key, get_image, put_image
+    global file_cache_key, fit_image_gmm, glcm_features, get_features, put_features
+    global FEATURE_NAMES, RF_PARAMS, check_pipeline, database_fingerprint, load_forest, save_model, export_forest, feature_store
+    global collect_inputs, diagnose_batch
+    import cv2
+    import numpy as np
+    import matplotlib
+    matplotlib.use('TkAgg')
+    import matplotlib.pyplot as plt
+    from matplotlib.widgets import Button
+
+    from segmentasi import segment_image
+    from pipeline import (CLAHE_CLIP_LIMIT, CLAHE_TILE_GRID, BLUR_KERNEL,
+                          GLCM_DISTANCE, GLCM_ANGLE, GLCM_LEVELS, LOW_MEMORY, chunk_pixels, image_mean_var,
+                          DIAGNOSE_IMAGE_CACHE, decode_image, preprocess_fingerprint, file_cache_key, fit_image_gmm)
+    from image_cache import image_key, get_image, put_image
+    from tekstur import glcm_features
+    from feature_cache import get_features, put_features
+    from model_store import FEATURE_NAMES, RF_PARAMS, check_pipeline, database_fingerprint, load_forest, save_model
+    from flat_forest import export_forest
+    import feature_store
+    from diagnose_folder import collect_inputs, diagnose_batch
+
+libraries = BackgroundLoader(load_libraries)
+
+# Koneksi ke worker persisten milik launcher (worker.py). Worker menyimpan pustaka
+# dan model terlatih di memori; jika jendela ini dibuka langsung tanpa launcher,
+# diagnosa dihitung di proses ini seperti biasa.
+worker = WorkerClient()
+
 # ==========================================================
 # FUNGSI PRE-PROCESSING: CLAHE
 # ==========================================================
 def preprocess_image(image_path):
+    # Cek cache citra dulu (jika DIAGNOSE_IMAGE_CACHE diaktifkan di pipeline.py; bawaannya
+    # mati agar diagnosa tidak menulis ke kartu SD): kuncinya adalah hash isi file +
+    # parameter CLAHE/blur. Jika gambar ini pernah diproses, hasilnya langsung dibuka
+    # dari file .npy (memory map, read-only) tanpa decode JPEG dan tanpa CLAHE.
+    cache_key = None
+    if DIAGNOSE_IMAGE_CACHE:
+        try:
+            with open(image_path, "rb") as f:
+                cache_key = image_key(f.read(), preprocess_fingerprint())
+        except OSError:
+            return None
+        cached = get_image(cache_key)
+        if cached is not None: return cached
+
     # Membaca file gambar dari jalur (path) yang diberikan dan langsung mengubahnya 
     # ke dalam format Grayscale (hitam putih) agar lebih mudah diproses secara matematis.
     img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
@@ -28,16 +78,22 @@ def preprocess_image(image_path):
     # Membuat objek CLAHE (Contrast Limited Adaptive Histogram Equalization). 
     # clipLimit=2.0 membatasi kontras agar tidak berlebihan (mencegah noise meningkat), 
     # dan tileGridSize=(8,8) membagi gambar menjadi kotak-kotak kecil untuk pemerataan kontras lokal.
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+    # Nilainya diambil dari pipeline.py agar sama dengan proses training dan kunci cache fitur.
+    clahe = cv2.createCLAHE(clipLimit=CLAHE_CLIP_LIMIT, tileGridSize=CLAHE_TILE_GRID)
 
     # Menerapkan algoritma CLAHE pada gambar. Tahap ini untuk memperjelas 
     # detail serat tulang yang mungkin tidak terlihat pada gambar asli yang terlalu gelap/terang.
-    improved_img = clahe.apply(img)
+    # Pada mode hemat memori (LOW_MEMORY di pipeline.py) hasilnya langsung menimpa citra
+    # yang baru dibaca, sehingga tidak ada salinan tambahan seukuran citra.
+    improved_img = clahe.apply(img, img if LOW_MEMORY else None)
 
     # Menerapkan Gaussian Blur dengan ukuran kernel 3x3. Fungsi ini bertujuan untuk 
     # sedikit menghaluskan gambar guna mengurangi gangguan (noise) berupa bintik-bintik kecil 
     # tanpa menghilangkan detail struktur utama tulang.
-    improved_img = cv2.GaussianBlur(improved_img, (3, 3), 0)
+    improved_img = cv2.GaussianBlur(improved_img, BLUR_KERNEL, 0, improved_img if LOW_MEMORY else None)
+
+    # Simpan hasilnya ke cache citra agar diagnosa/evaluasi berikutnya tidak mengulang langkah di atas.
+    if cache_key: put_image(cache_key, improved_img)
 
     # Mengembalikan gambar yang telah "dibersihkan" dan diperbaiki kontrasnya 
     # untuk diproses lebih lanjut oleh tahap segmentasi GMM.
@@ -46,16 +102,21 @@ def preprocess_image(image_path):
 # ==========================================================
 # FUNGSI EKSTRAKSI FITUR
 # ==========================================================
-def extract_features_complete(img, segmented_image):
+def extract_features_complete(img, segmented_image, class_counts=None):
     # --- Bagian 1: Fitur Rasio dari GMM (Informasi Kepadatan/Makro) ---
+
+    # Jumlah piksel per label biasanya sudah dihitung dari histogram saat segmentasi.
+    # Jika tidak diberikan, dihitung sekali dari citra label (satu lintasan bincount).
+    if class_counts is None:
+        class_counts = np.bincount(segmented_image.ravel(), minlength=3)
     
     # Menghitung jumlah piksel yang dikategorikan sebagai "Tulang Padat" 
     # (Label 2 pada hasil segmentasi GMM).
-    pixels_padat = np.count_nonzero(segmented_image == 2)
+    pixels_padat = class_counts[2]
     
     # Menghitung jumlah piksel yang dikategorikan sebagai "Tulang Berpori" 
     # (Label 1 pada hasil segmentasi GMM).
-    pixels_berpori = np.count_nonzero(segmented_image == 1)
+    pixels_berpori = class_counts[1]
     
     # Menjumlahkan kedua jenis piksel di atas untuk mendapatkan total luas area tulang.
     pixels_total = pixels_padat + pixels_berpori
@@ -70,27 +131,28 @@ def extract_features_complete(img, segmented_image):
 
     # --- Bagian 2: Statistik & GLCM (Informasi Tekstur/Mikro) ---
     
-    # Menghitung rata-rata tingkat kecerahan seluruh piksel (Mean). 
-    # Memberikan gambaran umum densitas pada citra tersebut.
-    mean_val = np.mean(img)
-    
-    # Menghitung variansi (sebaran kontras). Semakin tinggi nilainya, 
-    # berarti perbedaan antara area gelap dan terang semakin bervariasi.
-    var_val = np.var(img)
+    # Menghitung rata-rata tingkat kecerahan seluruh piksel (Mean) yang memberikan gambaran
+    # umum densitas, dan variansi (sebaran kontras): semakin tinggi nilainya, berarti
+    # perbedaan antara area gelap dan terang semakin bervariasi. Pada mode hemat memori
+    # keduanya dihitung dari histogram 256 bin, bukan dari salinan float64 seukuran citra.
+    mean_val, var_val = image_mean_var(img)
     
-    # Membangun matriks korelasi piksel (GLCM) dengan jarak 1 piksel dan sudut 0 derajat.
-    # 'normed=True' digunakan agar nilai matriks menjadi probabilitas (rentang 0-1).
-    glcm = graycomatrix(img, distances=[1], angles=[0], levels=256, symmetric=True, normed=True)
+    # Membangun matriks korelasi piksel (GLCM) dengan jarak 1 piksel dan sudut 0 derajat,
+    # dinormalisasi menjadi probabilitas (rentang 0-1). Kernel di tekstur.py menghitung
+    # matriks ini dalam satu lintasan dan keempat propertinya sekaligus (mode hemat
+    # memori: per pita baris, sehingga memori kerjanya tetap kecil).
+    glcm = glcm_features(img, distance=GLCM_DISTANCE, angle=GLCM_ANGLE, levels=GLCM_LEVELS,
+                         chunk_pixels=chunk_pixels())
     
     # Mengembalikan daftar (list) berisi 8 "identitas" angka dari gambar tersebut.
     # yang nantinya akan menjadi bahan bagi Random Forest.
     return [
         rasio_pvb,                              # 1. Rasio Kepadatan vs Pori
         rasio_pvt,                              # 2. Rasio Kepadatan vs Total
-        graycoprops(glcm, 'contrast')[0, 0],    # 3. Kekasaran tekstur
-        graycoprops(glcm, 'homogeneity')[0, 0], # 4. Keseragaman pola
-        graycoprops(glcm, 'energy')[0, 0],      # 5. Keteraturan tekstur
-        graycoprops(glcm, 'correlation')[0, 0], # 6. Hubungan serat tulang
+        glcm['contrast'],                       # 3. Kekasaran tekstur
+        glcm['homogeneity'],                    # 4. Keseragaman pola
+        glcm['energy'],                         # 5. Keteraturan tekstur
+        glcm['correlation'],                    # 6. Hubungan serat tulang
         mean_val,                               # 7. Statistik Rata-rata
         var_val                                 # 8. Statistik Kontras
     ]
@@ -98,111 +160,215 @@ def extract_features_complete(img, segmented_image):
 # ==========================================================
 # BAGIAN 1: TRAINING MODEL
 # ==========================================================
+@profiling.profiled("model")
 def train_ai_model():
-    filename = "database_fitur.csv"
-    if not os.path.exists(filename):
-        return None, "Database (CSV) tidak ditemukan. Harap Training data dulu."
+    # Database fitur biner (feature_store.py); database_fitur.csv lama diimpor otomatis.
+    filename = feature_store.DEFAULT_STORE
+    if feature_store.row_count(filename) == 0:
+        return None, "Database masih kosong. Harap Training data dulu."
+
+    # Setiap baris database mencatat sidik pipeline yang menghitung fiturnya. Fitur
+    # dari pipeline lain (parameter CLAHE/GMM/GLCM berbeda) tidak sebanding dengan
+    # fitur citra yang akan didiagnosa, jadi model menolak dilatih dari campuran itu.
+    error, warning = check_pipeline(filename)
+    if error:
+        return None, error
+    if warning:
+        print(warning)
+
+    # Jika isi database (dan hyperparameter) belum berubah sejak pelatihan terakhir,
+    # model yang tersimpan langsung dipakai tanpa melatih ulang. Yang dimuat adalah
+    # salinan datarnya ('database_fitur.forest.npz', lihat flat_forest.py): 100 pohon
+    # dalam beberapa array NumPy, sehingga diagnosa tidak perlu mengimpor sklearn.
+    cached = load_forest(filename)
+    if cached is not None:
+        return cached
 
     try:
-        # Membaca file CSV menggunakan library Pandas dan mengubahnya menjadi 
-        # tabel (DataFrame) agar mudah diolah oleh algoritma Machine Learning.
-        df = pd.read_csv(filename)
-        if len(df) < 5:
+        # sklearn dan pandas hanya diimpor di sini, saat model memang harus dilatih.
+        import pandas as pd
+        from sklearn.ensemble import RandomForestClassifier
+
+        # Sidik isi database diambil sebelum dibaca, untuk menandai data mana yang dipakai melatih model.
+        fingerprint = database_fingerprint(filename)
+
+        # Membaca matriks fitur float32 (memmap, tanpa parsing teks) lalu mengubahnya
+        # menjadi tabel (DataFrame) agar nama kolom ikut tersimpan di model.
+        X, y = feature_store.training_data(filename, FEATURE_NAMES)
+        if len(y) < 5:
             return None, "Data di database minimal 5 sampel untuk mulai belajar."
 
         # Memisahkan Fitur (X) dan Label Diagnosa (y)
-        X = df[['rasio_p_v_b', 'rasio_p_v_t', 'glcm_contrast', 'glcm_homogeneity', 
-                'glcm_energy', 'glcm_correlation', 'stat_mean', 'stat_variance']]
-        y = df['diagnosa']
+        X = pd.DataFrame(X, columns=FEATURE_NAMES)
 
         # Membuat objek algoritma Random Forest. 'n_estimators=100' berarti akan 
         # membuat 100 "pohon keputusan" untuk mendapatkan hasil voting yang paling akurat.
         # 'random_state=42' memastikan hasil pembelajaran selalu konsisten setiap dijalankan.
-        model = RandomForestClassifier(n_estimators=100, random_state=42)
+        model = RandomForestClassifier(**RF_PARAMS)
 
         # Proses 'FIT' (BELAJAR): Di sini mencari pola 
         # matematis yang memisahkan antara tulang Normal, Osteopenia, dan Osteoporosis.
         model.fit(X, y)
-        
-        return model, len(df)
+
+        # Simpan model (pickle sklearn + forest datar) agar diagnosa berikutnya tidak perlu melatih ulang.
+        save_model(filename, fingerprint, model, len(y))
+
+        # Model yang baru dilatih juga langsung dipakai dalam bentuk datarnya,
+        # supaya hasil diagnosa pertama dan berikutnya dihitung dengan cara yang sama.
+        return export_forest(model), len(y)
     except Exception as e:
         return None, f"Error membaca database: {e}"
 
 # ==========================================================
 # BAGIAN 2: PROSES DIAGNOSA CITRA BARU
 # ==========================================================
-def start_diagnosis():
+def diagnose_local(file_path):
+    """Diagnosa di proses ini (tanpa worker); hasilnya berbentuk sama dengan job "diagnose" worker"""
     # Memanggil fungsi train_ai_model() di atas untuk melatih model dari data 
-    # yang ada di CSV sebelum mulai melakukan diagnosa pada citra baru.
+    # yang ada di database sebelum mulai melakukan diagnosa pada citra baru.
     model, n_data = train_ai_model()
     if model is None:
-        messagebox.showwarning("Peringatan", n_data)
-        return
-
-    # Membuka jendela dialog agar pengguna bisa memilih file gambar X-ray 
-    # yang ingin didiagnosa.
-    file_path = filedialog.askopenfilename(title="Pilih Citra X-ray")
-    # Jika pengguna menutup jendela dialog tanpa memilih gambar, fungsi akan berhenti.
-    if not file_path: return
+        return {"warning": n_data}
 
-    try:
-        # --- LANGKAH 1: PRE-PROCESSING ---
+    # --- LANGKAH 1: PRE-PROCESSING ---
+    with profiling.stage("preprocess"):
         # Simpan gambar original asli (sebelum CLAHE) untuk histogram nanti
-        img_original = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+        # (lewat cache citra jika diaktifkan, sehingga JPEG yang sama tidak di-decode berulang kali)
+        img_original = decode_image(file_path, DIAGNOSE_IMAGE_CACHE)
 
         # Membersihkan gambar pilihan pengguna menggunakan CLAHE & Gaussian Blur.
         img = preprocess_image(file_path)
 
-        # --- LANGKAH 2: SEGMENTASI GMM ---
-        # Mengubah gambar menjadi satu baris angka (vektor) dengan tipe data float64 
-        # agar perhitungan matematis GMM lebih stabil dan tidak error.
-        pixel_values = img.reshape(-1, 1).astype(np.float64)
+    # --- LANGKAH 2: SEGMENTASI GMM ---
+    # Melatih GMM khusus untuk gambar ini guna memisahkan area tulang dan background.
+    # GMM dilatih dari histogram 256 bin intensitas (bobot = jumlah piksel), 
+    # hasilnya setara dengan EM per-piksel tetapi jauh lebih ringan untuk Raspberry Pi.
+    # Untuk scan beresolusi tinggi, GMM_FIT_MODE di pipeline.py bisa diubah ke
+    # "subsample" agar GMM cukup dilatih dari sampel piksel (waktu konstan).
+    with profiling.stage("gmm_fit") as info:
+        gmm = fit_image_gmm(img, n_clusters=3)
+        # Jumlah iterasi EM dan status konvergensi ikut dicatat di profil
+        info.update(profiling.gmm_info(gmm))
+
+    # Label diurutkan berdasarkan rata-rata kecerahan tiap cluster:
+    # 0 untuk background, 1 untuk pori, dan 2 untuk padat. Karena citra uint8,
+    # pemetaan intensitas -> label cukup berupa tabel 256 entri (lookup table)
+    # yang diterapkan sekali ke seluruh citra. Hasilnya langsung berbentuk 2D uint8.
+    with profiling.stage("label"):
+        segmented_image, class_counts = segment_image(img, gmm)
+
+    # --- LANGKAH 3: EKSTRAKSI FITUR ---
+    # Cek cache fitur dulu: kuncinya adalah hash isi file gambar + parameter pipeline,
+    # sehingga gambar yang sama tidak perlu dihitung ulang GLCM-nya.
+    with profiling.stage("features") as info:
+        cache_key, _ = file_cache_key(file_path)
+        features_new = get_features(cache_key)
+        info["cache_hit"] = features_new is not None
+        if features_new is None:
+            # Menghitung 8 nilai fitur (Rasio & Tekstur) dari gambar yang sedang diperiksa.
+            features_new = extract_features_complete(img, segmented_image, class_counts)
+            put_features(cache_key, features_new)
+
+    # --- LANGKAH 4: PREDIKSI ---
+    with profiling.stage("predict"):
+        # Memasukkan data fitur (urutan FEATURE_NAMES, sama dengan kolom database) ke
+        # 100 pohon Random Forest sekaligus. Satu penelusuran menghasilkan label diagnosa
+        # (kelas dengan suara terbanyak) dan probabilitas setiap kelas, identik dengan
+        # model.predict dan model.predict_proba milik sklearn.
+        labels, proba = model.predict_with_proba([features_new])
+        diagnosa = labels[0]
 
-        # Melatih GMM khusus untuk gambar ini guna memisahkan area tulang dan background.
-        gmm = GaussianMixture(n_components=3, random_state=42).fit(pixel_values)
-        labels = gmm.predict(pixel_values)
-
-        # Mengambil nilai rata-rata kecerahan dari tiap cluster untuk menentukan 
-        # mana yang area gelap (pori) dan mana yang area terang (tulang padat).
-        means = gmm.means_.flatten()
-        sorted_indices = np.argsort(means)
-        sorted_labels = np.zeros_like(labels)
-
-        # Mengurutkan ulang label: 0 untuk background, 1 untuk pori, dan 2 untuk padat.
-        for i, idx in enumerate(sorted_indices):
-            sorted_labels[labels == idx] = i
-
-        # Mengembalikan bentuk data dari vektor menjadi bentuk gambar (2D).
-        segmented_image = sorted_labels.reshape(img.shape)
-
-        # --- LANGKAH 3: EKSTRAKSI FITUR ---
-        # Daftar nama fitur harus sama persis dengan urutan kolom di database_fitur.csv.
-        feature_names = [
-            'rasio_p_v_b', 'rasio_p_v_t', 'glcm_contrast', 'glcm_homogeneity',
-            'glcm_energy', 'glcm_correlation', 'stat_mean', 'stat_variance'
-        ]
-
-        # Menghitung 8 nilai fitur (Rasio & Tekstur) dari gambar yang sedang diperiksa.
-        features_new = extract_features_complete(img, segmented_image)
+        # Menghitung seberapa besar tingkat keyakinan (persentase) terhadap diagnosa tersebut.
+        probabilitas = np.max(proba[0]) * 100
 
-        # Membungkus hasil fitur ke dalam format DataFrame (tabel) Pandas agar model 
-        # mengenali nama fiturnya dan tidak memunculkan pesan peringatan (Warning).
-        features_df = pd.DataFrame([features_new], columns=feature_names)
+    return {"diagnosa": diagnosa, "probabilitas": probabilitas, "n_data": n_data,
+            "img": img, "segmented": segmented_image, "original": img_original}
 
-        # --- LANGKAH 4: PREDIKSI ---
-        # Memasukkan data fitur ke model Random Forest untuk mendapatkan hasil diagnosa.
-        diagnosa = model.predict(features_df)[0]
+def start_diagnosis():
+    # Membuka jendela dialog agar pengguna bisa memilih file gambar X-ray 
+    # yang ingin didiagnosa. Selama dialog terbuka, pustaka berat selesai dimuat di latar belakang.
+    file_path = filedialog.askopenfilename(title="Pilih Citra X-ray")
+    # Jika pengguna menutup jendela dialog tanpa memilih gambar, fungsi akan berhenti.
+    if not file_path: return
 
-        # Menghitung seberapa besar tingkat keyakinan (persentase) terhadap diagnosa tersebut.
-        probabilitas = np.max(model.predict_proba(features_df)) * 100
+    # Jika profil waktu diaktifkan (checkbox di jendela utama), setiap langkah di bawah
+    # dicatat waktu nyata, waktu CPU, dan alokasi memorinya oleh profiling.py.
+    with profiling.session() as profile:
+        try:
+            # Jika jendela dibuka dari launcher, diagnosa dikerjakan worker persisten (worker.py)
+            # yang sudah memuat pustaka dan model terlatih, jadi yang tersisa hanya
+            # perhitungan citra. Tahap-tahap di worker ikut masuk ke profil.
+            result = worker.submit({"job": "diagnose", "path": os.path.abspath(file_path),
+                                    "profile": profile is not None, "original": True})
+
+            # Menunggu pemuatan pustaka (biasanya sudah selesai saat citra dipilih)
+            with profiling.stage("libraries"):
+                libraries.wait()
+
+            # Tanpa worker (jendela dibuka langsung), semua langkah dihitung di proses ini.
+            if result is None:
+                result = diagnose_local(file_path)
+            elif profile is not None:
+                profile.stages += result["stages"]
+
+        except Exception as e:
+            if profile is not None:
+                profile.write_log(file=file_path, error=str(e))
+            messagebox.showerror("Error", f"Terjadi kesalahan diagnosa:\n{e}")
+            return
+
+        # Database kosong atau datanya belum cukup untuk melatih model
+        if "warning" in result:
+            messagebox.showwarning("Peringatan", result["warning"])
+            return
+
+        # Catatan waktu setiap diagnosa ditambahkan ke log JSON (profil_diagnosa.jsonl)
+        if profile is not None:
+            profile.write_log(file=file_path, diagnosa=result["diagnosa"], n_data=result["n_data"])
+
+    # Menampilkan jendela hasil (di luar sesi profil: waktu membuka jendela tidak ikut diukur)
+    show_result(file_path, result["original"], result["img"], result["segmented"], result["diagnosa"],
+                result["probabilitas"], result["n_data"], profile)
+
+# --- DIAGNOSA SATU FOLDER SEKALIGUS ---
+# Klinik biasanya menyerahkan satu folder film sekaligus. Fitur semua citra dihitung
+# paralel di beberapa proses (diagnose_folder.py), lalu diprediksi per batch dengan
+# satu panggilan predict_proba. Hasilnya (label, confidence, probabilitas per kelas,
+# dan waktu per tahap) langsung ditulis ke CSV/JSONL tanpa membuka jendela per citra.
+def start_batch_diagnosis():
+    folder = filedialog.askdirectory(title="Pilih Folder Citra X-ray")
+    if not folder: return
+    output = filedialog.asksaveasfilename(title="Simpan Hasil Diagnosa", defaultextension=".csv",
+                                          initialfile="hasil_diagnosa.csv",
+                                          filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")])
+    if not output: return
+
+    status_label.config(text="Memuat pustaka...", foreground="blue")
+    root.update_idletasks()
+    libraries.wait()
+
+    paths = collect_inputs([folder])
+    if not paths:
+        messagebox.showwarning("Peringatan", "Tidak ada gambar di folder ini.")
+        status_label.config(text="")
+        return
 
-        # Menampilkan jendela hasil
-        show_result(file_path, img_original, img, segmented_image, diagnosa, probabilitas, n_data)
+    def show_progress(done, total):
+        status_label.config(text=f"Memproses {done}/{total}...", foreground="blue")
+        root.update() # Update UI agar tidak freeze
 
+    try:
+        n_ok, n_failed = diagnose_batch(paths, output, progress=show_progress)
     except Exception as e:
-        messagebox.showerror("Error", f"Terjadi kesalahan diagnosa:\n{e}")
+        status_label.config(text="")
+        messagebox.showerror("Error", f"Diagnosa folder gagal:\n{e}")
+        return
 
-def show_result(path, img_orig, img_clahe, seg, diagnosa, prob, n_data):
+    msg = f"Selesai! {n_ok} citra didiagnosa, {n_failed} gagal."
+    status_label.config(text=msg, foreground="green")
+    messagebox.showinfo("Sukses", f"{msg}\nHasil: {output}")
+
+def show_result(path, img_orig, img_clahe, seg, diagnosa, prob, n_data, profile=None):
     report_text = (
         f"HASIL DIAGNOSA\n"
         f"----------------------------------\n"
@@ -216,7 +382,8 @@ def show_result(path, img_orig, img_clahe, seg, diagnosa, prob, n_data):
     if "Osteoporosis" in diagnosa: bg_color = "#ffdddd"
     elif "Osteopenia" in diagnosa: bg_color = "#fff4cc"
 
-    plt.figure(figsize=(10, 7))
+    # Jendela dilebarkan jika panel profil waktu ditampilkan di sisi kanan
+    plt.figure(figsize=(12 if profile else 10, 7))
     plt.subplot(1, 2, 1)
     plt.title("Citra X-Ray")
     plt.imshow(img_clahe, cmap='gray')
@@ -227,10 +394,16 @@ def show_result(path, img_orig, img_clahe, seg, diagnosa, prob, n_data):
     plt.imshow(seg, cmap='viridis')
     plt.axis('off')
 
-    plt.tight_layout(rect=[0, 0, 1, 0.85])
-    plt.figtext(0.5, 0.88, report_text, ha='center', va='top', fontsize=11,
+    plt.tight_layout(rect=[0, 0, 0.8 if profile else 1, 0.85])
+    plt.figtext(0.4 if profile else 0.5, 0.88, report_text, ha='center', va='top', fontsize=11,
                 bbox={"facecolor": bg_color, "alpha": 1, "pad": 10})
 
+    # --- PANEL PROFIL WAKTU (OPSIONAL) ---
+    # Waktu nyata, waktu CPU, dan puncak alokasi memori setiap tahap diagnosa.
+    if profile:
+        plt.figtext(0.81, 0.80, "\n".join(profile.summary_lines()), ha='left', va='top',
+                    fontsize=8, family='monospace', bbox={"facecolor": "#f4f4f4", "pad": 6})
+
     # --- FUNGSI CALLBACK UNTUK TOMBOL HISTOGRAM ---
     def open_hist_orig(event):
         plt.figure("Histogram Original")
@@ -298,7 +471,7 @@ def show_result(path, img_orig, img_clahe, seg, diagnosa, prob, n_data):
 if __name__ == "__main__":
     root = tk.Tk()
     root.title("Diagnosis Citra")
-    root.geometry("400x250")
+    root.geometry("400x360")
     root.resizable(False, False)
 
     style = ttk.Style(root)
@@ -310,6 +483,17 @@ if __name__ == "__main__":
     ttk.Label(main_frame, text="Diagnosis Citra", font=("Arial", 14, "bold")).pack(pady=10)
 
     btn_action = ttk.Button(main_frame, text="Mulai Pemeriksaan Citra", command=start_diagnosis)
-    btn_action.pack(pady=20, ipady=10, fill='x')
+    btn_action.pack(pady=(20, 5), ipady=10, fill='x')
+
+    ttk.Button(main_frame, text="Diagnosa Satu Folder (CSV/JSONL)", command=start_batch_diagnosis).pack(pady=(5, 15), fill='x')
+
+    # Profil waktu per tahap bisa dinyalakan/dimatikan tanpa menutup aplikasi
+    profile_var = tk.BooleanVar(value=profiling.is_enabled())
+    ttk.Checkbutton(main_frame, text="Tampilkan profil waktu per tahap", variable=profile_var,
+                    command=lambda: profiling.set_enabled(profile_var.get())).pack()
+
+    status_label = ttk.Label(main_frame, text="", foreground="gray")
+    status_label.pack(pady=5)
 
+    libraries.start()
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,249 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+from pipeline import (DIAGNOSE_IMAGE_CACHE, extract_features_complete, fit_image_gmm, init_worker,
+                      pipeline_fingerprint, preprocess_bytes)
+from segmentasi import segment_image
+from train_folder import IMAGE_EXTENSIONS
+import feature_cache
+import feature_store
+from model_store import fitted_forest
+
+# ==========================================================
+# DIAGNOSA BATCH SATU FOLDER (TANPA GUI)
+# ==========================================================
+# Untuk satu folder film dari klinik: decode, preprocess, segmentasi GMM dan
+# ekstraksi fitur dikerjakan paralel di process pool (antrian dibatasi dua
+# job per proses agar memori tetap terkendali). Fitur yang selesai dikumpulkan lalu diprediksi per batch
+# dengan SATU penelusuran forest datar (flat_forest.py, tanpa sklearn): label dan
+# probabilitas identik dengan predict/predict_proba sklearn.
+# Setiap batch langsung ditulis ke CSV atau JSONL (sesuai ekstensi file
+# keluaran), jadi hasil sudah bisa dibaca selama proses berjalan. Tidak ada
+# jendela matplotlib; gambar segmentasi hanya ditulis jika --figures diberikan.
+#
+# Contoh:
+#   python diagnose_folder.py ../cd --output hasil_diagnosa.csv --workers 4
+#   python diagnose_folder.py a.jpg b.jpg --output hasil.jsonl --figures gambar_hasil
+
+PREDICT_BATCH = 32 # Baris per prediksi forest; 0 = satu prediksi untuk seluruh folder
+STAGES = ("decode", "preprocess", "gmm_fit", "label", "features")
+
+
+def collect_inputs(inputs):
+    """Daftar path gambar dari campuran folder (rekursif, terurut) dan file"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for dirpath, dirnames, filenames in os.walk(item):
+                dirnames.sort()
+                paths += [os.path.join(dirpath, name) for name in sorted(filenames)
+                          if name.lower().endswith(IMAGE_EXTENSIONS)]
+        else:
+            paths.append(item)
+    return paths
+
+
+def save_figure(path, img, segmented_image):
+    """Citra CLAHE dan peta label berdampingan sebagai PNG (OpenCV, tanpa matplotlib)"""
+    labels = cv2.applyColorMap((segmented_image * 127).astype(np.uint8), cv2.COLORMAP_VIRIDIS)
+    cv2.imwrite(path, np.hstack([cv2.cvtColor(img, cv2.COLOR_GRAY2BGR), labels]))
+
+
+def analyze_bytes(data, keep_images=False, name=""):
+    """(hasil, citra CLAHE, peta label) dari isi file gambar
+
+    hasil berisi fitur (atau error), cache_hit dan waktu per tahap (ms). Citra hanya
+    dihitung jika fitur belum ada di cache atau keep_images=True; selain itu None.
+    """
+    times = {}
+    start = time.perf_counter()
+
+    def lap(stage):
+        nonlocal start
+        now = time.perf_counter()
+        times[stage] = (now - start) * 1000
+        start = now
+
+    result = {"file": name, "times": times}
+    img = segmented_image = None
+    try:
+        key = feature_cache.image_key(data, pipeline_fingerprint())
+        features = feature_cache.get_features(key)
+        result["cache_hit"] = features is not None
+        if features is None or keep_images:
+            img = preprocess_bytes(data, lap, DIAGNOSE_IMAGE_CACHE) # Cache citra memmap hanya jika diaktifkan
+            if img is None:
+                result["error"] = "Gambar tidak terbaca"
+                return result, None, None
+            gmm = fit_image_gmm(img, n_clusters=3)
+            lap("gmm_fit")
+            segmented_image, class_counts = segment_image(img, gmm)
+            lap("label")
+            if features is None:
+                features = extract_features_complete(img, segmented_image, class_counts)
+                feature_cache.put_features(key, features)
+                lap("features")
+        result["features"] = features
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result, img, segmented_image
+
+
+def diagnose_features(job):
+    """Fitur + waktu per tahap (ms) satu file citra; dijalankan di process pool"""
+    path, figures_dir = job
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        return {"file": path, "times": {}, "error": f"{type(e).__name__}: {e}"}
+
+    result, img, segmented_image = analyze_bytes(data, keep_images=bool(figures_dir), name=path)
+    if figures_dir and img is not None:
+        # Nama folder ikut dipakai: folder label berbeda sering berisi nama file yang sama
+        parent = os.path.basename(os.path.dirname(os.path.abspath(path)))
+        stem = os.path.splitext(os.path.basename(path))[0]
+        save_figure(os.path.join(figures_dir, f"{parent}_{stem}.png"), img, segmented_image)
+    return result
+
+
+# ==========================================================
+# KELUARAN BERTAHAP (CSV / JSONL)
+# ==========================================================
+class ResultWriter:
+    """Menulis baris hasil ke CSV atau JSONL dan mem-flush setiap batch"""
+
+    def __init__(self, path, classes):
+        self.jsonl = path.lower().endswith(".jsonl")
+        self.columns = (["file", "diagnosa", "confidence"] + [f"prob_{c}" for c in classes]
+                        + ["cache_hit"] + [f"{s}_ms" for s in STAGES] + ["predict_ms", "error"])
+        self.f = open(path, "w", encoding="utf-8", newline="")
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.f, fieldnames=self.columns)
+            self.writer.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if self.jsonl:
+                self.f.write(json.dumps(row) + "\n")
+            else:
+                self.writer.writerow({k: ("" if row.get(k) is None else row.get(k)) for k in self.columns})
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def predict_rows(model, results):
+    """Baris hasil untuk satu batch; semua citra yang berhasil diprediksi dalam satu penelusuran forest"""
+    ok = [r for r in results if "features" in r]
+    labels, proba = [], np.empty((0, len(model.classes_)))
+    elapsed = 0.0
+    if ok:
+        start = time.perf_counter()
+        labels, proba = model.predict_with_proba(np.array([r["features"] for r in ok]))
+        elapsed = (time.perf_counter() - start) * 1000
+
+    rows = []
+    for r, label, p in zip(ok, labels, proba):
+        row = {"file": r["file"], "diagnosa": str(label), "confidence": round(float(np.max(p)) * 100, 2)}
+        row.update({f"prob_{c}": round(float(v), 4) for c, v in zip(model.classes_, p)})
+        row["cache_hit"] = r["cache_hit"]
+        row.update({f"{s}_ms": round(r["times"][s], 2) if s in r["times"] else None for s in STAGES})
+        row["predict_ms"] = round(elapsed / len(ok), 3) # Waktu satu batch dibagi rata per citra
+        rows.append(row)
+    rows += [{"file": r["file"], "error": r["error"]} for r in results if "features" not in r]
+    return rows
+
+
+def diagnose_batch(paths, output, workers=None, batch_size=PREDICT_BATCH, figures_dir=None,
+                   database=feature_store.DEFAULT_STORE, progress=None):
+    """Diagnosa semua path dan tulis hasilnya bertahap ke output; (jumlah berhasil, jumlah gagal)"""
+    model, n_data = fitted_forest(database)
+    if model is None:
+        raise RuntimeError(n_data)
+    if figures_dir:
+        os.makedirs(figures_dir, exist_ok=True)
+
+    writer = ResultWriter(output, model.classes_)
+    n_ok = n_failed = done = 0
+    batch = []
+
+    def flush():
+        nonlocal n_ok, n_failed
+        rows = predict_rows(model, batch)
+        writer.write(rows)
+        failed = sum("error" in row for row in rows)
+        n_ok, n_failed = n_ok + len(rows) - failed, n_failed + failed
+        batch.clear()
+
+    jobs = iter(paths)
+    max_in_flight = 2 * (workers or os.cpu_count() or 1)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+            pending = set()
+
+            def submit_next():
+                path = next(jobs, None)
+                if path is not None:
+                    pending.add(executor.submit(diagnose_features, (path, figures_dir)))
+
+            for _ in range(max_in_flight):
+                submit_next()
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    pending.remove(future)
+                    batch.append(future.result())
+                    done += 1
+                    submit_next()
+                if batch_size and len(batch) >= batch_size:
+                    flush()
+                if progress:
+                    progress(done, len(paths))
+        if batch:
+            flush()
+    finally:
+        writer.close()
+    return n_ok, n_failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diagnosa batch semua citra di folder/daftar file (tanpa GUI)")
+    parser.add_argument("inputs", nargs="+", help="Folder dan/atau file gambar")
+    parser.add_argument("--output", default="hasil_diagnosa.csv", help="File hasil .csv atau .jsonl")
+    parser.add_argument("--db", default=feature_store.DEFAULT_STORE,
+                        help=f"Folder database fitur (default: {feature_store.DEFAULT_STORE})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Jumlah proses paralel")
+    parser.add_argument("--batch", type=int, default=PREDICT_BATCH,
+                        help="Baris per prediksi forest (0 = satu prediksi di akhir)")
+    parser.add_argument("--figures", metavar="FOLDER", help="Tulis juga gambar segmentasi PNG ke folder ini")
+    args = parser.parse_args()
+
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        print("Tidak ada gambar yang ditemukan.")
+        sys.exit(1)
+
+    def show_progress(done, total):
+        print(f"\rMemproses {done}/{total}...", end="", flush=True)
+
+    start = time.perf_counter()
+    try:
+        n_ok, n_failed = diagnose_batch(paths, args.output, args.workers, args.batch, args.figures,
+                                        args.db, show_progress)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"\nSelesai! {n_ok} citra didiagnosa, {n_failed} gagal ({elapsed:.1f} detik, "
+          f"{len(paths) / elapsed:.1f} citra/detik). Hasil: {args.output}")
+    sys.exit(0 if n_ok else 1)
@@ -0,0 +1,379 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from diagnose_folder import analyze_bytes, predict_rows
+from pipeline import init_worker
+import feature_store
+from model_store import fitted_forest
+
+# ==========================================================
+# LAYANAN HTTP DIAGNOSA (LOKAL)
+# ==========================================================
+# Akses terprogram untuk jembatan PACS tanpa GUI, hanya pustaka standar
+# (http.server). Pustaka dan model Random Forest dimuat SEKALI saat start;
+# model baru dimuat/dilatih ulang jika database fitur berubah.
+#
+#   POST /diagnose   isi body = byte file gambar (JPEG/PNG/...), hasil JSON:
+#                    diagnosa, confidence, probabilitas per kelas, waktu per tahap
+#   GET  /metrics    penghitung permintaan, latensi p50-p99, throughput
+#   GET  /health     status layanan dan jumlah data latih model
+#
+# Perhitungan berjalan di thread pool berukuran tetap (OpenCV dan NumPy
+# melepas GIL). Paling banyak workers + queue permintaan ditampung sekaligus;
+# slot diambil sebelum body dibaca, jadi permintaan berikutnya langsung
+# dijawab 503 dengan header Retry-After (backpressure) tanpa body-nya pernah
+# masuk ke memori.
+#
+# Contoh:
+#   python diagnose_server.py --port 8765 --workers 2
+#   curl --data-binary @citra.jpg http://127.0.0.1:8765/diagnose
+# Cek tanpa layanan luar (server + klien lokal di satu proses):
+#   python diagnose_server.py --check ../data-uji
+
+HOST = "127.0.0.1"
+PORT = 8765
+WORKERS = os.cpu_count() or 1
+QUEUE_LIMIT = 2 * WORKERS # Permintaan yang boleh menunggu di luar yang sedang dihitung
+MAX_BODY_BYTES = 50 * 1024 * 1024
+REQUEST_TIMEOUT = 120.0 # Detik; hasil yang lebih lama dijawab 504
+LATENCY_WINDOW = 1000 # Jumlah latensi terakhir untuk persentil
+PERCENTILES = (50, 90, 95, 99) # Sama dengan benchmark.py, tanpa mengimpornya (cv2/matplotlib)
+THROUGHPUT_WINDOW = 60.0 # Detik
+
+
+class Metrics:
+    """Penghitung permintaan dan latensi; aman dipakai dari banyak thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counts = {"requests": 0, "ok": 0, "bad_request": 0, "failed": 0, "rejected": 0, "timeout": 0}
+        self.in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW) # ms, permintaan yang berhasil
+        self.finished = deque() # waktu selesai, untuk throughput jendela terakhir
+        self.stages = {} # tahap -> [jumlah, total ms]
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def record(self, latency_ms, row):
+        now = time.time()
+        with self.lock:
+            self.counts["ok"] += 1
+            self.latencies.append(latency_ms)
+            self.finished.append(now)
+            for name, value in row.items():
+                if name.endswith("_ms") and value is not None:
+                    total = self.stages.setdefault(name[:-3], [0, 0.0])
+                    total[0] += 1
+                    total[1] += value
+
+    def snapshot(self):
+        now = time.time()
+        with self.lock:
+            while self.finished and self.finished[0] < now - THROUGHPUT_WINDOW:
+                self.finished.popleft()
+            latencies = np.array(self.latencies)
+            uptime = now - self.started
+            data = {
+                "uptime_s": round(uptime, 1),
+                **self.counts,
+                "in_flight": self.in_flight,
+                "throughput_rps": round(len(self.finished) / min(THROUGHPUT_WINDOW, max(uptime, 1e-9)), 3),
+                "throughput_total_rps": round(self.counts["ok"] / max(uptime, 1e-9), 3),
+                "stage_mean_ms": {name: round(total / n, 2) for name, (n, total) in self.stages.items()},
+            }
+        if len(latencies):
+            data["latency_ms"] = {f"p{p}": round(float(np.percentile(latencies, p)), 2) for p in PERCENTILES}
+            data["latency_ms"]["mean"] = round(float(latencies.mean()), 2)
+        return data
+
+
+class Busy(Exception):
+    """Antrian penuh; klien diminta mencoba lagi"""
+
+
+class DiagnosisService:
+    """Model + thread pool berukuran tetap dengan batas antrian"""
+
+    def __init__(self, database=feature_store.DEFAULT_STORE, workers=WORKERS, queue_limit=QUEUE_LIMIT):
+        if workers > 1:
+            init_worker() # Paralel antar permintaan, OpenCV cukup 1 thread per permintaan
+        self.database = database
+        self.model_lock = threading.Lock()
+        model, n_data = self.model()
+        if model is None:
+            raise RuntimeError(n_data)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="diagnosa")
+        self.slots = threading.BoundedSemaphore(workers + queue_limit)
+        self.metrics = Metrics()
+
+    def model(self):
+        # fitted_forest memakai model di memori selama database tidak berubah
+        with self.model_lock:
+            return fitted_forest(self.database)
+
+    def _diagnose(self, data):
+        model, n_data = self.model()
+        if model is None:
+            raise RuntimeError(n_data)
+        result, _, _ = analyze_bytes(data)
+        row = predict_rows(model, [result])[0]
+        row.pop("file", None)
+        row["n_data"] = n_data
+        return row
+
+    def reserve(self):
+        """Mengambil satu slot antrian SEBELUM body dibaca; Busy jika antrian penuh
+
+        Slot membatasi jumlah body yang ada di memori, bukan hanya perhitungan:
+        ThreadingHTTPServer membuka satu thread per koneksi.
+        """
+        if not self.slots.acquire(blocking=False):
+            raise Busy()
+        with self.metrics.lock:
+            self.metrics.in_flight += 1
+
+    def release(self, _=None):
+        with self.metrics.lock:
+            self.metrics.in_flight -= 1
+        self.slots.release()
+
+    def diagnose(self, data, timeout=REQUEST_TIMEOUT):
+        """Baris hasil satu citra; slot dari reserve() dilepas saat perhitungan selesai"""
+        try:
+            future = self.executor.submit(self._diagnose, data)
+        except BaseException:
+            self.release()
+            raise
+        future.add_done_callback(self.release)
+        return future.result(timeout)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+    service = None # Diisi make_server
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send_json(200, self.service.metrics.snapshot())
+        elif self.path == "/health":
+            _, n_data = self.service.model()
+            self._send_json(200, {"status": "ok", "n_data": n_data})
+        else:
+            self._send_json(404, {"error": "Tidak ditemukan"})
+
+    def do_POST(self):
+        if self.path != "/diagnose":
+            self._send_json(404, {"error": "Tidak ditemukan"})
+            return
+        metrics = self.service.metrics
+        metrics.count("requests")
+        start = time.perf_counter()
+
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            length = -1 # Tidak ada atau bukan angka
+        if length <= 0 or length > MAX_BODY_BYTES:
+            metrics.count("bad_request")
+            self.close_connection = True # Body yang tidak dibaca tidak boleh terbaca sebagai permintaan berikutnya
+            if length > MAX_BODY_BYTES:
+                self._send_json(413, {"error": f"Body melebihi {MAX_BODY_BYTES} byte"})
+            else:
+                self._send_json(400, {"error": "Body harus berisi byte gambar (Content-Length tidak valid)"})
+            return
+
+        # Antrian penuh: tolak sebelum body dibaca, agar serbuan permintaan tidak
+        # menumpuk body hingga MAX_BODY_BYTES di memori
+        try:
+            self.service.reserve()
+        except Busy:
+            metrics.count("rejected")
+            self.close_connection = True
+            self._send_json(503, {"error": "Server sibuk, coba lagi"}, {"Retry-After": "1"})
+            return
+        try:
+            data = self.rfile.read(length)
+        except BaseException:
+            self.service.release()
+            raise
+        if len(data) < length:
+            self.service.release()
+            metrics.count("bad_request")
+            self.close_connection = True
+            self._send_json(400, {"error": "Body terpotong"})
+            return
+
+        try:
+            row = self.service.diagnose(data)
+        except FutureTimeout:
+            metrics.count("timeout")
+            self._send_json(504, {"error": "Diagnosa melebihi batas waktu"})
+            return
+        except Exception as e:
+            metrics.count("failed")
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+
+        if "error" in row:
+            metrics.count("bad_request")
+            self._send_json(400, row)
+            return
+        latency_ms = (time.perf_counter() - start) * 1000
+        metrics.record(latency_ms, row)
+        row["latency_ms"] = round(latency_ms, 2)
+        self._send_json(200, row)
+
+    def log_message(self, format, *args):
+        pass # Satu baris per permintaan terlalu ramai; ringkasannya ada di /metrics
+
+
+def make_server(service, host=HOST, port=PORT):
+    """ThreadingHTTPServer yang melayani service; port 0 = port bebas"""
+    handler = type("DiagnosisHandler", (Handler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+# ==========================================================
+# CEK DENGAN KLIEN LOKAL
+# ==========================================================
+def post_image(url, data):
+    """(status HTTP, JSON) untuk satu POST /diagnose"""
+    import urllib.error
+    import urllib.request
+
+    request = urllib.request.Request(url + "/diagnose", data=data, method="POST",
+                                     headers={"Content-Type": "application/octet-stream"})
+    try:
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def post_raw(url, content_length):
+    """Status HTTP untuk POST /diagnose dengan header Content-Length apa adanya (tanpa body)"""
+    import http.client
+    import urllib.parse
+
+    parts = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=REQUEST_TIMEOUT)
+    try:
+        conn.putrequest("POST", "/diagnose")
+        conn.putheader("Content-Length", content_length)
+        conn.endheaders()
+        return conn.getresponse().status
+    finally:
+        conn.close()
+
+
+def run_check(folder, workers, queue_limit, database=feature_store.DEFAULT_STORE):
+    """Server di port bebas + klien lokal: hasil sama dengan predict_rows, 503 saat penuh, metrics"""
+    import glob
+    import urllib.request
+
+    paths = sorted(glob.glob(os.path.join(folder, "**", "*.jpg"), recursive=True))[:8]
+    if not paths:
+        print(f"Tidak ada gambar di {folder}")
+        return False
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append(f.read())
+
+    service = DiagnosisService(database, workers, queue_limit)
+    server = make_server(service, port=0)
+    url = f"http://{HOST}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ok = True
+    try:
+        # 1. Berurutan: hasil HTTP harus sama dengan pipeline di proses ini
+        for path, data in zip(paths, images):
+            status, body = post_image(url, data)
+            expected = predict_rows(service.model()[0], [analyze_bytes(data)[0]])[0]
+            same = status == 200 and body["diagnosa"] == expected["diagnosa"] and body["confidence"] == expected["confidence"]
+            ok &= same
+            print(f"{'OK  ' if same else 'BEDA'} {os.path.basename(path)}: {status} {body.get('diagnosa')} "
+                  f"{body.get('confidence')}% {body.get('latency_ms')} ms")
+
+        # 2. Permintaan rusak -> 400
+        status, _ = post_image(url, b"bukan gambar")
+        print(f"{'OK  ' if status == 400 else 'GAGAL'} body bukan gambar -> {status}")
+        ok &= status == 400
+        for content_length, expected in (("abc", 400), ("-5", 400), (str(MAX_BODY_BYTES + 1), 413)):
+            status = post_raw(url, content_length)
+            print(f"{'OK  ' if status == expected else 'GAGAL'} Content-Length {content_length[:12]} -> {status}")
+            ok &= status == expected
+
+        # 3. Serbuan paralel melebihi kapasitas -> sebagian ditolak 503 (backpressure)
+        burst = 4 * (workers + queue_limit)
+        statuses = []
+        threads = [threading.Thread(target=lambda d=images[i % len(images)]: statuses.append(post_image(url, d)[0]))
+                   for i in range(burst)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        n_ok, n_busy = statuses.count(200), statuses.count(503)
+        print(f"{'OK  ' if n_ok + n_busy == burst and n_ok >= workers else 'GAGAL'} {burst} permintaan serentak: "
+              f"{n_ok} dilayani, {n_busy} ditolak 503 (kapasitas {workers}+{queue_limit})")
+        ok &= n_ok + n_busy == burst and n_ok >= workers
+
+        with urllib.request.urlopen(url + "/metrics") as response:
+            print(json.dumps(json.loads(response.read()), indent=2))
+    finally:
+        server.shutdown()
+        service.close()
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Layanan HTTP lokal untuk diagnosa citra")
+    parser.add_argument("--host", default=HOST, help="Alamat (default hanya lokal)")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Thread perhitungan")
+    parser.add_argument("--queue", type=int, default=QUEUE_LIMIT, help="Permintaan yang boleh menunggu")
+    parser.add_argument("--db", default=feature_store.DEFAULT_STORE,
+                        help=f"Folder database fitur (default: {feature_store.DEFAULT_STORE})")
+    parser.add_argument("--check", metavar="FOLDER", help="Jalankan cek dengan klien lokal lalu keluar")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if run_check(args.check, args.workers, args.queue, args.db) else 1)
+
+    try:
+        service = DiagnosisService(args.db, args.workers, args.queue)
+    except RuntimeError as e:
+        sys.exit(f"Model belum bisa dimuat: {e}")
+    server = make_server(service, args.host, args.port)
+    print(f"Layanan diagnosa di http://{args.host}:{server.server_address[1]} "
+          f"({args.workers} thread, antrian {args.queue}). Ctrl+C untuk berhenti.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import threading
+
+# ==========================================================
+# CACHE FITUR BERBASIS ISI FILE
+# ==========================================================
+# Kunci cache = hash isi file gambar + sidik parameter pipeline (CLAHE, blur,
+# jumlah cluster GMM, konfigurasi GLCM). Gambar yang sama (walaupun namanya
+# berbeda atau disalin ke folder lain) tidak perlu diekstraksi ulang, dan
+# mengubah parameter pipeline otomatis membuat kunci baru.
+#
+# Seperti cache_citra, folder cache berada di samping modul ini (bukan folder
+# kerja) sehingga launcher dan alat CLI yang dijalankan dari folder lain tetap
+# memakai dan membatasi satu cache yang sama.
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_fitur")
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+EVICT_EVERY = 100 # Pemeriksaan ukuran cache dilakukan setiap N kali simpan
+
+_puts_since_evict = 0
+
+
+def image_key(image_bytes, fingerprint):
+    """Kunci cache dari isi file gambar dan sidik parameter pipeline"""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(fingerprint.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, key + ".json")
+
+
+def get_features(key, cache_dir=CACHE_DIR):
+    """Fitur tersimpan untuk kunci ini, atau None jika belum ada"""
+    path = _entry_path(key, cache_dir)
+    try:
+        with open(path, "r") as f:
+            features = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # Tandai sebagai baru dipakai agar tidak tergusur lebih dulu (LRU berdasarkan mtime)
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return features
+
+
+def put_features(key, features, cache_dir=CACHE_DIR):
+    """Menyimpan fitur ke cache (gagal menyimpan tidak dianggap error)"""
+    global _puts_since_evict
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = _entry_path(key, cache_dir)
+        # pid + thread: layanan HTTP (diagnose_server.py) bisa menyimpan gambar yang sama dari dua thread
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump([float(v) for v in features], f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Cache fitur tidak tersimpan: {e}")
+        return
+
+    _puts_since_evict += 1
+    if _puts_since_evict >= EVICT_EVERY:
+        _puts_since_evict = 0
+        evict(cache_dir)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Menghapus entri yang paling lama tidak dipakai sampai ukuran cache di bawah batas"""
+    entries = []
+    total = 0
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+    except OSError:
+        return
+
+    if total <= max_bytes:
+        return
+
+    # Sisakan ruang 10% agar penggusuran tidak terjadi di setiap penyimpanan berikutnya
+    target = int(max_bytes * 0.9)
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= target:
+            break
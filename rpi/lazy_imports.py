@@ -0,0 +1,114 @@
+import threading
+import time
+
+# ==========================================================
+# PEMUATAN PUSTAKA BERAT DI LATAR BELAKANG
+# ==========================================================
+# training.py dan diagnose.py dijalankan launcher sebagai proses baru. Jika
+# cv2, sklearn, pandas dan matplotlib (TkAgg) diimpor di awal modul, jendela
+# baru muncul setelah beberapa detik di Raspberry Pi. Karena itu modul GUI
+# hanya mengimpor tkinter dan pustaka standar; pustaka berat diimpor oleh
+# fungsi load_libraries() milik modul itu, yang dijalankan BackgroundLoader
+# di thread latar belakang segera setelah jendela dibuat. Setiap aksi memanggil
+# wait() sebelum memakai pustakanya, idealnya setelah dialog pilih file
+# sehingga pemuatan berjalan selama pengguna memilih gambar.
+#
+# Cek regresi waktu start (tanpa layar, memakai python -X importtime):
+#   python lazy_imports.py
+
+# Modul yang tidak boleh ikut terimpor saat alat GUI baru dibuka
+HEAVY_MODULES = ("numpy", "cv2", "pandas", "sklearn", "matplotlib", "skimage", "seaborn", "scipy")
+TOOLS = ("training", "diagnose")
+STARTUP_BUDGET_MS = 250 # Total waktu impor modul alat (PC x86; Raspberry Pi kira-kira 4-5x)
+
+
+class BackgroundLoader:
+    """Menjalankan fungsi pemuat pustaka tepat sekali, di latar belakang atau saat dibutuhkan"""
+
+    def __init__(self, load):
+        self._load = load
+        self._lock = threading.Lock()
+        self._done = False
+        self._error = None
+        self.elapsed = None
+
+    def start(self):
+        """Mulai memuat di thread daemon; kembali seketika"""
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            self.wait()
+        except Exception:
+            pass # Galat dilempar ulang saat aksi berikutnya memanggil wait()
+
+    def wait(self):
+        """Menunggu (atau langsung menjalankan) pemuatan; galat pemuatan dilempar ulang di sini"""
+        with self._lock:
+            if not self._done:
+                start = time.perf_counter()
+                try:
+                    self._load()
+                except Exception as e:
+                    self._error = e
+                self.elapsed = time.perf_counter() - start
+                self._done = True
+        if self._error is not None:
+            raise self._error
+
+    def ready(self):
+        return self._done
+
+
+# ==========================================================
+# CEK WAKTU START DENGAN -X importtime
+# ==========================================================
+def import_times(module, cwd=None):
+    """{nama modul: waktu impor kumulatif (ms)} dari `python -X importtime -c "import module"`"""
+    import subprocess
+    import sys
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=cwd)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "gagal impor")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        # Format: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def check_startup(module, cwd=None):
+    """(waktu impor ms, pustaka berat yang ikut terimpor) untuk satu modul alat"""
+    times = import_times(module, cwd)
+    heavy = sorted(name for name in times if name.split(".")[0] in HEAVY_MODULES and "." not in name)
+    return times.get(module, 0.0), heavy
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import sys
+
+    parser = argparse.ArgumentParser(description="Cek regresi waktu start alat GUI (python -X importtime)")
+    parser.add_argument("tools", nargs="*", default=list(TOOLS), help="Modul alat (default: training diagnose)")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="Batas waktu impor per alat")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    n_fail = 0
+    for tool in args.tools:
+        elapsed, heavy = check_startup(tool, cwd=here)
+        ok = not heavy and elapsed <= args.budget_ms
+        n_fail += not ok
+        print(f"{'OK  ' if ok else 'GAGAL'} {tool}: impor {elapsed:.0f} ms (batas {args.budget_ms:.0f} ms)"
+              + (f", pustaka berat terimpor saat start: {', '.join(heavy)}" if heavy else ""))
+
+    print(f"\n{len(args.tools) - n_fail}/{len(args.tools)} alat memenuhi target waktu start.")
+    sys.exit(1 if n_fail else 0)
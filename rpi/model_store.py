@@ -0,0 +1,265 @@
+import hashlib
+import os
+import pickle
+import sys
+import threading
+
+# ==========================================================
+# PENYIMPANAN MODEL TERLATIH (CACHE)
+# ==========================================================
+# Random Forest disimpan di samping database fitur (file CSV atau folder
+# feature_store) bersama "kunci" isi database dan hyperparameter-nya. Model
+# hanya dilatih ulang jika isi database atau hyperparameter berubah, bukan
+# setiap kali tombol diagnosa ditekan.
+#
+# Bersamaan dengan pickle sklearn, salinan hutan dalam array datar
+# (flat_forest.py, file .forest.npz) ikut disimpan. Diagnosa cukup memuat file
+# itu lewat load_forest() tanpa mengimpor sklearn sama sekali.
+
+FEATURE_NAMES = [
+    'rasio_p_v_b', 'rasio_p_v_t', 'glcm_contrast', 'glcm_homogeneity',
+    'glcm_energy', 'glcm_correlation', 'stat_mean', 'stat_variance'
+]
+RF_PARAMS = {"n_estimators": 100, "random_state": 42}
+
+_fitted = {} # database -> (stat_stamp, FlatForest, jumlah data)
+_fitted_lock = threading.Lock()
+
+
+def model_path(database):
+    """Lokasi file model untuk database tertentu (database_fitur.model.pkl)"""
+    return os.path.splitext(database)[0] + ".model.pkl"
+
+
+def forest_path(database):
+    """Lokasi file forest datar untuk database tertentu (database_fitur.forest.npz)"""
+    return os.path.splitext(database)[0] + ".forest.npz"
+
+
+def _source_files(database):
+    # Database berupa folder (feature_store): sidik mencakup semua file datanya
+    if os.path.isdir(database):
+        return [os.path.join(database, name) for name in sorted(os.listdir(database))
+                if not name.endswith((".tmp", ".lock"))]
+    return [database]
+
+
+def _stat_key(database):
+    key = []
+    for filename in _source_files(database):
+        st = os.stat(filename)
+        key.append((os.path.basename(filename), st.st_mtime_ns, st.st_size))
+    return tuple(key)
+
+
+def _file_hash(database):
+    digest = hashlib.sha256()
+    for filename in _source_files(database):
+        digest.update(os.path.basename(filename).encode("utf-8"))
+        with open(filename, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _params_key(params, feature_names):
+    import sklearn
+    return repr((sorted(params.items()), list(feature_names), sklearn.__version__))
+
+
+def _forest_params_key(params, feature_names):
+    # Forest datar tidak bergantung versi sklearn, jadi cukup hyperparameter dan urutan fitur
+    return repr((sorted(params.items()), list(feature_names)))
+
+
+def _stat_json(stat):
+    return [list(item) for item in stat]
+
+
+def load_model(database, params=RF_PARAMS, feature_names=FEATURE_NAMES):
+    """Mengembalikan (model, jumlah_data) dari cache, atau None jika harus dilatih ulang"""
+    path = model_path(database)
+    if not os.path.exists(path) or not os.path.exists(database):
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            entry = pickle.load(f)
+    except Exception:
+        return None
+
+    if entry.get("params_key") != _params_key(params, feature_names):
+        return None
+
+    # Cek cepat dengan mtime + ukuran; jika berbeda, baru bandingkan hash isi file
+    stat = _stat_key(database)
+    if stat != entry.get("stat"):
+        if _file_hash(database) != entry.get("sha256"):
+            return None
+        # Isi sama (misalnya file hanya disalin ulang), perbarui stat agar cek berikutnya cepat
+        entry["stat"] = stat
+        try:
+            _write_entry(path, entry)
+        except OSError:
+            pass
+
+    return entry["model"], entry["n_rows"]
+
+
+def load_forest(database, params=RF_PARAMS, feature_names=FEATURE_NAMES):
+    """(FlatForest, jumlah_data) dari file .forest.npz (tanpa sklearn), atau None jika belum ada/usang"""
+    from flat_forest import load_forest as load_npz, save_forest as save_npz
+
+    path = forest_path(database)
+    if not os.path.exists(path) or not os.path.exists(database):
+        return None
+
+    try:
+        forest, meta = load_npz(path)
+    except Exception:
+        return None
+
+    if meta.get("params_key") != _forest_params_key(params, feature_names):
+        return None
+
+    # Cek cepat dengan mtime + ukuran; jika berbeda, baru bandingkan hash isi file
+    stat = _stat_key(database)
+    if _stat_json(stat) != meta.get("stat"):
+        if _file_hash(database) != meta.get("sha256"):
+            return None
+        meta["stat"] = _stat_json(stat)
+        try:
+            _write_forest(path, forest, meta, save_npz)
+        except OSError:
+            pass
+
+    return forest, meta["n_rows"]
+
+
+def database_fingerprint(database):
+    """Sidik isi database; diambil SEBELUM database dibaca untuk pelatihan"""
+    return _stat_key(database), _file_hash(database)
+
+
+def save_model(database, fingerprint, model, n_rows, params=RF_PARAMS, feature_names=FEATURE_NAMES):
+    """Menyimpan model terlatih beserta sidik database yang dipakai melatihnya"""
+    # Jika database bertambah di antara pengambilan sidik dan pembacaan, sidik lama
+    # tidak akan cocok lagi sehingga model dilatih ulang pada pemanggilan berikutnya.
+    stat, sha256 = fingerprint
+    entry = {
+        "params_key": _params_key(params, feature_names),
+        "stat": stat,
+        "sha256": sha256,
+        "n_rows": n_rows,
+        "model": model,
+    }
+    try:
+        _write_entry(model_path(database), entry)
+    except OSError as e:
+        # Gagal menyimpan cache tidak boleh menggagalkan diagnosa
+        print(f"Cache model tidak tersimpan: {e}")
+    save_forest(database, fingerprint, model, n_rows, params, feature_names)
+
+
+def save_forest(database, fingerprint, model, n_rows, params=RF_PARAMS, feature_names=FEATURE_NAMES):
+    """Menyimpan salinan datar model (flat_forest.py) untuk inferensi tanpa sklearn"""
+    from flat_forest import export_forest, save_forest as save_npz
+
+    stat, sha256 = fingerprint
+    meta = {"params_key": _forest_params_key(params, feature_names), "stat": _stat_json(stat),
+            "sha256": sha256, "n_rows": n_rows}
+    try:
+        _write_forest(forest_path(database), export_forest(model), meta, save_npz)
+    except OSError as e:
+        print(f"Forest datar tidak tersimpan: {e}")
+
+
+def _write_entry(path, entry):
+    # Tulis ke file sementara lalu ganti, agar pembaca tidak melihat file setengah jadi
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _write_forest(path, forest, meta, save_npz):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        save_npz(f, forest, meta)
+    os.replace(tmp_path, path)
+
+
+def remove_model(database):
+    """Menghapus cache model dan forest datarnya (dipakai saat database direset)"""
+    for path in (model_path(database), forest_path(database)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# ==========================================================
+# MODEL SIAP PAKAI UNTUK DIAGNOSA (FOREST DATAR DI MEMORI)
+# ==========================================================
+def check_pipeline(database):
+    """(error, peringatan) asal fitur di database dibanding pipeline saat ini; (None, None) jika cocok
+
+    Fitur yang dihitung dengan parameter/algoritma lain (mis. sebelum inisialisasi
+    k-means GMM diubah) tidak boleh dicampur dengan fitur citra baru: model
+    ditolak. Baris tanpa sidik (CSV lama) hanya diberi peringatan.
+    """
+    import feature_store
+    from pipeline import feature_fingerprint
+
+    stamps = feature_store.pipelines(database)
+    current = feature_fingerprint()
+    if any(stamp not in (current, feature_store.UNKNOWN_PIPELINE) for stamp in stamps):
+        return ("Database berisi fitur dari versi pipeline lain. Kosongkan database lalu "
+                "training ulang (atau impor CSV yang dibuat dengan pipeline ini)."), None
+    if feature_store.UNKNOWN_PIPELINE in stamps:
+        return None, ("Peringatan: sebagian fitur di database tidak tercatat versi pipeline-nya "
+                      "(CSV lama); hasil diagnosa bisa bergeser jika fitur dihitung dengan versi lain.")
+    return None, None
+
+
+def fitted_forest(database):
+    """(FlatForest, jumlah data) yang tetap di memori selama database belum berubah; (None, pesan) jika belum bisa
+
+    Dipakai worker, diagnosa folder dan layanan HTTP. Model dimuat dari file .forest.npz
+    tanpa sklearn; sklearn dan pandas hanya diimpor jika model harus dilatih ulang.
+    """
+    import feature_store
+
+    with _fitted_lock:
+        stamp = feature_store.stat_stamp(database)
+        cached = _fitted.get(database)
+        if cached is not None and cached[0] == stamp:
+            return cached[1:]
+
+        if feature_store.row_count(database) == 0:
+            return None, "Database masih kosong. Harap Training data dulu."
+        error, warning = check_pipeline(database)
+        if error:
+            return None, error
+        if warning:
+            print(warning, file=sys.stderr)
+
+        result = load_forest(database)
+        if result is None:
+            try:
+                import pandas as pd
+                from sklearn.ensemble import RandomForestClassifier
+                from flat_forest import export_forest
+
+                fingerprint = database_fingerprint(database)
+                X, y = feature_store.training_data(database, FEATURE_NAMES)
+                if len(y) < 5:
+                    return None, "Data di database minimal 5 sampel untuk mulai belajar."
+                model = RandomForestClassifier(**RF_PARAMS)
+                model.fit(pd.DataFrame(X, columns=FEATURE_NAMES), y)
+                save_model(database, fingerprint, model, len(y)) # Pickle sklearn + .forest.npz
+                result = export_forest(model), len(y)
+            except Exception as e:
+                return None, f"Error membaca database: {e}"
+
+        # Stamp diambil ulang: row_count bisa baru saja membuat store dari CSV lama
+        _fitted[database] = (feature_store.stat_stamp(database),) + tuple(result)
+        return result
@@ -0,0 +1,210 @@
+import cv2
+import numpy as np
+
+# ==========================================================
+# KERNEL FITUR TEKSTUR GLCM
+# ==========================================================
+# Pengganti graycomatrix + 4x graycoprops dari skimage. Semua pasangan piksel
+# (i, j) dihitung dalam satu histogram 2-D, lalu keempat properti dihitung
+# sekaligus dari matriks yang sama memakai bobot (i-j)^2 dan 1/(1+(i-j)^2)
+# yang disiapkan sekali per jumlah levels.
+
+PROPS = ("contrast", "homogeneity", "energy", "correlation")
+
+CALCHIST_EXACT = 1 << 24 # Batas jumlah piksel per panggilan calcHist yang masih eksak (float32)
+
+_weights_cache = {}
+
+
+def _weights(levels):
+    if levels not in _weights_cache:
+        i, j = np.ogrid[0:levels, 0:levels]
+        diff2 = ((i - j) ** 2).astype(np.float64)
+        _weights_cache[levels] = (diff2, 1.0 / (1.0 + diff2))
+    return _weights_cache[levels]
+
+
+def quantize(img, levels=256):
+    """Mengurangi jumlah level keabuan citra uint8 (256 -> 64/32/...)"""
+    if levels == 256:
+        return img
+    return (img // (256 // levels)).astype(np.uint8)
+
+
+def offset(distance, angle):
+    """Pergeseran (baris, kolom) untuk jarak & sudut (radian), sama seperti skimage"""
+    return int(round(np.sin(angle) * distance)), int(round(np.cos(angle) * distance))
+
+
+def cooccurrence(img_q, row, col, levels, buffers=None, chunk_pixels=None):
+    """Matriks co-occurrence (jumlah pasangan, belum simetris) untuk satu offset
+
+    chunk_pixels membatasi memori kerja: pasangan piksel dihitung per pita baris.
+    """
+    rows, cols = img_q.shape
+    r0, r1 = max(0, -row), rows - max(0, row)
+    c0, c1 = max(0, -col), cols - max(0, col)
+    first = img_q[r0:r1, c0:c1]
+    second = img_q[r0 + row:r1 + row, c0 + col:c1 + col]
+
+    # cv2.calcHist 2-D menghitung semua pasangan (i, j) dalam satu lintasan. Hasilnya
+    # float32, yang hanya eksak sampai 2^24 per bin; citra sangat besar (dan mode hemat
+    # memori) dihitung per pita baris lalu dijumlahkan sebagai int64 tanpa salinan penuh.
+    if chunk_pixels or first.size >= CALCHIST_EXACT:
+        band = max(1, min(chunk_pixels or CALCHIST_EXACT, CALCHIST_EXACT - 1) // max(1, first.shape[1]))
+        counts = np.zeros((levels, levels), dtype=np.int64)
+        for r in range(0, first.shape[0], band):
+            counts += _pair_histogram(first[r:r + band], second[r:r + band], levels)
+        return counts
+
+    if buffers is not None:
+        # Salin pasangan piksel ke buffer yang sama untuk setiap offset (tanpa alokasi baru)
+        n = first.size
+        first_buf = buffers[0][:n].reshape(first.shape)
+        second_buf = buffers[1][:n].reshape(second.shape)
+        np.copyto(first_buf, first)
+        np.copyto(second_buf, second)
+        first, second = first_buf, second_buf
+    return _pair_histogram(first, second, levels)
+
+
+def _pair_histogram(first, second, levels):
+    counts = cv2.calcHist([np.ascontiguousarray(first), np.ascontiguousarray(second)],
+                          [0, 1], None, [levels, levels], [0, levels, 0, levels])
+    return counts.astype(np.int64)
+
+
+def glcm_props(counts, symmetric=True):
+    """Contrast, homogeneity, energy, correlation dari matriks co-occurrence"""
+    levels = counts.shape[0]
+    glcm = counts + counts.T if symmetric else counts
+    total = glcm.sum()
+    if total == 0:
+        return {"contrast": 0.0, "homogeneity": 0.0, "energy": 0.0, "correlation": 1.0}
+    P = glcm / total
+
+    diff2, inv_diff = _weights(levels)
+    idx = np.arange(levels, dtype=np.float64)
+    p_i = P.sum(axis=1)
+    p_j = P.sum(axis=0)
+    mean_i = np.dot(idx, p_i)
+    mean_j = np.dot(idx, p_j)
+    std_i = np.sqrt(np.dot((idx - mean_i) ** 2, p_i))
+    std_j = np.sqrt(np.dot((idx - mean_j) ** 2, p_j))
+    cov = np.dot(idx - mean_i, P @ (idx - mean_j))
+
+    # Sama seperti skimage: korelasi = 1 untuk citra yang seragam (std ~ 0)
+    if std_i < 1e-15 or std_j < 1e-15:
+        correlation = 1.0
+    else:
+        correlation = cov / (std_i * std_j)
+
+    return {
+        "contrast": np.sum(P * diff2),
+        "homogeneity": np.sum(P * inv_diff),
+        "energy": np.sqrt(np.sum(P * P)),
+        "correlation": correlation,
+    }
+
+
+def glcm_features(img, distance=1, angle=0, levels=256, symmetric=True, chunk_pixels=None):
+    """Empat fitur GLCM satu offset; levels < 256 = mode terkuantisasi (lebih ringan)"""
+    row, col = offset(distance, angle)
+    return glcm_props(cooccurrence(quantize(img, levels), row, col, levels, chunk_pixels=chunk_pixels), symmetric)
+
+
+# ==========================================================
+# BANK FITUR GLCM (MULTI JARAK x MULTI SUDUT)
+# ==========================================================
+# GLCM satu arah (0 derajat) bias terhadap orientasi trabekula. Bank fitur
+# menghitung grid jarak x sudut dari satu citra terkuantisasi yang sama, dengan
+# buffer pasangan piksel yang dipakai ulang untuk setiap offset, ditambah
+# ringkasan invarian rotasi (rata-rata dan rentang antar sudut) per jarak.
+
+def feature_bank_names(distances, angles):
+    """Nama kolom bank fitur, urutannya sama dengan hasil glcm_feature_bank"""
+    names = []
+    for d in distances:
+        names += [f"glcm_{prop}_d{d}_a{a}" for a in angles for prop in PROPS]
+        names += [f"glcm_{prop}_d{d}_{stat}" for stat in ("mean", "range") for prop in PROPS]
+    return names
+
+
+def glcm_feature_bank(img, distances=(1, 2, 3), angles=(0, 45, 90, 135), levels=256, symmetric=True,
+                      chunk_pixels=None):
+    """Fitur GLCM untuk setiap jarak x sudut (derajat) + rata-rata & rentang antar sudut"""
+    img_q = quantize(img, levels)
+    # Mode hemat memori menghitung per pita baris, jadi buffer seukuran citra tidak perlu
+    buffers = None if chunk_pixels else (np.empty(img_q.size, dtype=np.uint8), np.empty(img_q.size, dtype=np.uint8))
+
+    features = {}
+    for d in distances:
+        per_angle = {prop: [] for prop in PROPS}
+        for a in angles:
+            row, col = offset(d, np.deg2rad(a))
+            props = glcm_props(cooccurrence(img_q, row, col, levels, buffers, chunk_pixels), symmetric)
+            for prop in PROPS:
+                per_angle[prop].append(props[prop])
+                features[f"glcm_{prop}_d{d}_a{a}"] = props[prop]
+
+        for prop in PROPS:
+            features[f"glcm_{prop}_d{d}_mean"] = float(np.mean(per_angle[prop]))
+        for prop in PROPS:
+            features[f"glcm_{prop}_d{d}_range"] = float(np.ptp(per_angle[prop]))
+    return features
+
+
+# ==========================================================
+# CEK KESETARAAN DENGAN SKIMAGE
+# ==========================================================
+# Pada 256 level, matriks co-occurrence identik dengan graycomatrix; selisih
+# hanya berasal dari urutan penjumlahan floating point (galat relatif ~1e-16).
+RELATIVE_TOLERANCE = 1e-10
+
+
+def compare_with_skimage(img, distance=1, angle=0, levels=256):
+    """Selisih relatif maksimum glcm_features vs graycomatrix + graycoprops"""
+    from skimage.feature import graycomatrix, graycoprops
+
+    img_q = quantize(img, levels)
+    glcm = graycomatrix(img_q, distances=[distance], angles=[angle], levels=levels, symmetric=True, normed=True)
+    ours = glcm_features(img, distance, angle, levels)
+    diff = {}
+    for prop in ("contrast", "homogeneity", "energy", "correlation"):
+        ref = graycoprops(glcm, prop)[0, 0]
+        diff[prop] = abs(ours[prop] - ref) / max(abs(ref), 1e-300)
+    return diff
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import os
+    import sys
+
+    parser = argparse.ArgumentParser(description="Cek kesetaraan kernel GLCM vs skimage graycoprops")
+    parser.add_argument("paths", nargs="+", help="File gambar atau folder")
+    parser.add_argument("--levels", type=int, default=256, help="Jumlah level keabuan (256/64/32)")
+    args = parser.parse_args()
+
+    files = []
+    for p in args.paths:
+        if os.path.isdir(p):
+            files += sorted(f for f in glob.glob(os.path.join(p, "**", "*"), recursive=True) if os.path.isfile(f))
+        else:
+            files.append(p)
+
+    n_total, n_fail = 0, 0
+    for path in files:
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None: continue
+        n_total += 1
+
+        diff = compare_with_skimage(img, levels=args.levels)
+        worst = max(diff.values())
+        ok = worst <= RELATIVE_TOLERANCE
+        n_fail += not ok
+        print(f"{'OK  ' if ok else 'BEDA'} {os.path.basename(path)}: selisih relatif maks {worst:.2e}")
+
+    print(f"\n{n_total - n_fail}/{n_total} citra sesuai toleransi.")
+    sys.exit(1 if n_fail else 0)
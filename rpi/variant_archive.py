@@ -0,0 +1,190 @@
+import glob
+import os
+import zipfile
+
+import cv2
+import numpy as np
+
+from augmentasi import augment_variants, variant_name, variant_params
+from pipeline import extract_features_array, normalize_label
+
+# ==========================================================
+# ARSIP VARIASI AUGMENTASI (SHARD .NPZ)
+# ==========================================================
+# Pengganti ribuan file JPEG kecil di folder variasi/. Satu arsip = satu
+# folder berisi shard-0000.npz, shard-0001.npz, ... Setiap shard adalah file
+# .npz biasa (zip, kompresi deflate tanpa kehilangan data) berisi citra
+# variasi grayscale uint8 (v00000, v00001, ...) dan tabel "index" berisi
+# sumber, label, flip, sudut dan zoom setiap variasi. Sumber = path gambar
+# relatif terhadap folder dataset (mis. "Normal/12.png"), karena folder label
+# yang berbeda sering berisi nama file yang sama. np.load membaca anggota
+# zip satu per satu, jadi satu variasi bisa diambil tanpa membongkar shard.
+#
+# Shard ditulis ke file sementara dan baru diganti nama setelah tabel index
+# selesai ditulis, sehingga shard yang setengah jadi tidak pernah terbaca.
+#
+# Contoh:
+#   python variant_archive.py ../data-uji variasi.arsip
+
+SHARD_SIZE = 300 # Jumlah variasi per shard (10 gambar x 30 variasi)
+SHARD_PATTERN = "shard-{:04d}.npz"
+
+INDEX_DTYPE = np.dtype([
+    ("member", "U8"), ("source", "U255"), ("label", "U16"),
+    ("flip", "?"), ("angle", "i2"), ("zoom_pct", "i2"),
+])
+
+
+def is_archive(path):
+    """True jika folder berisi shard arsip variasi"""
+    return os.path.isdir(path) and bool(shard_paths(path))
+
+
+def shard_paths(archive_dir):
+    return sorted(glob.glob(os.path.join(archive_dir, SHARD_PATTERN.replace("{:04d}", "[0-9]" * 4))))
+
+
+def _zoom_pct(zoom):
+    return int(round(zoom * 100))
+
+
+class _ShardWriter:
+    """Menulis satu shard: citra langsung masuk zip satu per satu, index di akhir"""
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.zf = zipfile.ZipFile(self.tmp_path, mode="w", compression=zipfile.ZIP_DEFLATED)
+        self.rows = []
+
+    def add(self, img, source, label, flip, angle, zoom):
+        member = f"v{len(self.rows):05d}"
+        with self.zf.open(member + ".npy", mode="w", force_zip64=True) as f:
+            np.lib.format.write_array(f, np.ascontiguousarray(img), allow_pickle=False)
+        self.rows.append((member, source, label, flip, angle, _zoom_pct(zoom)))
+
+    def close(self):
+        with self.zf.open("index.npy", mode="w") as f:
+            np.lib.format.write_array(f, np.array(self.rows, dtype=INDEX_DTYPE), allow_pickle=False)
+        self.zf.close()
+        os.replace(self.tmp_path, self.path)
+        return len(self.rows)
+
+
+def source_name(path, root):
+    """Nama sumber di index: path relatif terhadap root dengan pemisah '/' (mis. 'Normal/12.png')"""
+    return os.path.relpath(os.path.abspath(path), root).replace(os.sep, "/")
+
+
+def write_archive(jobs, archive_dir, params=None, shard_size=SHARD_SIZE, progress=None, root=None):
+    """Menulis semua variasi dari daftar (path, label) ke shard baru; jumlah variasi yang ditulis
+
+    Label boleh None: diambil dari nama folder gambar jika dikenali (Normal/...).
+    root = folder acuan nama sumber; bawaan folder induk bersama semua gambar.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    next_shard = len(shard_paths(archive_dir))
+    params = params or variant_params()
+    if root is None and jobs:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path, _ in jobs])
+
+    writer = None
+    written = 0
+    for i, (path, label) in enumerate(jobs):
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is not None:
+            if label is None:
+                label = normalize_label(os.path.basename(os.path.dirname(path))) or ""
+            if writer is None:
+                writer = _ShardWriter(os.path.join(archive_dir, SHARD_PATTERN.format(next_shard)))
+                next_shard += 1
+            source = source_name(path, root)
+            for (flip, angle, zoom), variant in augment_variants(img, params):
+                writer.add(variant, source, label, flip, angle, zoom)
+
+            # Semua variasi satu gambar selalu berada di shard yang sama
+            if len(writer.rows) >= shard_size:
+                written += writer.close()
+                writer = None
+        if progress:
+            progress(i + 1, len(jobs))
+
+    if writer is not None:
+        written += writer.close()
+    return written
+
+
+# ==========================================================
+# PEMBACAAN
+# ==========================================================
+def read_index(shard_path):
+    """Tabel index satu shard (array terstruktur INDEX_DTYPE)"""
+    with np.load(shard_path, allow_pickle=False) as npz:
+        return npz["index"]
+
+
+def archive_index(archive_dir):
+    """Indeks (sumber, flip, sudut, zoom%) -> (path shard, nama anggota) seluruh arsip"""
+    index = {}
+    for shard_path in shard_paths(archive_dir):
+        for row in read_index(shard_path):
+            key = (str(row["source"]), bool(row["flip"]), int(row["angle"]), int(row["zoom_pct"]))
+            index[key] = (shard_path, str(row["member"]))
+    return index
+
+
+def load_variant(archive_dir, source, flip, angle, zoom, index=None):
+    """Satu citra variasi (akses acak); index dari archive_index boleh dipakai ulang"""
+    index = index or archive_index(archive_dir)
+    shard_path, member = index[(source, bool(flip), int(angle), _zoom_pct(zoom))]
+    with np.load(shard_path, allow_pickle=False) as npz:
+        return npz[member]
+
+
+def iter_shard(shard_path):
+    """Generator (baris index, citra) untuk semua variasi dalam satu shard"""
+    with np.load(shard_path, allow_pickle=False) as npz:
+        for row in npz["index"]:
+            yield row, npz[str(row["member"])]
+
+
+def shard_feature_rows(shard_path, n_clusters=3, feature_bank=False, default_label=None):
+    """Baris database [nama, fitur..., label] untuk semua variasi satu shard"""
+    rows = []
+    for row, img in iter_shard(shard_path):
+        label = str(row["label"]) or default_label
+        if not label:
+            continue # Tanpa label tidak bisa dipakai melatih
+        zoom = int(row["zoom_pct"]) / 100
+        name = variant_name(str(row["source"]), bool(row["flip"]), int(row["angle"]), zoom)
+        features = extract_features_array(img, n_clusters=n_clusters, feature_bank=feature_bank)
+        rows.append([name] + list(features) + [label])
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from train_folder import collect_labelled_images
+
+    parser = argparse.ArgumentParser(description="Membuat arsip variasi augmentasi dari folder berlabel")
+    parser.add_argument("folders", nargs="+", help="Folder dataset, mis. ../data-uji")
+    parser.add_argument("output", help="Folder arsip tujuan, mis. variasi.arsip")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="Jumlah variasi per shard")
+    args = parser.parse_args()
+
+    jobs = []
+    for folder in args.folders:
+        jobs += collect_labelled_images(folder)
+    if not jobs:
+        print("Tidak ada gambar berlabel yang ditemukan.")
+        sys.exit(1)
+
+    def show_progress(done, total):
+        print(f"\rMemproses {done}/{total}...", end="", flush=True)
+
+    # Nama sumber relatif terhadap folder dataset (diawali nama foldernya jika lebih dari satu)
+    root = os.path.commonpath([os.path.abspath(folder) for folder in args.folders])
+    n = write_archive(jobs, args.output, shard_size=args.shard_size, progress=show_progress, root=root)
+    print(f"\nSelesai! {n} variasi ditulis ke {args.output} ({len(shard_paths(args.output))} shard).")
@@ -0,0 +1,284 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import feature_cache
+from pipeline import decode_bytes, pipeline_fingerprint, preprocess_array, segment_and_extract
+
+# ==========================================================
+# AUGMENTASI CITRA DI MEMORI (TANPA GUI)
+# ==========================================================
+# Variasi (flip x rotasi x zoom) dibuat langsung dari citra yang sudah
+# di-decode dan dialirkan ke preprocessing + ekstraksi fitur, tanpa menulis
+# lalu membaca ulang 30 file JPEG per gambar (yang juga menambah artefak
+# kompresi). Menyimpan variasi ke folder tetap bisa, tetapi opsional.
+#
+# Flip, rotasi dan zoom digabung menjadi satu matriks affine 2x3 sehingga
+# setiap variasi cukup satu kali warpAffine ke buffer yang sudah disiapkan,
+# bukan tiga lintasan yang masing-masing membuat citra baru. rotate_image dan
+# zoom_image tetap ada sebagai acuan (lihat cek di bagian bawah file).
+
+FLIPS = (False, True)
+ROTATIONS = (-10, -5, 0, 5, 10)
+ZOOMS = (0.95, 1.0, 1.05)
+
+
+def rotate_image(image, angle):
+    """Memutar gambar tanpa menyisakan ruang hitam (Auto-Crop)"""
+    h, w = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w/2, h/2), angle, 1.0)
+
+    # Menghitung sin dan cos dari sudut rotasi
+    abs_cos = abs(matrix[0, 0])
+    abs_sin = abs(matrix[0, 1])
+
+    # Menghitung lebar dan tinggi baru agar tidak terpotong
+    new_w = int(h * abs_sin + w * abs_cos)
+    new_h = int(h * abs_cos + w * abs_sin)
+
+    # Menyesuaikan matriks rotasi ke pusat yang baru
+    matrix[0, 2] += (new_w - w) / 2
+    matrix[1, 2] += (new_h - h) / 2
+
+    rotated = cv2.warpAffine(image, matrix, (new_w, new_h), borderMode=cv2.BORDER_REPLICATE)
+
+    # Kembalikan ke ukuran asli (cropping center) agar dimensi tetap konsisten
+    start_x = (new_w - w) // 2
+    start_y = (new_h - h) // 2
+    return rotated[start_y:start_y+h, start_x:start_x+w]
+
+def zoom_image(image, zoom_factor):
+    """Melakukan zoom in atau zoom out pada gambar"""
+    h, w = image.shape[:2]
+
+    if zoom_factor == 1.0:
+        return image
+
+    # Mengubah ukuran gambar
+    new_h, new_w = int(h * zoom_factor), int(w * zoom_factor)
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    if zoom_factor > 1.0:
+        # Zoom In: Potong bagian tengah agar ukuran kembali ke asli
+        start_x = (new_w - w) // 2
+        start_y = (new_h - h) // 2
+        return resized[start_y:start_y+h, start_x:start_x+w]
+    else:
+        # Zoom Out: Tambahkan padding agar ukuran kembali ke asli
+        pad_h = (h - new_h) // 2
+        pad_w = (w - new_w) // 2
+        # Menggunakan BORDER_REPLICATE agar pinggiran terlihat natural seperti X-ray
+        return cv2.copyMakeBorder(resized, pad_h, h-new_h-pad_h, pad_w, w-new_w-pad_w,
+                                  cv2.BORDER_REPLICATE)
+
+
+def augment_image_multipass(image, flip, angle, zoom):
+    """Satu variasi dengan cara lama: flip, lalu rotate_image, lalu zoom_image"""
+    img_processed = cv2.flip(image, 1) if flip else image
+    if angle != 0:
+        img_processed = rotate_image(img_processed, angle)
+    if zoom != 1.0:
+        img_processed = zoom_image(img_processed, zoom)
+    return img_processed
+
+
+def variant_matrix(w, h, flip, angle, zoom):
+    """Matriks affine 2x3 (koordinat sumber -> hasil) = zoom . rotasi . flip"""
+    matrix = np.eye(3)
+    if flip:
+        # cv2.flip(img, 1): kolom x -> w-1-x
+        matrix = np.array([[-1.0, 0.0, w - 1], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]) @ matrix
+    if angle != 0:
+        # Sama dengan rotate_image: rotasi di pusat citra; kanvas diperbesar lalu
+        # dipotong di tengah, yang tersisa hanya pergeseran pembulatan setengah piksel
+        rot = cv2.getRotationMatrix2D((w/2, h/2), angle, 1.0)
+        abs_cos, abs_sin = abs(rot[0, 0]), abs(rot[0, 1])
+        new_w = int(h * abs_sin + w * abs_cos)
+        new_h = int(h * abs_cos + w * abs_sin)
+        rot[0, 2] += (new_w - w) / 2 - (new_w - w) // 2
+        rot[1, 2] += (new_h - h) / 2 - (new_h - h) // 2
+        matrix = np.vstack([rot, [0.0, 0.0, 1.0]]) @ matrix
+    if zoom != 1.0:
+        # Sama dengan zoom_image: cv2.resize (piksel tengah ke piksel tengah), lalu
+        # dipotong (zoom in) atau diberi padding (zoom out) di tengah
+        new_w, new_h = int(w * zoom), int(h * zoom)
+        sx, sy = new_w / w, new_h / h
+        if zoom > 1.0:
+            off_x, off_y = -((new_w - w) // 2), -((new_h - h) // 2)
+        else:
+            off_x, off_y = (w - new_w) // 2, (h - new_h) // 2
+        scale = np.array([[sx, 0.0, 0.5 * sx - 0.5 + off_x], [0.0, sy, 0.5 * sy - 0.5 + off_y], [0.0, 0.0, 1.0]])
+        matrix = scale @ matrix
+    return matrix[:2]
+
+
+def augment_image(image, flip, angle, zoom, out=None):
+    """Satu variasi dalam satu warpAffine; out = buffer hasil yang dipakai ulang (opsional)
+
+    Variasi identitas mengembalikan image itu sendiri (tanpa salinan) dan flip saja
+    memakai cv2.flip, jadi hasilnya bisa berupa image: perlakukan sebagai hanya-baca.
+    """
+    if angle == 0 and zoom == 1.0:
+        # Tanpa interpolasi: hasil sama persis dengan warpAffine, tanpa biaya per piksel
+        return cv2.flip(image, 1, dst=out) if flip else image
+    h, w = image.shape[:2]
+    return cv2.warpAffine(image, variant_matrix(w, h, flip, angle, zoom), (w, h), dst=out,
+                          flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def variant_params(flips=FLIPS, rotations=ROTATIONS, zooms=ZOOMS):
+    """Semua kombinasi (flip, sudut, zoom); bawaan 2 x 5 x 3 = 30 variasi"""
+    return [(flip, angle, zoom) for flip in flips for angle in rotations for zoom in zooms]
+
+
+def variant_tag(flip, angle, zoom):
+    """Penanda variasi pada nama file, mis. 'hz-flip-rot-5-zoom-105'"""
+    flip_tag = "hz-flip" if flip else "no-flip"
+    return f"{flip_tag}-rot-{angle}-zoom-{int(zoom*100)}"
+
+
+def variant_name(source_name, flip, angle, zoom):
+    """Nama baris database untuk satu variasi dari file sumber"""
+    # Variasi identitas sama persis dengan gambar aslinya, jadi memakai nama
+    # asli agar tidak tersimpan dua kali di database.
+    if (flip, angle, zoom) == (False, 0, 1.0):
+        return source_name
+    return f"{os.path.splitext(source_name)[0]}-{variant_tag(flip, angle, zoom)}.jpg"
+
+
+def augment_variants(image, params=None):
+    """Generator (flip, sudut, zoom), citra variasi dari satu citra yang sudah di-decode
+
+    Semua variasi ditulis ke SATU buffer yang sama (variasi identitas = image itu
+    sendiri): pakai (atau salin) citranya sebelum mengambil variasi berikutnya.
+    """
+    out = np.empty_like(image)
+    for flip, angle, zoom in params or variant_params():
+        yield (flip, angle, zoom), augment_image(image, flip, angle, zoom, out)
+
+
+def save_variants(image, base_name, output_folder, params=None, workers=None):
+    """Menyimpan semua variasi sebagai JPEG secara paralel; jumlah file yang ditulis"""
+    # warpAffine dan imwrite melepas GIL, jadi thread pool sudah cukup. Setiap
+    # thread memakai buffer hasilnya sendiri.
+    local = threading.local()
+
+    def render_and_save(param):
+        if getattr(local, "out", None) is None:
+            local.out = np.empty_like(image)
+        variant = augment_image(image, *param, out=local.out)
+        filename = f"{base_name}-{variant_tag(*param)}.jpg"
+        return cv2.imwrite(os.path.join(output_folder, filename), variant)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        return sum(executor.map(render_and_save, params or variant_params()))
+
+
+def augmented_feature_rows(image_path, diagnosis_label, n_clusters=3, feature_bank=False,
+                           params=None, workers=None):
+    """Generator baris database untuk semua variasi satu gambar (cukup satu kali decode)
+
+    Variasi diproses paralel di thread pool seperti save_variants; urutan baris tetap
+    urutan params. workers=1 untuk pemanggil yang sudah berjalan di pool proses.
+    """
+    with open(image_path, "rb") as f:
+        data = f.read()
+    img = decode_bytes(data) # Cache citra memmap: putaran augmentasi berikutnya tanpa decode JPEG
+    if img is None: return
+
+    fingerprint = pipeline_fingerprint(n_clusters, feature_bank)
+    local = threading.local()
+
+    def variant_row(param):
+        # Variasi identitas memakai kunci cache gambar aslinya; variasi lain
+        # memakai isi file sumber + parameter variasi.
+        name = variant_name(os.path.basename(image_path), *param)
+        if param == (False, 0, 1.0):
+            key = feature_cache.image_key(data, fingerprint)
+        else:
+            key = feature_cache.image_key(data, fingerprint + repr(tuple(param)))
+        features = feature_cache.get_features(key)
+        if features is None:
+            # warpAffine, CLAHE dan sebagian besar GMM/GLCM melepas GIL; buffer variasi per thread
+            if getattr(local, "out", None) is None:
+                local.out = np.empty(img.shape, img.dtype)
+            variant = augment_image(img, *param, out=local.out)
+            # Buffer variasi milik thread ini boleh ditimpa preprocessing; citra asli
+            # (variasi identitas, mungkin memmap cache hanya-baca) tidak
+            inplace = variant is local.out
+            _, features = segment_and_extract(preprocess_array(variant, inplace=inplace),
+                                              n_clusters=n_clusters, feature_bank=feature_bank)
+            feature_cache.put_features(key, features)
+        return [name] + list(features) + [diagnosis_label]
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        yield from executor.map(variant_row, params or variant_params())
+
+
+# ==========================================================
+# CEK HASIL & KECEPATAN VS CARA LAMA (3 LINTASAN)
+# ==========================================================
+# Satu kali interpolasi (bukan dua) membuat nilai piksel sedikit berbeda;
+# selisih rata-rata di bagian dalam citra harus tetap di bawah toleransi.
+# Pinggiran zoom out diabaikan karena diisi replikasi tepi citra sumber,
+# bukan tepi citra yang sudah diputar.
+MEAN_ABS_TOLERANCE = 1.5
+
+
+def compare_with_multipass(image, params=None):
+    """(selisih rata-rata maksimum di bagian dalam, waktu lama, waktu baru) untuk satu citra"""
+    import time
+
+    h, w = image.shape[:2]
+    margin_y, margin_x = int(h * 0.05) + 2, int(w * 0.05) + 2
+    out = np.empty_like(image)
+    worst, t_old, t_new = 0.0, 0.0, 0.0
+    for param in params or variant_params():
+        start = time.perf_counter()
+        ref = augment_image_multipass(image, *param)
+        t_old += time.perf_counter() - start
+        start = time.perf_counter()
+        new = augment_image(image, *param, out=out)
+        t_new += time.perf_counter() - start
+        diff = np.abs(ref.astype(np.int16) - new)[margin_y:h-margin_y, margin_x:w-margin_x]
+        worst = max(worst, float(diff.mean()))
+    return worst, t_old, t_new
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import sys
+
+    parser = argparse.ArgumentParser(description="Cek augmentasi satu warpAffine vs flip+rotasi+zoom terpisah")
+    parser.add_argument("paths", nargs="+", help="File gambar atau folder")
+    args = parser.parse_args()
+
+    files = []
+    for p in args.paths:
+        if os.path.isdir(p):
+            files += sorted(f for f in glob.glob(os.path.join(p, "**", "*"), recursive=True) if os.path.isfile(f))
+        else:
+            files.append(p)
+
+    n_total, n_fail, total_old, total_new = 0, 0, 0.0, 0.0
+    for path in files:
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None: continue
+        n_total += 1
+
+        worst, t_old, t_new = compare_with_multipass(img)
+        total_old += t_old
+        total_new += t_new
+        ok = worst <= MEAN_ABS_TOLERANCE
+        n_fail += not ok
+        print(f"{'OK  ' if ok else 'BEDA'} {os.path.basename(path)}: selisih rata-rata {worst:.3f}, "
+              f"{t_old*1000:.1f} ms -> {t_new*1000:.1f} ms")
+
+    if n_total:
+        print(f"\nTotal 30 variasi: {total_old:.2f} s -> {total_new:.2f} s ({total_old / max(total_new, 1e-9):.1f}x)")
+    print(f"{n_total - n_fail}/{n_total} citra sesuai toleransi.")
+    sys.exit(1 if n_fail else 0)
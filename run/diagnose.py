@@ -1,126 +1,187 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import cv2
-import numpy as np
-import pandas as pd
-from sklearn.mixture import GaussianMixture
-from sklearn.ensemble import RandomForestClassifier
-from skimage.feature import graycomatrix, graycoprops
-import matplotlib
-matplotlib.use('TkAgg')
-
-import matplotlib.pyplot as plt
 import os
 
-# ==========================================================
-# FUNGSI PRE-PROCESSING: CLAHE
-# ==========================================================
-def preprocess_image(image_path):
-    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-    if img is None: return None
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    improved_img = clahe.apply(img)
-    improved_img = cv2.GaussianBlur(improved_img, (3, 3), 0)
-    return improved_img
+from lazy_imports import BackgroundLoader
+import profiling
+from worker import WorkerClient
 
 # ==========================================================
-# FUNGSI EKSTRAKSI FITUR
+# PUSTAKA BERAT (DIMUAT DI LATAR BELAKANG)
 # ==========================================================
-def extract_features_complete(img, segmented_image):
-    # 1. Fitur Rasio dari GMM
-    pixels_padat = np.count_nonzero(segmented_image == 2)
-    pixels_berpori = np.count_nonzero(segmented_image == 1)
-    pixels_total = pixels_padat + pixels_berpori
-    rasio_pvb = pixels_padat / pixels_berpori if pixels_berpori > 0 else 0.0
-    rasio_pvt = pixels_padat / pixels_total if pixels_total > 0 else 0.0
-
-    # 2. Statistik & GLCM
-    mean_val = np.mean(img)
-    var_val = np.var(img)
-    glcm = graycomatrix(img, distances=[1], angles=[0], levels=256, symmetric=True, normed=True)
-    
-    return [
-        rasio_pvb, rasio_pvt,
-        graycoprops(glcm, 'contrast')[0, 0],
-        graycoprops(glcm, 'homogeneity')[0, 0],
-        graycoprops(glcm, 'energy')[0, 0],
-        graycoprops(glcm, 'correlation')[0, 0],
-        mean_val, var_val
-    ]
+# Jendela langsung muncul; matplotlib dan pipeline dimuat selama pengguna
+# memilih citra (lihat lazy_imports.py). sklearn dan pandas hanya diimpor jika
+# model harus dilatih ulang; prediksi memakai forest datar (flat_forest.py).
+def load_libraries():
+    global np, plt, segment_image
+    global preprocess_image, extract_features_complete, file_cache_key, fit_image_gmm, DIAGNOSE_IMAGE_CACHE
+    global get_features, put_features, FEATURE_NAMES, RF_PARAMS, check_pipeline, database_fingerprint, load_forest, save_model
+    global export_forest
+    global feature_store
+    global collect_inputs, diagnose_batch
+    import numpy as np
+    import matplotlib
+    matplotlib.use('TkAgg')
+    import matplotlib.pyplot as plt
+
+    from segmentasi import segment_image
+    from pipeline import (DIAGNOSE_IMAGE_CACHE, preprocess_image, extract_features_complete, file_cache_key,
+                          fit_image_gmm)
+    from feature_cache import get_features, put_features
+    from model_store import FEATURE_NAMES, RF_PARAMS, check_pipeline, database_fingerprint, load_forest, save_model
+    from flat_forest import export_forest
+    import feature_store
+    from diagnose_folder import collect_inputs, diagnose_batch
+
+libraries = BackgroundLoader(load_libraries)
+
+# Worker launcher (worker.py) yang menyimpan pustaka dan model tetap hangat;
+# jika jendela dibuka langsung tanpa launcher, diagnosa dihitung di proses ini.
+worker = WorkerClient()
 
 # ==========================================================
 # BAGIAN 1: TRAINING MODEL
 # ==========================================================
+@profiling.profiled("model")
 def train_ai_model():
-    filename = "database_fitur.csv"
-    if not os.path.exists(filename):
-        return None, "Database (CSV) tidak ditemukan. Harap Training data dulu."
+    filename = feature_store.DEFAULT_STORE
+    if feature_store.row_count(filename) == 0:
+        return None, "Database masih kosong. Harap Training data dulu."
+    error, warning = check_pipeline(filename)
+    if error:
+        return None, error
+    if warning:
+        print(warning)
+
+    # Pakai forest datar tersimpan (tanpa sklearn) jika isi database belum berubah
+    cached = load_forest(filename)
+    if cached is not None:
+        return cached
 
     try:
-        df = pd.read_csv(filename)
-        if len(df) < 5:
+        import pandas as pd
+        from sklearn.ensemble import RandomForestClassifier
+
+        fingerprint = database_fingerprint(filename)
+        X, y = feature_store.training_data(filename, FEATURE_NAMES)
+        if len(y) < 5:
             return None, "Data di database minimal 5 sampel untuk mulai belajar."
 
         # Memisahkan Fitur (X) dan Label Diagnosa (y)
-        X = df[['rasio_p_v_b', 'rasio_p_v_t', 'glcm_contrast', 'glcm_homogeneity', 
-                'glcm_energy', 'glcm_correlation', 'stat_mean', 'stat_variance']]
-        y = df['diagnosa']
+        X = pd.DataFrame(X, columns=FEATURE_NAMES)
 
-        model = RandomForestClassifier(n_estimators=100, random_state=42)
+        model = RandomForestClassifier(**RF_PARAMS)
         model.fit(X, y)
+        save_model(filename, fingerprint, model, len(y))
         
-        return model, len(df)
+        return export_forest(model), len(y)
     except Exception as e:
         return None, f"Error membaca database: {e}"
 
 # ==========================================================
 # BAGIAN 2: PROSES DIAGNOSA CITRA BARU
 # ==========================================================
-def start_diagnosis():
+def diagnose_local(file_path):
+    """Diagnosa di proses ini (tanpa worker); hasilnya berbentuk sama dengan job "diagnose" worker"""
     model, n_data = train_ai_model()
     if model is None:
-        messagebox.showwarning("Peringatan", n_data)
-        return
+        return {"warning": n_data}
+
+    # Setiap langkah diukur terpisah jika profil waktu diaktifkan (profiling.py)
+    with profiling.stage("preprocess"):
+        img = preprocess_image(file_path, DIAGNOSE_IMAGE_CACHE)
+    with profiling.stage("gmm_fit") as info:
+        gmm = fit_image_gmm(img, n_clusters=3)
+        info.update(profiling.gmm_info(gmm))
+    with profiling.stage("label"):
+        segmented_image, class_counts = segment_image(img, gmm)
+
+    # Ekstrak fitur (pakai cache jika gambar yang sama pernah diperiksa)
+    with profiling.stage("features") as info:
+        cache_key, _ = file_cache_key(file_path)
+        features_new = get_features(cache_key)
+        info["cache_hit"] = features_new is not None
+        if features_new is None:
+            features_new = extract_features_complete(img, segmented_image, class_counts)
+            put_features(cache_key, features_new)
+
+    # 4. PREDIKSI MENGGUNAKAN AI: label dan probabilitas dari satu penelusuran forest
+    with profiling.stage("predict"):
+        labels, proba = model.predict_with_proba([features_new])
+        diagnosa = labels[0]
+        probabilitas = np.max(proba[0]) * 100
+
+    return {"diagnosa": diagnosa, "probabilitas": probabilitas, "n_data": n_data,
+            "img": img, "segmented": segmented_image}
 
+def start_diagnosis():
+    # Citra dipilih dulu: selama dialog terbuka pustaka berat selesai dimuat di latar belakang
     file_path = filedialog.askopenfilename(title="Pilih Citra X-ray")
     if not file_path: return
 
-    try:
-        img = preprocess_image(file_path)
-        # Perbaikan: Tambahkan .astype(np.float64)
-        pixel_values = img.reshape(-1, 1).astype(np.float64)
-        gmm = GaussianMixture(n_components=3, random_state=42).fit(pixel_values)
-        labels = gmm.predict(pixel_values)
-
-        means = gmm.means_.flatten()
-        sorted_indices = np.argsort(means)
-        sorted_labels = np.zeros_like(labels)
-        for i, idx in enumerate(sorted_indices):
-            sorted_labels[labels == idx] = i
-        segmented_image = sorted_labels.reshape(img.shape)
-
-        # Urutan nama fitur untuk DataFrame
-        feature_names = [
-            'rasio_p_v_b', 'rasio_p_v_t', 'glcm_contrast', 'glcm_homogeneity',
-            'glcm_energy', 'glcm_correlation', 'stat_mean', 'stat_variance'
-        ]
-
-        # Ekstrak fitur
-        features_new = extract_features_complete(img, segmented_image)
-
-        # Perbaikan: Gunakan DataFrame agar tidak muncul UserWarning tentang Feature Names
-        features_df = pd.DataFrame([features_new], columns=feature_names)
-
-        # 4. PREDIKSI MENGGUNAKAN AI
-        diagnosa = model.predict(features_df)[0]
-        probabilitas = np.max(model.predict_proba(features_df)) * 100
+    with profiling.session() as profile:
+        try:
+            # Worker sudah memegang model terlatih; tahap-tahapnya ikut masuk profil
+            result = worker.submit({"job": "diagnose", "path": os.path.abspath(file_path),
+                                    "profile": profile is not None})
+            with profiling.stage("libraries"):
+                libraries.wait()
+            if result is None:
+                result = diagnose_local(file_path)
+            elif profile is not None:
+                profile.stages += result["stages"]
+        except Exception as e:
+            if profile is not None:
+                profile.write_log(file=file_path, error=str(e))
+            messagebox.showerror("Error", f"Terjadi kesalahan diagnosa:\n{e}")
+            return
+
+        if "warning" in result:
+            messagebox.showwarning("Peringatan", result["warning"])
+            return
+
+        if profile is not None:
+            profile.write_log(file=file_path, diagnosa=result["diagnosa"], n_data=result["n_data"])
+
+    show_result(file_path, result["img"], result["segmented"], result["diagnosa"],
+                result["probabilitas"], result["n_data"], profile)
+
+# Seluruh folder film dari klinik: fitur dihitung paralel (diagnose_folder.py) dan
+# hasilnya ditulis bertahap ke CSV/JSONL, tanpa membuka jendela hasil per citra.
+def start_batch_diagnosis():
+    folder = filedialog.askdirectory(title="Pilih Folder Citra X-ray")
+    if not folder: return
+    output = filedialog.asksaveasfilename(title="Simpan Hasil Diagnosa", defaultextension=".csv",
+                                          initialfile="hasil_diagnosa.csv",
+                                          filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")])
+    if not output: return
+
+    status_label.config(text="Memuat pustaka...", foreground="blue")
+    root.update_idletasks()
+    libraries.wait()
+
+    paths = collect_inputs([folder])
+    if not paths:
+        messagebox.showwarning("Peringatan", "Tidak ada gambar di folder ini.")
+        status_label.config(text="")
+        return
 
-        show_result(file_path, img, segmented_image, diagnosa, probabilitas, n_data)
+    def show_progress(done, total):
+        status_label.config(text=f"Memproses {done}/{total}...", foreground="blue")
+        root.update() # Update UI agar tidak freeze
 
+    try:
+        n_ok, n_failed = diagnose_batch(paths, output, progress=show_progress)
     except Exception as e:
-        messagebox.showerror("Error", f"Terjadi kesalahan diagnosa:\n{e}")
+        status_label.config(text="")
+        messagebox.showerror("Error", f"Diagnosa folder gagal:\n{e}")
+        return
 
-def show_result(path, img, seg, diagnosa, prob, n_data):
+    msg = f"Selesai! {n_ok} citra didiagnosa, {n_failed} gagal."
+    status_label.config(text=msg, foreground="green")
+    messagebox.showinfo("Sukses", f"{msg}\nHasil: {output}")
+
+def show_result(path, img, seg, diagnosa, prob, n_data, profile=None):
     report_text = (
         f"HASIL DIAGNOSA\n"
         f"----------------------------------\n"
@@ -134,7 +195,8 @@ def show_result(path, img, seg, diagnosa, prob, n_data):
     if "Osteoporosis" in diagnosa: bg_color = "#ffdddd"
     elif "Osteopenia" in diagnosa: bg_color = "#fff4cc"
 
-    plt.figure(figsize=(10, 6))
+    # Jendela dilebarkan jika panel profil waktu ditampilkan di sisi kanan
+    plt.figure(figsize=(12 if profile else 10, 6))
     plt.subplot(1, 2, 1)
     plt.title("Citra X-Ray")
     plt.imshow(img, cmap='gray')
@@ -145,9 +207,14 @@ def show_result(path, img, seg, diagnosa, prob, n_data):
     plt.imshow(seg, cmap='viridis')
     plt.axis('off')
 
-    plt.tight_layout(rect=[0, 0, 1, 0.85])
-    plt.figtext(0.5, 0.88, report_text, ha='center', va='top', fontsize=11,
+    plt.tight_layout(rect=[0, 0, 0.8 if profile else 1, 0.85])
+    plt.figtext(0.4 if profile else 0.5, 0.88, report_text, ha='center', va='top', fontsize=11,
                 bbox={"facecolor": bg_color, "alpha": 1, "pad": 10})
+
+    # Panel waktu per tahap (hanya jika profil waktu diaktifkan)
+    if profile:
+        plt.figtext(0.81, 0.80, "\n".join(profile.summary_lines()), ha='left', va='top',
+                    fontsize=8, family='monospace', bbox={"facecolor": "#f4f4f4", "pad": 6})
     plt.show()
 
 # ==========================================================
@@ -156,7 +223,7 @@ def show_result(path, img, seg, diagnosa, prob, n_data):
 if __name__ == "__main__":
     root = tk.Tk()
     root.title("Diagnosis Citra")
-    root.geometry("400x250")
+    root.geometry("400x360")
     root.resizable(False, False)
 
     style = ttk.Style(root)
@@ -167,9 +234,20 @@ if __name__ == "__main__":
     
     ttk.Label(main_frame, text="Diagnosis Citra", font=("Arial", 14, "bold")).pack(pady=10)
 
-    ttk.Label(main_frame, text="Sistem akan membaca 'database_fitur.csv'\ndan mencocokkan citra baru.", justify="center").pack(pady=5)
+    ttk.Label(main_frame, text="Sistem akan membaca database fitur\ndan mencocokkan citra baru.", justify="center").pack(pady=5)
 
     btn_action = ttk.Button(main_frame, text="Mulai Pemeriksaan Citra", command=start_diagnosis)
-    btn_action.pack(pady=20, ipady=10, fill='x')
+    btn_action.pack(pady=(20, 5), ipady=10, fill='x')
+
+    ttk.Button(main_frame, text="Diagnosa Satu Folder (CSV/JSONL)", command=start_batch_diagnosis).pack(pady=(5, 15), fill='x')
+
+    # Profil waktu per tahap bisa dinyalakan/dimatikan tanpa menutup aplikasi
+    profile_var = tk.BooleanVar(value=profiling.is_enabled())
+    ttk.Checkbutton(main_frame, text="Tampilkan profil waktu per tahap", variable=profile_var,
+                    command=lambda: profiling.set_enabled(profile_var.get())).pack()
+
+    status_label = ttk.Label(main_frame, text="", foreground="gray")
+    status_label.pack(pady=5)
 
+    libraries.start()
     root.mainloop()
\ No newline at end of file
@@ -1,68 +1,59 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import cv2
-import numpy as np
 import pandas as pd
-from sklearn.mixture import GaussianMixture
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import confusion_matrix, classification_report
-from skimage.feature import graycomatrix, graycoprops
 import matplotlib
 matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
+import csv
 import os
 import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from pipeline import extract_features_file, init_worker
+from variant_archive import shard_feature_rows, shard_paths
+from model_store import FEATURE_NAMES, RF_PARAMS, check_pipeline, database_fingerprint, load_model, save_model
+import feature_store
 
 # ==========================================================
 # KONFIGURASI DAN UTILITAS
 # ==========================================================
 FILE_EVAL_TEMP = "temp_hasil_evaluasi.csv"
-DATABASE_LATIH = "database_fitur.csv"
+DATABASE_LATIH = feature_store.DEFAULT_STORE
 LABELS_ORDER = ["Normal", "Osteopenia", "Osteoporosis"]
+EVAL_WORKERS = os.cpu_count() or 1
+MAX_IN_FLIGHT = EVAL_WORKERS * 2 # Batas antrian kerja agar memori tetap terkendali
+PREDICT_BATCH = 1024 # Baris per panggilan model.predict (overhead sklearn per panggilan besar)
 
 # ==========================================================
 # BAGIAN 1: MESIN DIAGNOSA
 # ==========================================================
-def preprocess_image(image_path):
-    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-    if img is None: return None
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    improved_img = clahe.apply(img)
-    improved_img = cv2.GaussianBlur(improved_img, (3, 3), 0)
-    return improved_img
-
-def extract_features_complete(img, segmented_image):
-    pixels_padat = np.count_nonzero(segmented_image == 2)
-    pixels_berpori = np.count_nonzero(segmented_image == 1)
-    pixels_total = pixels_padat + pixels_berpori
-    rasio_pvb = pixels_padat / pixels_berpori if pixels_berpori > 0 else 0.0
-    rasio_pvt = pixels_padat / pixels_total if pixels_total > 0 else 0.0
-
-    mean_val = np.mean(img)
-    var_val = np.var(img)
-    glcm = graycomatrix(img, distances=[1], angles=[0], levels=256, symmetric=True, normed=True)
-    
-    return [
-        rasio_pvb, rasio_pvt,
-        graycoprops(glcm, 'contrast')[0, 0],
-        graycoprops(glcm, 'homogeneity')[0, 0],
-        graycoprops(glcm, 'energy')[0, 0],
-        graycoprops(glcm, 'correlation')[0, 0],
-        mean_val, var_val
-    ]
-
 def train_model_on_fly(verbose=False):
     """Melatih model dengan fitur Debugging untuk mengecek isi database"""
-    if not os.path.exists(DATABASE_LATIH):
-        if verbose: messagebox.showerror("Error", f"File database tidak ditemukan di:\n{os.path.abspath(DATABASE_LATIH)}")
+    if feature_store.row_count(DATABASE_LATIH) == 0:
+        if verbose: messagebox.showerror("Error", f"Database kosong atau tidak ditemukan di:\n{os.path.abspath(DATABASE_LATIH)}")
+        return None
+    error, warning = check_pipeline(DATABASE_LATIH)
+    if error:
+        messagebox.showerror("Error", error)
         return None
+    if warning:
+        print(warning)
+
+    # Tanpa mode debug, pakai model tersimpan jika isi database belum berubah
+    if not verbose:
+        cached = load_model(DATABASE_LATIH)
+        if cached is not None:
+            return cached[0]
 
     try:
-        df = pd.read_csv(DATABASE_LATIH)
+        fingerprint = database_fingerprint(DATABASE_LATIH)
+        X, y = feature_store.training_data(DATABASE_LATIH, FEATURE_NAMES)
         
         # --- DEBUGGING INFO ---
         if verbose:
-            counts = df['diagnosa'].value_counts()
+            counts = feature_store.label_counts(DATABASE_LATIH)
             info_msg = f"Lokasi Database:\n{os.path.abspath(DATABASE_LATIH)}\n\n"
             info_msg += "Komposisi Data Latih Terbaca:\n"
             for label in LABELS_ORDER:
@@ -70,17 +61,16 @@ def train_model_on_fly(verbose=False):
                 info_msg += f"- {label}: {n} data\n"
             
             messagebox.showinfo("Info Model", info_msg)
-            if len(df) < 5: 
+            if len(y) < 5: 
                 messagebox.showwarning("Warning", "Data latih terlalu sedikit (<5)!")
                 return None
         # ----------------------
         
-        X = df[['rasio_p_v_b', 'rasio_p_v_t', 'glcm_contrast', 'glcm_homogeneity', 
-                'glcm_energy', 'glcm_correlation', 'stat_mean', 'stat_variance']]
-        y = df['diagnosa']
+        X = pd.DataFrame(X, columns=FEATURE_NAMES)
         
-        clf = RandomForestClassifier(n_estimators=100, random_state=42)
+        clf = RandomForestClassifier(**RF_PARAMS)
         clf.fit(X, y)
+        save_model(DATABASE_LATIH, fingerprint, clf, len(y))
         return clf
     except Exception as e:
         if verbose: messagebox.showerror("Error Training", f"Gagal melatih model:\n{e}")
@@ -89,6 +79,22 @@ def train_model_on_fly(verbose=False):
 # ==========================================================
 # BAGIAN 2: LOGIKA EVALUASI BATCH
 # ==========================================================
+def open_eval_temp():
+    """(file, csv.writer) untuk menambah baris ke CSV sementara; header ditulis jika file masih baru"""
+    header = not os.path.exists(FILE_EVAL_TEMP) or os.path.getsize(FILE_EVAL_TEMP) == 0
+    f = open(FILE_EVAL_TEMP, 'a', newline='', encoding='utf-8')
+    writer = csv.writer(f)
+    if header:
+        writer.writerow(['filename', 'y_true', 'y_pred'])
+    return f, writer
+
+def write_predictions(f, writer, model, rows):
+    """Satu model.predict untuk sekumpulan baris [nama, fitur..., label], lalu tulis + flush hasilnya"""
+    predictions = model.predict(pd.DataFrame([row[1:-1] for row in rows], columns=FEATURE_NAMES))
+    writer.writerows((row[0], row[-1], prediction) for row, prediction in zip(rows, predictions))
+    f.flush()
+    return predictions
+
 def run_batch_test():
     # 1. Cek Model (Aktifkan Verbose=True untuk melihat info database)
     model = train_model_on_fly(verbose=False)
@@ -107,68 +113,119 @@ def run_batch_test():
     )
     if not file_paths: return
 
-    # 4. Loop Proses Diagnosa
-    results = []
+    # 4. Ekstraksi Fitur Paralel (Process Pool)
     total_files = len(file_paths)
     
     progress_bar['maximum'] = total_files
+    progress_bar['value'] = 0
     lbl_status.config(text="Memproses data uji...", foreground="blue")
     root.update()
 
-    feature_names = [
-        'rasio_p_v_b', 'rasio_p_v_t', 'glcm_contrast', 'glcm_homogeneity',
-        'glcm_energy', 'glcm_correlation', 'stat_mean', 'stat_variance'
-    ]
+    # Progress bar mengikuti setiap future yang selesai; prediksi dilakukan sekaligus per
+    # PREDICT_BATCH baris (satu kali untuk batch biasa), bukan satu predict per gambar
+    rows = []   # (urutan, [nama, fitur..., label])
+    saved = 0
+    done = 0
+    jobs = iter(enumerate(file_paths))
+
+    def flush_rows():
+        nonlocal saved
+        rows.sort(key=lambda r: r[0])
+        batch = [r[1] for r in rows]
+        predictions = write_predictions(eval_file, eval_writer, model, batch)
+        if saved == 0:
+            # Debugging: Print fitur file pertama ke Console untuk dicek manual
+            print(f"\n[DEBUG] File: {batch[0][0]}")
+            print(f"Fitur: {batch[0][1:-1]}")
+            print(f"Prediksi: {predictions[0]} | Kunci: {actual_class}\n")
+        saved += len(batch)
+        rows.clear()
+
+    eval_file, eval_writer = open_eval_temp()
+    with eval_file, ProcessPoolExecutor(max_workers=EVAL_WORKERS, initializer=init_worker) as executor:
+        pending = {}
+
+        def submit_next():
+            job = next(jobs, None)
+            if job is not None:
+                pending[executor.submit(extract_features_file, job[1])] = job
+
+        for _ in range(MAX_IN_FLIGHT):
+            submit_next()
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i, fpath = pending.pop(future)
+                try:
+                    feats = future.result()
+                    if feats is not None:
+                        rows.append((i, [os.path.basename(fpath)] + list(feats) + [actual_class]))
+                except Exception as e:
+                    print(f"Skip file {fpath}: {e}")
+                done += 1
+                submit_next()
+
+            # 5. Prediksi sekaligus begitu satu batch penuh terkumpul
+            if len(rows) >= PREDICT_BATCH:
+                flush_rows()
+
+            progress_bar['value'] = done
+            root.update()
 
-    for i, fpath in enumerate(file_paths):
-        try:
-            img = preprocess_image(fpath)
-            if img is None: continue
+        if rows:
+            flush_rows()
 
-            # Pastikan tipe data float64 untuk konsistensi GMM
-            pixel_values = img.reshape(-1, 1).astype(np.float64)
-            gmm = GaussianMixture(n_components=3, random_state=42).fit(pixel_values)
-            labels = gmm.predict(pixel_values)
-            
-            means = gmm.means_.flatten()
-            sorted_indices = np.argsort(means)
-            sorted_labels = np.zeros_like(labels)
-            for k, idx in enumerate(sorted_indices):
-                sorted_labels[labels == idx] = k
-            segmented_image = sorted_labels.reshape(img.shape)
+    if saved:
+        lbl_status.config(text=f"Berhasil menambahkan {saved} data {actual_class}.", foreground="green")
+        update_summary()
+    else:
+        lbl_status.config(text="Gagal memproses gambar.", foreground="red")
+
+def run_archive_test():
+    """Evaluasi langsung dari arsip variasi (variant_archive.py), tanpa memilih file satu per satu"""
+    model = train_model_on_fly(verbose=False)
+    if model is None: return
 
-            feats = extract_features_complete(img, segmented_image)
-            df_feat = pd.DataFrame([feats], columns=feature_names)
-            prediction = model.predict(df_feat)[0]
+    archive_dir = filedialog.askdirectory(title="Pilih Folder Arsip Variasi")
+    if not archive_dir: return
+    shards = shard_paths(archive_dir)
+    if not shards:
+        messagebox.showwarning("Peringatan", "Folder ini tidak berisi shard arsip variasi.")
+        return
 
-            # Debugging: Print fitur file pertama ke Console untuk dicek manual
-            if i == 0:
-                print(f"\n[DEBUG] File: {os.path.basename(fpath)}")
-                print(f"Fitur: {feats}")
-                print(f"Prediksi: {prediction} | Kunci: {actual_class}\n")
-
-            results.append({
-                'filename': os.path.basename(fpath),
-                'y_true': actual_class,
-                'y_pred': prediction
-            })
-            
+    # Label dari tabel index arsip; kelas di dropdown dipakai jika arsip tidak berlabel
+    actual_class = combo_actual.get()
+
+    progress_bar['maximum'] = len(shards)
+    progress_bar['value'] = 0
+    lbl_status.config(text="Memproses arsip variasi...", foreground="blue")
+    root.update()
+
+    # Baris dari shard-shard yang selesai dikumpulkan; prediksi sekaligus per PREDICT_BATCH baris
+    rows = []
+    saved = 0
+    eval_file, eval_writer = open_eval_temp()
+    with eval_file, ProcessPoolExecutor(max_workers=EVAL_WORKERS, initializer=init_worker) as executor:
+        futures = [executor.submit(shard_feature_rows, shard, default_label=actual_class) for shard in shards]
+        for i, future in enumerate(futures):
+            try:
+                rows += future.result()
+            except Exception as e:
+                print(f"Skip shard {shards[i]}: {e}")
+            if len(rows) >= PREDICT_BATCH or (i == len(futures) - 1 and rows):
+                write_predictions(eval_file, eval_writer, model, rows)
+                saved += len(rows)
+                rows = []
             progress_bar['value'] = i + 1
             root.update()
 
-        except Exception as e:
-            print(f"Skip file {fpath}: {e}")
+    if not saved:
+        lbl_status.config(text="Gagal memproses arsip.", foreground="red")
+        return
 
-    if results:
-        df_res = pd.DataFrame(results)
-        mode = 'a' if os.path.exists(FILE_EVAL_TEMP) else 'w'
-        header = not os.path.exists(FILE_EVAL_TEMP)
-        df_res.to_csv(FILE_EVAL_TEMP, mode=mode, index=False, header=header)
-        
-        lbl_status.config(text=f"Berhasil menambahkan {len(results)} data {actual_class}.", foreground="green")
-        update_summary()
-    else:
-        lbl_status.config(text="Gagal memproses gambar.", foreground="red")
+    lbl_status.config(text=f"Berhasil menambahkan {saved} data dari arsip.", foreground="green")
+    update_summary()
 
 def reset_evaluation_data():
     if os.path.exists(FILE_EVAL_TEMP):
@@ -245,7 +302,7 @@ def calculate_metrics():
 if __name__ == "__main__":
     root = tk.Tk()
     root.title("Alat Evaluasi Model (Debug Version)")
-    root.geometry("500x570")
+    root.geometry("500x610")
     
     style = ttk.Style(root)
     style.theme_use('clam')
@@ -266,6 +323,9 @@ if __name__ == "__main__":
 
     btn_add = ttk.Button(input_frame, text="Pilih Gambar & Proses", command=run_batch_test)
     btn_add.pack(fill="x", pady=5)
+
+    btn_archive = ttk.Button(input_frame, text="Proses Arsip Variasi (Folder)", command=run_archive_test)
+    btn_archive.pack(fill="x", pady=5)
     
     progress_bar = ttk.Progressbar(input_frame, orient="horizontal", mode="determinate")
     progress_bar.pack(fill="x", pady=5)
@@ -0,0 +1,494 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# ==========================================================
+# PENYIMPANAN FITUR BINER KOLOMNAR
+# ==========================================================
+# Pengganti database_fitur.csv. Satu database = satu folder berisi:
+#   meta.json       kolom fitur, daftar label (kategori), jumlah baris yang
+#                   sudah di-commit (total & per label) dan generasi file data
+#   features.G.f32  matriks fitur float32, baris demi baris (n x jumlah kolom)
+#   labels.G.u8     kode label uint8 (indeks ke daftar label di meta.json)
+#   names.G.txt     indeks nama file, satu nama per baris
+# Matriks fitur dibaca dengan memmap sehingga training tidak mem-parsing teks.
+#
+# Transaksi: beberapa proses training boleh menulis bersamaan. Penulis
+# mengambil kunci OS pada write.lock (fcntl.flock di Linux, msvcrt.locking di
+# Windows). Kunci dilepas OS saat proses mati, jadi tidak ada kunci basi yang
+# perlu ditebak dari umur file. Penulis menambah data di ujung file, lalu meng-commit
+# dengan mengganti meta.json secara atomik (file sementara + os.replace).
+# Pembaca tidak perlu kunci: mereka hanya membaca n_rows baris yang tercatat
+# di meta.json, jadi sisa tulisan yang terputus (proses mati di tengah jalan)
+# tidak pernah terbaca dan dipotong oleh penulis berikutnya. Perubahan lebar
+# kolom dan reset menulis file generasi baru, sehingga pembaca yang masih
+# memakai generasi lama tidak terganggu.
+#
+# Setiap store mencatat sidik pipeline (pipeline.feature_fingerprint()) dari
+# baris-baris di dalamnya di meta.json["pipelines"], agar model tidak dilatih
+# dari campuran fitur yang dihitung dengan parameter/algoritma berbeda (lihat
+# model_store.check_pipeline). CSV lama tidak punya kolom sidik; sidiknya
+# dibaca dari file pendamping database_fitur.pipeline.txt jika ada, selain itu
+# barisnya dicatat sebagai UNKNOWN_PIPELINE.
+#
+# Contoh:
+#   python feature_store.py import database_fitur.csv
+#   python feature_store.py export hasil.csv
+#   python feature_store.py info
+
+DEFAULT_STORE = "database_fitur.store"
+NAME_COLUMN = "nama_file"
+LABEL_COLUMN = "diagnosa"
+STORE_VERSION = 1
+
+UNKNOWN_PIPELINE = "tidak diketahui" # Sidik baris yang diimpor dari CSV tanpa file pendamping
+
+LOCK_TIMEOUT = 30.0 # Detik menunggu penulis lain sebelum menyerah
+
+_META = "meta.json"
+_LOCK = "write.lock"
+_DATA_FILES = {"features": "features.{}.f32", "labels": "labels.{}.u8", "names": "names.{}.txt"}
+
+
+def legacy_csv(store):
+    """database_fitur.store -> database_fitur.csv (database format lama)"""
+    return os.path.splitext(store)[0] + ".csv"
+
+
+def csv_pipeline_file(csv_filename):
+    """database_fitur.csv -> database_fitur.pipeline.txt (sidik pipeline pembuat CSV)"""
+    return os.path.splitext(csv_filename)[0] + ".pipeline.txt"
+
+
+def _read_csv_pipeline(csv_filename):
+    try:
+        with open(csv_pipeline_file(csv_filename), "r", encoding="utf-8") as f:
+            return f.read().strip() or UNKNOWN_PIPELINE
+    except OSError:
+        return UNKNOWN_PIPELINE
+
+
+def _path(store, name):
+    return os.path.join(store, name)
+
+
+def _data_path(store, meta, kind):
+    return _path(store, _DATA_FILES[kind].format(meta["generation"]))
+
+
+# ==========================================================
+# KUNCI PENULIS & COMMIT
+# ==========================================================
+def _try_lock(fd):
+    # Kunci eksklusif tanpa menunggu; OSError jika dipegang proses (atau thread) lain
+    if os.name == "nt":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _unlock(fd):
+    if os.name == "nt":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _locked(store, timeout=LOCK_TIMEOUT):
+    # File kunci tidak pernah dihapus: menghapusnya saat dipegang membuka celah
+    # dua penulis memegang "kunci" pada dua file berbeda
+    os.makedirs(store, exist_ok=True)
+    lock_path = _path(store, _LOCK)
+    fd = os.open(lock_path, os.O_CREAT | os.O_RDWR)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                _try_lock(fd)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Database sedang dipakai proses lain ({lock_path})")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_write(path, data, mode):
+    with open(path, mode) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _commit(store, meta):
+    """Titik commit transaksi: meta.json diganti utuh dalam satu langkah"""
+    tmp_path = f"{_path(store, _META)}.{os.getpid()}.tmp"
+    _fsync_write(tmp_path, json.dumps(meta).encode("utf-8"), "wb")
+    os.replace(tmp_path, _path(store, _META))
+
+    # File generasi lama boleh dihapus; di Windows bisa gagal jika masih
+    # di-memmap pembaca, nanti dicoba lagi pada commit berikutnya.
+    current = {_DATA_FILES[kind].format(meta["generation"]) for kind in _DATA_FILES}
+    for name in os.listdir(store):
+        if name.endswith((".f32", ".u8", ".txt")) and name not in current:
+            try:
+                os.remove(_path(store, name))
+            except OSError:
+                pass
+
+
+def _new_generation(store, meta):
+    # File data kosong untuk generasi berikutnya (dipakai saat melebarkan kolom & reset)
+    meta = dict(meta, generation=meta.get("generation", -1) + 1, n_rows=0, names_bytes=0)
+    for kind in _DATA_FILES:
+        open(_data_path(store, meta, kind), "wb").close()
+    return meta
+
+
+def _empty_meta():
+    return {"version": STORE_VERSION, "columns": [], "labels": [], "label_counts": [], "pipelines": [],
+            "generation": -1}
+
+
+def _read_meta_file(store):
+    # os.replace di Windows bisa sesaat menolak pembukaan file, cukup dicoba lagi
+    for attempt in range(20):
+        try:
+            with open(_path(store, _META), "r") as f:
+                return json.load(f)
+        except PermissionError:
+            time.sleep(0.01)
+    with open(_path(store, _META), "r") as f:
+        return json.load(f)
+
+
+def _prepare(store):
+    """Memastikan store ada; database CSV lama di sebelahnya diimpor sekali"""
+    if os.path.exists(_path(store, _META)):
+        return
+    with _locked(store):
+        if os.path.exists(_path(store, _META)):
+            return
+        # Impor ikut dalam transaksi pembuatan, jadi pembaca lain tidak pernah
+        # melihat store yang masih kosong di tengah impor
+        meta = _new_generation(store, _empty_meta())
+        rows, header = _read_csv(legacy_csv(store)) if os.path.isfile(legacy_csv(store)) else ([], None)
+        pipeline = _read_csv_pipeline(legacy_csv(store))
+        if not (header and rows and _append_locked(store, rows, header, meta, pipeline)):
+            _commit(store, meta)
+
+
+def read_meta(store):
+    """Snapshot meta.json (kolom, label, jumlah baris yang sudah di-commit)"""
+    _prepare(store)
+    return _read_meta_file(store)
+
+
+def stat_stamp(store):
+    """Penanda perubahan yang murah (stat meta.json); berubah pada setiap commit"""
+    try:
+        st = os.stat(_path(store, _META))
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def row_count(store):
+    """Jumlah baris yang sudah di-commit, tanpa membaca isi database"""
+    if not os.path.exists(_path(store, _META)) and not os.path.isfile(legacy_csv(store)):
+        return 0
+    return read_meta(store)["n_rows"]
+
+
+# ==========================================================
+# PEMBACAAN
+# ==========================================================
+def _read_names(store, meta):
+    with open(_data_path(store, meta, "names"), "rb") as f:
+        data = f.read(meta["names_bytes"])
+    return data.decode("utf-8").split("\n")[:meta["n_rows"]]
+
+
+def _open_arrays(store, meta):
+    n_rows, n_cols = meta["n_rows"], len(meta["columns"])
+    if n_rows == 0:
+        return np.empty((0, n_cols), np.float32), np.empty(0, np.uint8)
+    if n_cols == 0:
+        X = np.empty((n_rows, 0), np.float32)
+    else:
+        X = np.memmap(_data_path(store, meta, "features"), dtype=np.float32, mode="r", shape=(n_rows, n_cols))
+    codes = np.memmap(_data_path(store, meta, "labels"), dtype=np.uint8, mode="r", shape=(n_rows,))
+    return X, codes
+
+
+def load(store):
+    """(nama file, matriks fitur memmap, kode label, meta) dari satu snapshot yang konsisten"""
+    for attempt in range(5):
+        meta = read_meta(store)
+        try:
+            X, codes = _open_arrays(store, meta)
+            return _read_names(store, meta), X, codes, meta
+        except FileNotFoundError:
+            continue # Generasi berganti (reset/lebar kolom) saat dibaca, ambil snapshot baru
+    raise RuntimeError(f"Database {store} terus berubah saat dibaca")
+
+
+def training_data(store, feature_names):
+    """(X float32 sesuai urutan feature_names, y label teks) untuk melatih model"""
+    _, X, codes, meta = load(store)
+    if meta["n_rows"] == 0:
+        return np.empty((0, len(feature_names)), np.float32), np.empty(0, dtype=object)
+    columns = [meta["columns"].index(name) for name in feature_names]
+    labels = np.array(meta["labels"], dtype=object)
+    return np.asarray(X[:, columns]), labels[np.asarray(codes)]
+
+
+def _meta_pipelines(meta):
+    # Store yang dibuat sebelum sidik dicatat: asal barisnya tidak diketahui
+    return meta.get("pipelines", [UNKNOWN_PIPELINE] if meta["n_rows"] else [])
+
+
+def pipelines(store):
+    """Daftar sidik pipeline dari baris-baris di database (kosong jika database kosong)"""
+    return _meta_pipelines(read_meta(store))
+
+
+def label_counts(store):
+    """Jumlah data per label; dicatat penulis di meta.json, jadi tidak perlu membaca data"""
+    meta = read_meta(store)
+    return {label: int(n) for label, n in zip(meta["labels"], meta["label_counts"])}
+
+
+# Indeks nama file disimpan di memori per store dan hanya diperpanjang dengan
+# nama-nama baru selama generasi file belum berganti.
+_name_index_cache = {}
+
+
+def name_index(store):
+    """Indeks nama file -> daftar nomor baris"""
+    meta = read_meta(store)
+    key = os.path.abspath(store)
+    generation, n_indexed, index = _name_index_cache.get(key, (None, 0, None))
+    if generation != meta["generation"] or n_indexed > meta["n_rows"]:
+        n_indexed, index = 0, {}
+    for i, name in enumerate(_read_names(store, meta)[n_indexed:], start=n_indexed):
+        index.setdefault(name, []).append(i)
+    _name_index_cache[key] = (meta["generation"], meta["n_rows"], index)
+    return index
+
+
+def find_rows(store, nama_file=None, label=None):
+    """Nomor baris dengan nama file dan/atau label tertentu"""
+    if nama_file is not None:
+        rows = np.array(name_index(store).get(nama_file, []), dtype=np.intp)
+    else:
+        rows = None
+    if label is not None:
+        _, _, codes, meta = load(store)
+        if label not in meta["labels"]:
+            return np.empty(0, dtype=np.intp)
+        code = meta["labels"].index(label)
+        if rows is None:
+            rows = np.flatnonzero(np.asarray(codes) == code)
+        else:
+            rows = rows[np.asarray(codes)[rows] == code]
+    if rows is None:
+        rows = np.arange(row_count(store))
+    return rows
+
+
+def get_rows(store, rows):
+    """Baris tertentu dalam format CSV: [nama_file, fitur..., diagnosa]"""
+    names, X, codes, meta = load(store)
+    return [[names[i]] + X[i].tolist() + [meta["labels"][codes[i]]] for i in rows]
+
+
+# ==========================================================
+# PENULISAN (TRANSAKSI)
+# ==========================================================
+def _parse(value):
+    return np.nan if value == "" or value is None else float(value)
+
+
+def _append_locked(store, rows, header, meta=None, pipeline=None):
+    # Dipanggil saat kunci penulis sudah dipegang
+    if meta is None:
+        meta = _read_meta_file(store)
+    n_rows = meta["n_rows"]
+    old_cols = len(meta["columns"])
+    feature_columns = [c for c in header if c not in (NAME_COLUMN, LABEL_COLUMN)]
+    added = [c for c in feature_columns if c not in meta["columns"]]
+    columns = meta["columns"] + added
+    labels = list(meta["labels"])
+
+    positions = [columns.index(c) for c in feature_columns]
+    name_pos = header.index(NAME_COLUMN)
+    label_pos = header.index(LABEL_COLUMN)
+    value_pos = [i for i, c in enumerate(header) if c not in (NAME_COLUMN, LABEL_COLUMN)]
+
+    # Baris kembar = nama, label dan seluruh nilai fitur (float32) sama persis;
+    # hanya baris dengan nama file yang sama yang perlu dibandingkan.
+    X, codes = _open_arrays(store, meta)
+    counts = meta["label_counts"]
+    index = name_index(store) if n_rows else {}
+    padding = np.full(len(added), np.nan, dtype=np.float32).tobytes()
+
+    new_X, new_codes, new_names = [], [], []
+    seen = set()
+    for row in rows:
+        values = np.full(len(columns), np.nan, dtype=np.float32)
+        values[positions] = [_parse(row[i]) for i in value_pos]
+        name = str(row[name_pos])
+        label = str(row[label_pos])
+        if label not in labels:
+            labels.append(label)
+        code = labels.index(label)
+
+        key = (name, code, values.tobytes())
+        if key in seen:
+            continue
+        if any(codes[i] == code and X[i].tobytes() + padding == key[2] for i in index.get(name, [])):
+            continue
+        seen.add(key)
+        new_X.append(values)
+        new_codes.append(code)
+        new_names.append(name)
+
+    if not new_X:
+        return 0
+    if len(labels) > 255:
+        raise ValueError("Jumlah label melebihi 255")
+
+    if added:
+        # Kolom baru: data lama disalin ke generasi baru yang lebih lebar (nilai baru = NaN)
+        wide = np.full((n_rows, len(columns)), np.nan, dtype=np.float32)
+        wide[:, :old_cols] = X
+        old_codes = np.asarray(codes).copy()
+        old_names = _read_names(store, meta)
+        del X, codes # Tutup memmap generasi lama
+        meta = _new_generation(store, meta)
+        _fsync_write(_data_path(store, meta, "features"), wide.tobytes(), "wb")
+        _fsync_write(_data_path(store, meta, "labels"), old_codes.tobytes(), "wb")
+        names_data = "".join(name + "\n" for name in old_names).encode("utf-8")
+        _fsync_write(_data_path(store, meta, "names"), names_data, "wb")
+        meta.update(n_rows=n_rows, names_bytes=len(names_data))
+    else:
+        del X, codes
+        # Buang sisa tulisan yang belum di-commit (penulis sebelumnya terputus)
+        for kind, size in (("features", n_rows * old_cols * 4), ("labels", n_rows), ("names", meta["names_bytes"])):
+            path = _data_path(store, meta, kind)
+            if os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    names_data = "".join(name + "\n" for name in new_names).encode("utf-8")
+    _fsync_write(_data_path(store, meta, "features"), np.stack(new_X).tobytes(), "ab")
+    _fsync_write(_data_path(store, meta, "labels"), np.array(new_codes, dtype=np.uint8).tobytes(), "ab")
+    _fsync_write(_data_path(store, meta, "names"), names_data, "ab")
+
+    added_counts = np.bincount(new_codes, minlength=len(labels))
+    counts = [int(n) for n in np.pad(counts, (0, len(labels) - len(counts))) + added_counts]
+    stamps = _meta_pipelines(meta) if n_rows else []
+    stamps = stamps + [pipeline or UNKNOWN_PIPELINE] if (pipeline or UNKNOWN_PIPELINE) not in stamps else stamps
+    meta.update(columns=columns, labels=labels, label_counts=counts, pipelines=stamps, n_rows=n_rows + len(new_X),
+                names_bytes=meta["names_bytes"] + len(names_data))
+    _commit(store, meta)
+    return len(new_X)
+
+
+def append_rows(store, rows, header, pipeline=None):
+    """Menambahkan banyak baris dalam satu transaksi (urutan kolom = header); baris kembar dilewati
+
+    pipeline = sidik pipeline yang menghitung fiturnya (pipeline.feature_fingerprint()).
+    """
+    read_meta(store)
+    with _locked(store):
+        return _append_locked(store, rows, header, pipeline=pipeline)
+
+
+def reset(store):
+    """Mengosongkan database secara atomik (pembaca melihat isi lama atau kosong, tidak setengah)"""
+    with _locked(store):
+        meta = _read_meta_file(store) if os.path.exists(_path(store, _META)) else _empty_meta()
+        meta = _new_generation(store, meta)
+        meta.update(columns=[], labels=[], label_counts=[], pipelines=[])
+        _commit(store, meta)
+
+
+# ==========================================================
+# IMPOR / EKSPOR CSV
+# ==========================================================
+def _read_csv(csv_filename):
+    import csv
+
+    with open(csv_filename, mode="r", newline="") as csv_file:
+        reader = csv.reader(csv_file)
+        header = next(reader, None)
+        rows = [row for row in reader if row]
+    return rows, header
+
+
+def import_csv(csv_filename, store):
+    """Mengimpor database_fitur.csv (skema lama maupun dengan bank fitur) beserta sidik pendampingnya"""
+    rows, header = _read_csv(csv_filename)
+    if header is None or not rows:
+        return 0
+    return append_rows(store, rows, header, _read_csv_pipeline(csv_filename))
+
+
+def export_csv(store, csv_filename):
+    """Menulis isi store ke CSV dengan skema database_fitur.csv"""
+    import csv
+
+    names, X, codes, meta = load(store)
+    tmp_filename = f"{csv_filename}.{os.getpid()}.tmp"
+    with open(tmp_filename, mode="w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow([NAME_COLUMN] + meta["columns"] + [LABEL_COLUMN])
+        for name, values, code in zip(names, X, codes):
+            cells = ["" if np.isnan(v) else str(v) for v in values]
+            writer.writerow([name] + cells + [meta["labels"][code]])
+    os.replace(tmp_filename, csv_filename)
+    # Sidik ikut diekspor hanya jika semua baris berasal dari satu pipeline yang diketahui
+    stamps = _meta_pipelines(meta)
+    if len(stamps) == 1 and stamps[0] != UNKNOWN_PIPELINE:
+        with open(csv_pipeline_file(csv_filename), "w", encoding="utf-8") as f:
+            f.write(stamps[0] + "\n")
+    return len(names)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Impor/ekspor database fitur biner")
+    parser.add_argument("command", choices=["import", "export", "info"])
+    parser.add_argument("csv", nargs="?", help="File CSV sumber (import) atau tujuan (export)")
+    parser.add_argument("--store", default=DEFAULT_STORE, help=f"Folder database (default: {DEFAULT_STORE})")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        print(f"{import_csv(args.csv or legacy_csv(args.store), args.store)} baris diimpor ke {args.store}.")
+    elif args.command == "export":
+        print(f"{export_csv(args.store, args.csv or legacy_csv(args.store))} baris diekspor.")
+    else:
+        meta = read_meta(args.store)
+        print(f"{args.store}: {row_count(args.store)} baris, {len(meta['columns'])} kolom fitur")
+        for label, n in label_counts(args.store).items():
+            print(f"- {label}: {n}")
+        for stamp in pipelines(args.store):
+            print(f"Sidik pipeline: {stamp}")
@@ -0,0 +1,223 @@
+import json
+
+import numpy as np
+
+# ==========================================================
+# RANDOM FOREST DALAM ARRAY DATAR (INFERENSI TANPA SKLEARN)
+# ==========================================================
+# Diagnosa hanya butuh menelusuri 100 pohon untuk satu (atau beberapa) baris
+# fitur. Lewat sklearn, itu berarti mengimpor seluruh sklearn di Raspberry Pi
+# dan overhead Python per pohon (joblib, validasi DataFrame) untuk setiap
+# panggilan predict/predict_proba. export_forest() menyalin semua pohon yang
+# sudah dilatih ke beberapa array NumPy:
+#
+#   feature, threshold   fitur dan ambang setiap node (semua pohon digabung)
+#   left, right          indeks anak global; daun menunjuk dirinya sendiri
+#   value                distribusi kelas setiap node (hanya daun yang dipakai)
+#   roots                indeks akar setiap pohon
+#
+# FlatForest.predict_with_proba() lalu menelusuri SEMUA pohon untuk SEMUA
+# baris sekaligus: setiap langkah satu gather + perbandingan untuk matriks
+# (pohon x baris), diulang sebanyak kedalaman maksimum. Daun adalah titik
+# tetap, jadi tidak perlu masking. Label dan probabilitas keluar dari satu
+# penelusuran yang sama.
+#
+# Hasilnya identik (bit per bit) dengan RandomForestClassifier.predict_proba:
+# X diubah ke float32 seperti sklearn, ambang tetap float64, dan probabilitas
+# pohon dijumlahkan berurutan dari pohon pertama lalu dibagi jumlah pohon.
+# Modul ini tidak mengimpor sklearn; sklearn hanya dibutuhkan saat melatih.
+#
+# Cek kesamaan dengan sklearn dan kecepatannya:
+#   python flat_forest.py --db database_fitur.store
+
+FORMAT_VERSION = 1
+CHUNK_ROWS = 256 # Baris per penelusuran; membatasi matriks (pohon x baris) pada batch besar
+
+
+class FlatForest:
+    """Random Forest terlatih dalam bentuk array datar; antarmuka mirip sklearn (classes_, predict_proba)"""
+
+    def __init__(self, feature, threshold, left, right, value, roots, depth, classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.classes_ = classes
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def leaves(self, X):
+        """Indeks daun global, bentuk (pohon, baris)"""
+        X = np.ascontiguousarray(X, dtype=np.float32) # Sama dengan validasi input sklearn (DTYPE float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if not np.isfinite(X).all():
+            raise ValueError("Input berisi NaN atau tak hingga")
+
+        n_rows, n_features = X.shape
+        values = X.ravel()
+        offsets = np.arange(n_rows, dtype=np.intp) * n_features
+        node = np.repeat(self.roots[:, np.newaxis], n_rows, axis=1)
+        for _ in range(self.depth):
+            go_left = values[self.feature[node] + offsets] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_with_proba(self, X):
+        """(label, probabilitas) dari satu penelusuran; probabilitas berbentuk (baris, kelas)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        proba = np.empty((len(X), self.value.shape[1]))
+        for start in range(0, len(X), CHUNK_ROWS):
+            # Penjumlahan pada sumbu pohon berjalan berurutan (pohon 0, 1, 2, ...), sama
+            # seperti akumulasi all_proba di sklearn, jadi hasilnya identik bit per bit
+            np.add.reduce(self.value[self.leaves(X[start:start + CHUNK_ROWS])], axis=0,
+                          out=proba[start:start + CHUNK_ROWS])
+        proba /= self.n_trees
+        return self.classes_.take(np.argmax(proba, axis=1)), proba
+
+    def predict_proba(self, X):
+        return self.predict_with_proba(X)[1]
+
+    def predict(self, X):
+        return self.predict_with_proba(X)[0]
+
+
+# ==========================================================
+# EKSPOR DARI SKLEARN & SIMPAN/MUAT (.npz)
+# ==========================================================
+def export_forest(model):
+    """FlatForest dari RandomForestClassifier terlatih (hanya membaca atribut tree_, tanpa impor sklearn)"""
+    n_classes = len(model.classes_)
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        index = np.arange(tree.node_count)
+        is_leaf = tree.children_left < 0
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, index, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, index, tree.children_right) + offset)
+
+        value = tree.value[:, 0, :n_classes].astype(np.float64)
+        # sklearn lama menyimpan jumlah sampel (dinormalisasi saat predict_proba),
+        # sklearn >= 1.4 sudah menyimpan proporsi; keduanya diperlakukan sama seperti sklearn
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        if (normalizer > 1.0 + 1e-9).any():
+            normalizer[normalizer == 0.0] = 1.0
+            value /= normalizer
+        values.append(value)
+
+        offset += tree.node_count
+        depth = max(depth, tree.max_depth)
+
+    return FlatForest(np.concatenate(features).astype(np.intp), np.concatenate(thresholds),
+                      np.concatenate(lefts).astype(np.intp), np.concatenate(rights).astype(np.intp),
+                      np.concatenate(values), np.array(roots, dtype=np.intp), depth,
+                      np.asarray(model.classes_))
+
+
+def save_forest(path_or_file, forest, meta=None):
+    """Menyimpan FlatForest ke .npz (tanpa pickle); meta = dict JSON tambahan"""
+    np.savez(path_or_file, feature=forest.feature.astype(np.int32), threshold=forest.threshold,
+             left=forest.left.astype(np.int32), right=forest.right.astype(np.int32),
+             value=forest.value, roots=forest.roots.astype(np.int32), depth=np.int64(forest.depth),
+             classes=forest.classes_.astype(str),
+             meta=np.array(json.dumps({"format": FORMAT_VERSION, **(meta or {})})))
+
+
+def load_forest(path):
+    """(FlatForest, meta) dari file .npz; ValueError jika formatnya tidak dikenal"""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Format forest tidak dikenal: {meta.get('format')}")
+        forest = FlatForest(data["feature"].astype(np.intp), data["threshold"],
+                            data["left"].astype(np.intp), data["right"].astype(np.intp),
+                            data["value"], data["roots"].astype(np.intp), data["depth"],
+                            data["classes"].astype(object))
+    return forest, meta
+
+
+# ==========================================================
+# CEK KESAMAAN DENGAN SKLEARN
+# ==========================================================
+def compare_with_sklearn(model, X, repeats=20):
+    """(identik?, ms per baris sklearn, ms per baris FlatForest, ms satu baris sklearn, ms satu baris FlatForest)"""
+    import time
+
+    forest = export_forest(model)
+    expected_proba = model.predict_proba(X)
+    labels, proba = forest.predict_with_proba(X)
+    same = (np.array_equal(proba, expected_proba) and np.array_equal(labels, model.predict(X))
+            and all(np.array_equal(forest.predict_proba(X[i:i + 1]), expected_proba[i:i + 1])
+                    for i in range(len(X))))
+
+    def per_call(fn, rows):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn(rows)
+        return (time.perf_counter() - start) / repeats * 1000
+
+    return (same, per_call(model.predict_proba, X) / len(X), per_call(forest.predict_with_proba, X) / len(X),
+            per_call(model.predict_proba, X[:1]), per_call(forest.predict_with_proba, X[:1]))
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import subprocess
+    import sys
+
+    from model_store import FEATURE_NAMES, RF_PARAMS
+    import feature_store
+
+    parser = argparse.ArgumentParser(description="Cek FlatForest terhadap sklearn RandomForestClassifier")
+    parser.add_argument("--db", required=True,
+                        help=f"Database fitur yang sudah ada untuk melatih model (mis. {feature_store.DEFAULT_STORE})")
+    parser.add_argument("--random", type=int, default=2000, help="Jumlah baris acak tambahan di sekitar data latih")
+    args = parser.parse_args()
+
+    # row_count tidak membuat store baru jika database (atau CSV lamanya) belum ada
+    if feature_store.row_count(args.db) < 5:
+        print(f"Database {args.db} tidak ada atau berisi kurang dari 5 sampel.")
+        sys.exit(1)
+
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y = feature_store.training_data(args.db, FEATURE_NAMES)
+    X = np.asarray(X, dtype=np.float64)
+    model = RandomForestClassifier(**RF_PARAMS).fit(X, y)
+
+    # Data latih + titik acak dalam rentang setiap fitur + nilai tepat di ambang (kasus <=)
+    rng = np.random.default_rng(0)
+    low, high = X.min(axis=0), X.max(axis=0)
+    random_rows = rng.uniform(low - 0.1 * (high - low), high + 0.1 * (high - low), (args.random, X.shape[1]))
+    tree = model.estimators_[0].tree_
+    at_threshold = np.tile(X.mean(axis=0), (tree.node_count, 1))
+    for i, (f, t) in enumerate(zip(tree.feature, tree.threshold)):
+        if f >= 0:
+            at_threshold[i, f] = t
+    rows = np.vstack([X, random_rows, at_threshold])
+
+    same, ms_sk, ms_flat, one_sk, one_flat = compare_with_sklearn(model, rows)
+    print(f"{len(rows)} baris, {model.n_estimators} pohon: sklearn {ms_sk * 1000:.1f} us/baris, "
+          f"FlatForest {ms_flat * 1000:.1f} us/baris")
+    print(f"Satu baris: sklearn {one_sk:.2f} ms, FlatForest {one_flat:.2f} ms")
+
+    # Impor modul ini (dan memuat forest .npz) tidak boleh ikut mengimpor sklearn
+    here = os.path.dirname(os.path.abspath(__file__))
+    probe = subprocess.run([sys.executable, "-c", "import sys, flat_forest; print('sklearn' in sys.modules)"],
+                           capture_output=True, text=True, cwd=here)
+    no_sklearn = probe.stdout.strip() == "False"
+    print(f"{'OK' if same else 'BEDA'}: label dan probabilitas {'identik' if same else 'tidak identik'} dengan sklearn")
+    print(f"{'OK' if no_sklearn else 'GAGAL'}: impor flat_forest {'tanpa' if no_sklearn else 'ikut mengimpor'} sklearn")
+    sys.exit(0 if same and no_sklearn else 1)
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+# ==========================================================
+# CACHE CITRA (HASIL DECODE / PREPROCESS) SEBAGAI MEMMAP .npy
+# ==========================================================
+# Setiap alur (training, diagnosa, evaluasi, eksperimen fitur) membaca JPEG yang
+# sama lalu menjalankan CLAHE + blur yang sama. Citra uint8 hasilnya disimpan
+# sebagai file .npy mentah; pemakaian berikutnya cukup np.load(mmap_mode="r"),
+# tanpa decode dan tanpa CLAHE. Karena dibuka sebagai memory map, beberapa
+# proses worker yang membaca citra yang sama berbagi halaman page cache OS.
+#
+# Kunci cache = hash isi file gambar + sidik tahap (parameter preprocess, atau
+# "decoded" untuk citra asli), jadi mengubah CLAHE/blur otomatis membuat kunci
+# baru. Citra dari cache bersifat read-only.
+#
+# Folder cache berada di samping modul ini, bukan relatif terhadap folder kerja,
+# agar launcher, worker dan alat CLI yang dijalankan dari folder lain memakai
+# satu cache yang sama (dan batas ukurannya berlaku untuk seluruh cache).
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_citra")
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+EVICT_EVERY = 20 # Satu entri berukuran megabyte, jadi ukuran cache diperiksa lebih sering
+
+_puts_since_evict = 0
+
+
+def image_key(image_bytes, fingerprint):
+    """Kunci cache dari isi file gambar dan sidik tahap pemrosesan"""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(fingerprint.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, key + ".npy")
+
+
+def get_image(key, cache_dir=CACHE_DIR):
+    """Citra tersimpan (np.memmap read-only) untuk kunci ini, atau None jika belum ada"""
+    path = _entry_path(key, cache_dir)
+    try:
+        img = np.load(path, mmap_mode="r", allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+    # Tandai sebagai baru dipakai agar tidak tergusur lebih dulu (LRU berdasarkan mtime)
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return img
+
+
+def put_image(key, img, cache_dir=CACHE_DIR):
+    """Menyimpan citra ke cache (gagal menyimpan tidak dianggap error)"""
+    global _puts_since_evict
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = _entry_path(key, cache_dir)
+        # Ditulis ke file sementara lalu di-rename: pembaca lain tidak pernah melihat file setengah jadi
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(img), allow_pickle=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Cache citra tidak tersimpan: {e}")
+        return
+
+    _puts_since_evict += 1
+    if _puts_since_evict >= EVICT_EVERY:
+        _puts_since_evict = 0
+        evict(cache_dir)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Menghapus entri yang paling lama tidak dipakai sampai ukuran cache di bawah batas"""
+    entries = []
+    total = 0
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".npy"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+    except OSError:
+        return
+
+    if total <= max_bytes:
+        return
+
+    # Sisakan ruang 10% agar penggusuran tidak terjadi di setiap penyimpanan berikutnya.
+    # Proses yang masih memegang memmap entri terhapus tetap bisa membacanya (POSIX).
+    target = int(max_bytes * 0.9)
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= target:
+            break
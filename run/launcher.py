@@ -2,47 +2,71 @@ import tkinter as tk
 from tkinter import messagebox, ttk
 import os
 import subprocess
-import csv
 import sys
 
+from model_store import remove_model
+import feature_store
+import worker
+
 SCRIPT_TRAINING = "training.py"
 SCRIPT_DIAGNOSA = "diagnose.py"
-DATABASE_FILE   = "database_fitur.csv"
+DATABASE_FILE   = feature_store.DEFAULT_STORE
 
 def get_database_count():
-    if not os.path.exists(DATABASE_FILE):
-        return 0
-
     try:
-        with open(DATABASE_FILE, mode='r') as f:
-            row_count = sum(1 for row in f)
-            return max(0, row_count - 1)
+        return feature_store.row_count(DATABASE_FILE)
     except Exception:
         return 0
 
-def update_status_label():
-    count = get_database_count()
+# Status hanya dibaca ulang jika meta.json berubah (setiap commit penulis mengganti
+# file itu), jadi selama database diam launcher cukup melakukan satu os.stat per tick.
+STATUS_POLL_MS = 2000
+_status_stamp = "belum dibaca"
+
+def refresh_status():
+    try:
+        counts = feature_store.label_counts(DATABASE_FILE)
+    except Exception:
+        counts = {}
+    count = sum(counts.values())
     if count == 0:
         lbl_status.config(text="Status Database: Kosong (Belum ada data)", foreground="red")
+        lbl_detail.config(text="")
     else:
         lbl_status.config(text=f"Status Database: Ditemukan {count} Data Latih", foreground="green")
-    
-    root.after(2000, update_status_label)
+        lbl_detail.config(text=" | ".join(f"{label}: {n}" for label, n in counts.items()))
+
+def update_status_label():
+    global _status_stamp
+    stamp = feature_store.stat_stamp(DATABASE_FILE)
+    if stamp != _status_stamp:
+        _status_stamp = stamp
+        refresh_status()
+
+    root.after(STATUS_POLL_MS, update_status_label)
 
 def launch_training():
     if not os.path.exists(SCRIPT_TRAINING):
         messagebox.showerror("Error", f"File script tidak ditemukan:\n{SCRIPT_TRAINING}")
         return
-    subprocess.Popen([sys.executable, SCRIPT_TRAINING])
+    subprocess.Popen([sys.executable, SCRIPT_TRAINING], env=tool_env())
 
 def launch_diagnosis():
     if not os.path.exists(SCRIPT_DIAGNOSA):
         messagebox.showerror("Error", f"File script tidak ditemukan:\n{SCRIPT_DIAGNOSA}")
         return
-    subprocess.Popen([sys.executable, SCRIPT_DIAGNOSA])
+    subprocess.Popen([sys.executable, SCRIPT_DIAGNOSA], env=tool_env())
+
+# Worker persisten (worker.py) yang dipakai bersama semua jendela training/diagnosa;
+# alamat dan kuncinya diteruskan ke alat lewat variabel lingkungan.
+worker_process = None
+worker_env = {}
+
+def tool_env():
+    return dict(os.environ, **worker_env)
 
 def reset_database():
-    if not os.path.exists(DATABASE_FILE):
+    if get_database_count() == 0:
         messagebox.showinfo("Info", "Database sudah kosong.")
         return
 
@@ -53,16 +77,17 @@ def reset_database():
 
     if jawaban:
         try:
-            os.remove(DATABASE_FILE)
+            feature_store.reset(DATABASE_FILE)
+            remove_model(DATABASE_FILE)
             messagebox.showinfo("Sukses", "Data latih berhasil direset.")
-            update_status_label()
+            refresh_status()
         except Exception as e:
             messagebox.showerror("Error", f"Gagal menghapus file:\n{e}")
 
 if __name__ == "__main__":
     root = tk.Tk()
     root.title("Main Launcher - Sistem Deteksi Tulang")
-    root.geometry("400x350")
+    root.geometry("400x370")
     root.resizable(False, False)
 
     style = ttk.Style(root)
@@ -95,7 +120,12 @@ if __name__ == "__main__":
     
     lbl_status = ttk.Label(status_frame, text="Memeriksa Database...", font=("Arial", 9, "bold"))
     lbl_status.pack()
+    lbl_detail = ttk.Label(status_frame, text="", font=("Arial", 8))
+    lbl_detail.pack()
 
     update_status_label()
 
+    # Worker berhenti sendiri saat launcher ditutup
+    worker_process, worker_env = worker.spawn()
+
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,350 @@
+import cv2
+import numpy as np
+import os
+
+from segmentasi import (SAMPLE_SIZE, PYRAMID_MAX_PIXELS, fit_gmm, gmm_params, intensity_histogram,
+                        load_prior, segment_image)
+from tekstur import glcm_features, glcm_feature_bank, feature_bank_names
+import feature_cache
+import image_cache
+
+# ==========================================================
+# PIPELINE EKSTRAKSI FITUR (TANPA GUI)
+# ==========================================================
+# Modul ini tidak mengimpor tkinter/matplotlib agar bisa dipakai lewat SSH
+# di Raspberry Pi tanpa layar, di job malam, maupun di dalam process pool.
+
+LABELS = ["Normal", "Osteopenia", "Osteoporosis"]
+
+CSV_HEADER = [
+    'nama_file', 'rasio_p_v_b', 'rasio_p_v_t',
+    'glcm_contrast', 'glcm_homogeneity', 'glcm_energy', 'glcm_correlation',
+    'stat_mean', 'stat_variance', 'diagnosa'
+]
+
+# Parameter pipeline; ikut membentuk kunci cache fitur, jadi setiap perubahan
+# di sini otomatis membuat hasil lama di cache tidak terpakai lagi.
+CLAHE_CLIP_LIMIT = 2.0
+CLAHE_TILE_GRID = (8, 8)
+BLUR_KERNEL = (3, 3)
+GLCM_DISTANCE = 1
+GLCM_ANGLE = 0
+GLCM_LEVELS = 256 # 64 atau 32 untuk mode terkuantisasi yang lebih ringan di Raspberry Pi
+PIPELINE_VERSION = 1 # Naikkan jika cara menghitung fitur berubah
+
+# Bank fitur GLCM multi jarak x multi sudut (opsional). Kolomnya disisipkan
+# sebelum 'diagnosa'; database lama otomatis diperlebar dengan nilai kosong.
+FEATURE_BANK = False
+FEATURE_BANK_DISTANCES = (1, 2, 3)
+FEATURE_BANK_ANGLES = (0, 45, 90, 135) # derajat
+
+# Data pelatihan GMM segmentasi: "full" (seluruh piksel), "subsample" (GMM_SAMPLE_SIZE
+# piksel acak bertingkat, biaya konstan untuk citra beresolusi tinggi), atau "pyramid"
+# (level cv2.pyrDown <= GMM_PYRAMID_MAX_PIXELS). Pelabelan tetap pada resolusi penuh.
+GMM_FIT_MODE = "full"
+GMM_SAMPLE_SIZE = SAMPLE_SIZE
+GMM_PYRAMID_MAX_PIXELS = PYRAMID_MAX_PIXELS
+
+# Inisialisasi EM: "kmeans" (bawaan) atau "prior" (warm start dari prior populasi
+# GMM_PRIOR_FILE tanpa K-Means, dibuat dengan `train_folder.py --build-prior`).
+# Nilai fitur ikut berubah, jadi database latih harus dibangun ulang dengan mode
+# yang sama. Selama file prior belum ada, K-Means tetap dipakai.
+GMM_INIT = "kmeans"
+GMM_PRIOR_FILE = "gmm_prior.json"
+
+# Mode hemat memori (Raspberry Pi, film 3000x2500 ke atas): preprocess menimpa citra
+# yang dibacanya sendiri, mean/variance dihitung dari histogram 256 bin (bukan salinan
+# float64 seukuran citra), dan GLCM dihitung per pita MEMORY_CHUNK_PIXELS piksel.
+# Segmentasi sudah hemat di kedua mode: EM pada histogram, label uint8 lewat LUT.
+# MEMORY_BUDGET_MB adalah batas kenaikan peak RSS satu film 3000x2500 yang
+# diperiksa oleh `python benchmark.py --memory-check`.
+LOW_MEMORY = False
+MEMORY_CHUNK_PIXELS = 1 << 20
+MEMORY_BUDGET_MB = 32
+
+# Cache citra hasil decode/preprocess sebagai file .npy memmap (image_cache.py): putaran
+# berikutnya atas dataset yang sama (evaluasi, eksperimen fitur) melewati decode JPEG
+# dan CLAHE. Citra dari cache read-only dan dibagi antar proses lewat page cache OS.
+# Diagnosa (jendela, worker, diagnose_folder, layanan HTTP) hampir selalu membuka film
+# baru sekali saja, jadi di jalur itu cache mengikuti DIAGNOSE_IMAGE_CACHE: bawaannya
+# mati agar setiap diagnosa tidak menulis beberapa MB ke kartu SD.
+IMAGE_CACHE = True
+DIAGNOSE_IMAGE_CACHE = False
+
+_prior_cache = {}
+
+# ==========================================================
+# FUNGSI PRE-PROCESSING: CLAHE
+# ==========================================================
+def preprocess_array(img, inplace=False):
+    """CLAHE + Gaussian Blur pada citra grayscale yang sudah dibaca
+
+    inplace=True menimpa img (hasilnya identik, tanpa dua salinan tambahan).
+    """
+    clahe = cv2.createCLAHE(clipLimit=CLAHE_CLIP_LIMIT, tileGridSize=CLAHE_TILE_GRID)
+    improved_img = clahe.apply(img, img if inplace else None)
+    improved_img = cv2.GaussianBlur(improved_img, BLUR_KERNEL, 0, improved_img if inplace else None)
+    return improved_img
+
+def preprocess_fingerprint():
+    """Sidik parameter yang memengaruhi citra hasil preprocess"""
+    return repr(("preprocess", CLAHE_CLIP_LIMIT, CLAHE_TILE_GRID, BLUR_KERNEL))
+
+def _use_cache(cache):
+    return IMAGE_CACHE if cache is None else cache
+
+def decode_bytes(data, cache=None):
+    """Citra grayscale asli dari isi file gambar (cache memmap jika IMAGE_CACHE); None jika tidak terbaca
+
+    cache=True/False mengganti IMAGE_CACHE untuk panggilan ini (mis. DIAGNOSE_IMAGE_CACHE).
+    """
+    key = image_cache.image_key(data, "decoded") if _use_cache(cache) else None
+    img = image_cache.get_image(key) if key else None
+    if img is None:
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if img is not None and key:
+            image_cache.put_image(key, img)
+    return img
+
+def preprocess_bytes(data, lap=None, cache=None):
+    """Citra hasil preprocess dari isi file gambar; None jika tidak terbaca
+
+    Dengan IMAGE_CACHE, citra yang pernah diproses dibuka dari cache memmap tanpa decode
+    dan CLAHE. lap(tahap) dipanggil setelah "decode" dan "preprocess" untuk pencatatan waktu.
+    """
+    key = image_cache.image_key(data, preprocess_fingerprint()) if _use_cache(cache) else None
+    img = image_cache.get_image(key) if key else None
+    if img is not None:
+        if lap:
+            lap("decode")
+            lap("preprocess")
+        return img
+
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if lap: lap("decode")
+    if img is None: return None
+    img = preprocess_array(img, inplace=LOW_MEMORY)
+    if key:
+        image_cache.put_image(key, img)
+    if lap: lap("preprocess")
+    return img
+
+def _read_bytes(image_path):
+    try:
+        with open(image_path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None # Sama seperti cv2.imread: file hilang/tak terbaca -> None
+
+def decode_image(image_path, cache=None):
+    """Citra grayscale asli dari file (pengganti cv2.imread yang memakai cache citra)"""
+    data = _read_bytes(image_path)
+    return None if data is None else decode_bytes(data, cache)
+
+def preprocess_image(image_path, cache=None):
+    data = _read_bytes(image_path)
+    return None if data is None else preprocess_bytes(data, cache=cache)
+
+# ==========================================================
+# FUNGSI EKSTRAKSI FITUR TEKSTUR (GLCM & STATISTIK)
+# ==========================================================
+def chunk_pixels():
+    """Ukuran pita perhitungan GLCM pada mode hemat memori, selain itu None (sekaligus)"""
+    return MEMORY_CHUNK_PIXELS if LOW_MEMORY else None
+
+def image_mean_var(img):
+    """Mean dan variance intensitas citra uint8"""
+    if not LOW_MEMORY:
+        return np.mean(img), np.var(img)
+    # np.var membuat salinan float64 seukuran citra; dari histogram cukup 256 bin
+    hist = intensity_histogram(img)
+    levels = np.arange(hist.size, dtype=np.float64)
+    mean_val = float(hist @ levels) / img.size
+    return np.float64(mean_val), np.float64(hist @ (levels - mean_val) ** 2 / img.size)
+
+def extract_additional_features(img):
+    """Menghitung fitur GLCM dan Statistik Tekstur"""
+    # 1. Statistik Tekstur Dasar (Mean & Variance)
+    mean_val, var_val = image_mean_var(img)
+
+    # 2. GLCM (Gray-Level Co-occurrence Matrix)
+    # Menggunakan jarak 1 piksel dan sudut 0 derajat untuk efisiensi;
+    # keempat properti dihitung sekaligus oleh kernel di tekstur.py
+    glcm = glcm_features(img, distance=GLCM_DISTANCE, angle=GLCM_ANGLE, levels=GLCM_LEVELS,
+                         chunk_pixels=chunk_pixels())
+
+    return {
+        "mean": mean_val,
+        "variance": var_val,
+        "contrast": glcm["contrast"],
+        "homogeneity": glcm["homogeneity"],
+        "energy": glcm["energy"],
+        "correlation": glcm["correlation"]
+    }
+
+def extract_features_complete(img, segmented_image, class_counts=None, feature_bank=False):
+    """8 fitur (urutan FEATURE_NAMES) dari citra CLAHE dan hasil segmentasinya (+ bank fitur)"""
+    # --- FITUR RASIO ---
+    if class_counts is None:
+        class_counts = np.bincount(segmented_image.ravel(), minlength=3)
+    pixels_padat = class_counts[2]
+    pixels_berpori = class_counts[1]
+    pixels_total_tulang = pixels_padat + pixels_berpori
+    rasio_p_v_b = pixels_padat / pixels_berpori if pixels_berpori > 0 else 0.0
+    rasio_p_v_t = pixels_padat / pixels_total_tulang if pixels_total_tulang > 0 else 0.0
+
+    # --- FITUR TEKSTUR & STATISTIK ---
+    extra = extract_additional_features(img)
+
+    features = [
+        rasio_p_v_b, rasio_p_v_t,
+        extra['contrast'], extra['homogeneity'], extra['energy'], extra['correlation'],
+        extra['mean'], extra['variance']
+    ]
+
+    # --- BANK FITUR GLCM (OPSIONAL) ---
+    if feature_bank:
+        bank = glcm_feature_bank(img, FEATURE_BANK_DISTANCES, FEATURE_BANK_ANGLES, levels=GLCM_LEVELS,
+                                 chunk_pixels=chunk_pixels())
+        features += list(bank.values())
+    return features
+
+
+def csv_header(feature_bank=False):
+    """Header database fitur; mode bank fitur menambah kolom sebelum 'diagnosa'"""
+    if not feature_bank:
+        return CSV_HEADER
+    return CSV_HEADER[:-1] + feature_bank_names(FEATURE_BANK_DISTANCES, FEATURE_BANK_ANGLES) + CSV_HEADER[-1:]
+
+# ==========================================================
+# FUNGSI INTI ANALISIS
+# ==========================================================
+def gmm_prior():
+    """Prior populasi untuk warm start jika GMM_INIT = "prior" dan filenya ada, selain itu None"""
+    if GMM_INIT != "prior":
+        return None
+    try:
+        stamp = (os.path.abspath(GMM_PRIOR_FILE), os.stat(GMM_PRIOR_FILE).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+    if stamp not in _prior_cache:
+        _prior_cache.clear()
+        _prior_cache[stamp] = load_prior(GMM_PRIOR_FILE)
+    return _prior_cache[stamp]
+
+
+def fit_image_gmm(img, n_clusters=3):
+    """GMM segmentasi citra hasil preprocess sesuai GMM_FIT_MODE dan GMM_INIT"""
+    prior = gmm_prior() if n_clusters == 3 else None
+    return fit_gmm(img, n_clusters, GMM_FIT_MODE, GMM_SAMPLE_SIZE, GMM_PYRAMID_MAX_PIXELS, init=prior)
+
+
+def image_gmm_params(image_path):
+    """Parameter GMM terurut (inisialisasi K-Means) satu citra, untuk membangun prior populasi"""
+    img = preprocess_image(image_path)
+    if img is None: return None
+    return gmm_params(fit_gmm(img, 3, GMM_FIT_MODE, GMM_SAMPLE_SIZE, GMM_PYRAMID_MAX_PIXELS))
+
+
+def segment_and_extract(img, n_clusters=3, feature_bank=False):
+    """Segmentasi GMM + fitur dari citra hasil preprocess"""
+    gmm = fit_image_gmm(img, n_clusters)
+    segmented_image, class_counts = segment_image(img, gmm)
+    return segmented_image, extract_features_complete(img, segmented_image, class_counts, feature_bank)
+
+
+def analyze_image(image_path, n_clusters=3, feature_bank=False):
+    """Preprocess + segmentasi GMM + fitur satu citra; None jika gambar tidak terbaca"""
+    img = preprocess_image(image_path)
+    if img is None: return None
+    segmented_image, features = segment_and_extract(img, n_clusters=n_clusters, feature_bank=feature_bank)
+    return img, segmented_image, features
+
+
+def _fingerprint_key(n_clusters, feature_bank, low_memory):
+    bank = (FEATURE_BANK_DISTANCES, FEATURE_BANK_ANGLES) if feature_bank else None
+    key = (PIPELINE_VERSION, CLAHE_CLIP_LIMIT, CLAHE_TILE_GRID, BLUR_KERNEL,
+           n_clusters, GLCM_DISTANCE, GLCM_ANGLE, GLCM_LEVELS, bank)
+    # Mode "full" tidak menambah elemen agar cache fitur yang sudah ada tetap terpakai
+    if GMM_FIT_MODE == "subsample":
+        key += (("subsample", GMM_SAMPLE_SIZE),)
+    elif GMM_FIT_MODE == "pyramid":
+        key += (("pyramid", GMM_PYRAMID_MAX_PIXELS),)
+    if low_memory:
+        key += (("low_memory",),) # mean/variance dari histogram bisa berbeda di digit terakhir
+    prior = gmm_prior() if n_clusters == 3 else None
+    if prior is not None:
+        key += (("prior",) + tuple(round(float(v), 6) for values in prior for v in values),)
+    return repr(key)
+
+
+def pipeline_fingerprint(n_clusters=3, feature_bank=False):
+    """Sidik seluruh parameter yang memengaruhi nilai fitur (kunci cache fitur)"""
+    return _fingerprint_key(n_clusters, feature_bank, LOW_MEMORY)
+
+
+def feature_fingerprint(n_clusters=3):
+    """Sidik asal fitur di database latih (feature_store); sama dengan pipeline_fingerprint
+
+    kecuali LOW_MEMORY, yang hanya menggeser mean/variance di digit terakhir (selisih
+    relatif < 1e-9), sehingga database dari mode biasa tetap sah untuk mode hemat memori.
+    """
+    return _fingerprint_key(n_clusters, False, False)
+
+
+def file_cache_key(image_path, n_clusters=3, feature_bank=False):
+    """(kunci cache, isi file) untuk satu gambar"""
+    with open(image_path, "rb") as f:
+        data = f.read()
+    return feature_cache.image_key(data, pipeline_fingerprint(n_clusters, feature_bank)), data
+
+
+def extract_features_cached(image_path, n_clusters=3, feature_bank=False):
+    """Fitur satu citra; diambil dari cache jika gambar yang sama pernah diproses"""
+    key, data = file_cache_key(image_path, n_clusters, feature_bank)
+    features = feature_cache.get_features(key)
+    if features is not None:
+        return features
+
+    # File sudah terbaca untuk hashing, jadi langsung di-decode dari memori (atau cache citra)
+    img = preprocess_bytes(data)
+    if img is None: return None
+    _, features = segment_and_extract(img, n_clusters=n_clusters, feature_bank=feature_bank)
+    feature_cache.put_features(key, features)
+    return features
+
+
+def extract_features_array(img, n_clusters=3, feature_bank=False):
+    """Fitur citra grayscale yang sudah ada di memori; kunci cache = isi pikselnya"""
+    key = feature_cache.image_key(img.tobytes() + repr(img.shape).encode("ascii"),
+                                  pipeline_fingerprint(n_clusters, feature_bank) + "pixels")
+    features = feature_cache.get_features(key)
+    if features is None:
+        _, features = segment_and_extract(preprocess_array(img), n_clusters=n_clusters, feature_bank=feature_bank)
+        feature_cache.put_features(key, features)
+    return features
+
+
+def feature_row(image_path, diagnosis_label, n_clusters=3, feature_bank=False):
+    """Satu baris database fitur (urutan csv_header) untuk citra ini, atau None jika gagal"""
+    features = extract_features_cached(image_path, n_clusters=n_clusters, feature_bank=feature_bank)
+    if features is None: return None
+    return [os.path.basename(image_path)] + list(features) + [diagnosis_label]
+
+
+def extract_features_file(image_path):
+    """8 fitur satu citra (urutan FEATURE_NAMES), untuk dipanggil di process pool"""
+    return extract_features_cached(image_path)
+
+
+def init_worker():
+    """Initializer process pool: setiap proses sudah paralel, OpenCV cukup 1 thread"""
+    cv2.setNumThreads(1)
+
+
+def normalize_label(name):
+    """Nama folder -> label baku ('normal' -> 'Normal'), atau None jika bukan label"""
+    for label in LABELS:
+        if name.strip().lower() == label.lower():
+            return label
+    return None
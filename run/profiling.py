@@ -0,0 +1,149 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# ==========================================================
+# PROFIL WAKTU PER TAHAP (INSTRUMENTASI)
+# ==========================================================
+# Setiap tahap diagnosa dibungkus stage("nama"), yang mencatat waktu nyata
+# (perf_counter), waktu CPU proses (process_time, termasuk thread OpenCV),
+# dan puncak alokasi memori selama tahap itu (tracemalloc). Catatan
+# tambahan seperti jumlah iterasi GMM bisa ditulis ke dict yang di-yield.
+#
+# Saat dinonaktifkan, stage() tidak mengukur apa pun sehingga alur diagnosa
+# tidak melambat. Aktifkan dengan set_enabled(True) (checkbox di jendela
+# diagnosa) atau variabel lingkungan AGUNG_PROFILE=1. Setiap sesi ditulis
+# sebagai satu baris JSON ke LOG_FILE:
+#
+#   with profiling.session(file=path) as profile:
+#       with profiling.stage("gmm_fit") as info:
+#           gmm = HistogramGMM().fit(img)
+#           info.update(profiling.gmm_info(gmm))
+#   profile.write_log()
+
+LOG_FILE = "profil_diagnosa.jsonl"
+TRACE_MEMORY = True # tracemalloc menambah beban ~10-30%, matikan jika hanya perlu waktu
+
+_enabled = os.environ.get("AGUNG_PROFILE", "").strip() not in ("", "0")
+_local = threading.local()
+
+
+def set_enabled(flag):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def is_enabled():
+    return _enabled
+
+
+class Profile:
+    """Catatan tahap-tahap satu sesi (mis. satu kali diagnosa)"""
+
+    def __init__(self, **info):
+        self.info = info
+        self.stages = []
+        self.started = datetime.now().isoformat(timespec="seconds")
+
+    def total(self, key="wall_ms"):
+        return sum(s[key] for s in self.stages if s.get(key) is not None)
+
+    def to_dict(self):
+        return {"time": self.started, **self.info, "stages": self.stages,
+                "total_wall_ms": self.total("wall_ms"), "total_cpu_ms": self.total("cpu_ms")}
+
+    def summary_lines(self):
+        """Baris teks ringkas untuk panel waktu di jendela hasil"""
+        lines = [f"{'tahap':<10}{'ms':>7}{'cpu':>7}{'KB':>7}"]
+        for s in self.stages:
+            alloc = s.get("alloc_peak_kb")
+            lines.append(f"{s['name']:<10}{s['wall_ms']:>7.1f}{s['cpu_ms']:>7.1f}"
+                         f"{alloc if alloc is not None else '-':>7}")
+            if "n_iter" in s:
+                lines.append(f"  EM {s['n_iter']} iterasi ({s.get('init', 'kmeans')}), "
+                             f"{'konvergen' if s['converged'] else 'BELUM konvergen'}")
+        lines.append(f"{'total':<10}{self.total('wall_ms'):>7.1f}{self.total('cpu_ms'):>7.1f}")
+        return lines
+
+    def write_log(self, path=None, **extra):
+        """Menambahkan sesi ini sebagai satu baris JSON ke log; gagal menulis tidak fatal"""
+        record = self.to_dict()
+        record.update(extra)
+        try:
+            with open(path or LOG_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        except OSError:
+            pass
+
+
+def current():
+    """Profile sesi yang sedang berjalan di thread ini, atau None"""
+    return getattr(_local, "profile", None)
+
+
+@contextmanager
+def session(**info):
+    """Memulai satu sesi profil; yield Profile, atau None jika profil dinonaktifkan"""
+    if not _enabled:
+        yield None
+        return
+
+    profile = Profile(**info)
+    started_trace = TRACE_MEMORY and not tracemalloc.is_tracing()
+    if started_trace:
+        tracemalloc.start()
+    previous, _local.profile = current(), profile
+    try:
+        yield profile
+    finally:
+        _local.profile = previous
+        if started_trace:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(name):
+    """Mengukur satu tahap di sesi aktif; yield dict untuk catatan tambahan"""
+    profile = current()
+    info = {}
+    if profile is None:
+        yield info
+        return
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        mem_start = tracemalloc.get_traced_memory()[0]
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield info
+    finally:
+        record = {"name": name,
+                  "wall_ms": (time.perf_counter() - wall_start) * 1000,
+                  "cpu_ms": (time.process_time() - cpu_start) * 1000,
+                  "alloc_peak_kb": (tracemalloc.get_traced_memory()[1] - mem_start) // 1024 if tracing else None}
+        record.update(info)
+        profile.stages.append(record)
+
+
+def profiled(name=None):
+    """Dekorator: seluruh pemanggilan fungsi dicatat sebagai satu tahap"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def gmm_info(gmm):
+    """Jumlah iterasi EM, status konvergensi, dan data pelatihan GMM untuk dicatat di tahap"""
+    return {"n_iter": int(gmm.n_iter_), "converged": bool(gmm.converged_),
+            "fit_mode": getattr(gmm, "fit_mode_", "full"), "fit_pixels": int(gmm.hist_.sum()),
+            "init": "kmeans" if gmm.means_init is None else "warm"}
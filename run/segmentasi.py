@@ -0,0 +1,493 @@
+import cv2
+import numpy as np
+
+# ==========================================================
+# SEGMENTASI GMM BERBASIS HISTOGRAM
+# ==========================================================
+# Citra hasil preprocess_image bertipe uint8, sehingga hanya memiliki 256
+# nilai intensitas berbeda. EM 1-D pada piksel identik dengan EM berbobot
+# pada 256 bin histogram: setiap bin adalah satu sampel dengan bobot
+# jumlah pikselnya. Biaya per iterasi menjadi O(256), bukan O(H x W).
+
+LEVELS = 256
+CALCHIST_EXACT = 1 << 24 # calcHist menghitung dalam float32: eksak sampai 2^24 per bin
+
+
+class HistogramGMM:
+    """GMM 1-D yang dilatih dari histogram intensitas (padanan GaussianMixture)"""
+
+    def __init__(self, n_components=3, tol=1e-3, reg_covar=1e-6, max_iter=100,
+                 weights_init=None, means_init=None, variances_init=None):
+        # Nilai default disamakan dengan sklearn.mixture.GaussianMixture
+        self.n_components = n_components
+        self.tol = tol
+        self.reg_covar = reg_covar
+        self.max_iter = max_iter
+        # Warm start: jika parameter awal diberikan, K-Means dilewati
+        self.weights_init = weights_init
+        self.means_init = means_init
+        self.variances_init = variances_init
+
+    # ------------------------------------------------------
+    # Inisialisasi: K-Means 1-D berbobot pada histogram
+    # ------------------------------------------------------
+    def _init_resp(self, x, w):
+        k = self.n_components
+        cdf = np.cumsum(w) / w.sum()
+        # Pusat awal pada kuantil berbobot agar deterministik (tanpa random_state)
+        targets = (np.arange(k) + 0.5) / k
+        centers = x[np.searchsorted(cdf, targets)].astype(np.float64)
+
+        labels = None
+        for _ in range(300):
+            new_labels = np.argmin(np.abs(x[:, None] - centers[None, :]), axis=1)
+            if labels is not None and np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+            for j in range(k):
+                wj = w[labels == j]
+                if wj.sum() > 0:
+                    centers[j] = np.dot(wj, x[labels == j]) / wj.sum()
+
+        resp = np.zeros((x.size, k))
+        resp[np.arange(x.size), labels] = 1.0
+        return resp
+
+    def _m_step(self, x, w, resp):
+        wr = resp * w[:, None]
+        nk = wr.sum(axis=0) + 10 * np.finfo(resp.dtype).eps
+        means = (wr.T @ x) / nk
+        variances = (wr * (x[:, None] - means) ** 2).sum(axis=0) / nk + self.reg_covar
+        self.weights_ = nk / w.sum()
+        self.means_ = means.reshape(-1, 1)
+        self.covariances_ = variances.reshape(-1, 1, 1)
+
+    def _estimate_weighted_log_prob(self, x):
+        means = self.means_.ravel()
+        variances = self.covariances_.ravel()
+        log_prob = -0.5 * (np.log(2 * np.pi) + np.log(variances)
+                           + (x[:, None] - means) ** 2 / variances)
+        return log_prob + np.log(self.weights_)
+
+    def _e_step(self, x, w):
+        weighted = self._estimate_weighted_log_prob(x)
+        top = weighted.max(axis=1, keepdims=True)
+        log_norm = (top + np.log(np.exp(weighted - top).sum(axis=1, keepdims=True))).ravel()
+        resp = np.exp(weighted - log_norm[:, None])
+        lower_bound = np.dot(w, log_norm) / w.sum()
+        return lower_bound, resp
+
+    # ------------------------------------------------------
+    # API utama
+    # ------------------------------------------------------
+    def fit_histogram(self, hist):
+        """Melatih GMM dari histogram 256 bin (jumlah piksel per intensitas)"""
+        hist = np.asarray(hist, dtype=np.float64).ravel()
+        self.hist_ = hist
+        x_all = np.arange(hist.size, dtype=np.float64)
+        # Bin kosong tidak berkontribusi, jadi dibuang agar EM lebih ringan
+        nonzero = hist > 0
+        x, w = x_all[nonzero], hist[nonzero]
+
+        # Parameter awal dari K-Means (atau warm start), lalu iterasi EM seperti pada sklearn
+        if self.means_init is not None:
+            self.weights_ = np.asarray(self.weights_init, dtype=np.float64).ravel().copy()
+            self.means_ = np.asarray(self.means_init, dtype=np.float64).reshape(-1, 1).copy()
+            self.covariances_ = np.asarray(self.variances_init, dtype=np.float64).reshape(-1, 1, 1).copy()
+        else:
+            self._m_step(x, w, self._init_resp(x, w))
+        self.init_params_ = (self.weights_.copy(), self.means_.copy(), self.covariances_.copy())
+
+        lower_bound = -np.inf
+        self.converged_ = False
+        for n_iter in range(1, self.max_iter + 1):
+            prev_lower_bound = lower_bound
+            lower_bound, resp = self._e_step(x, w)
+            self._m_step(x, w, resp)
+            if abs(lower_bound - prev_lower_bound) < self.tol:
+                self.converged_ = True
+                break
+
+        self.n_iter_ = n_iter
+        self.lower_bound_ = lower_bound
+        return self
+
+    def fit(self, img):
+        """Melatih GMM langsung dari citra uint8"""
+        return self.fit_histogram(intensity_histogram(img))
+
+    def predict(self, X):
+        """Label cluster per sampel (urutan cluster mengikuti means_)"""
+        x = np.asarray(X, dtype=np.float64).ravel()
+        return np.argmax(self._estimate_weighted_log_prob(x), axis=1)
+
+    def label_lut(self):
+        """Tabel 256 entri: intensitas -> label terurut (0 gelap, 1 pori, 2 padat)"""
+        raw_labels = self.predict(np.arange(LEVELS))
+        rank = np.empty(self.n_components, dtype=np.uint8)
+        rank[np.argsort(self.means_.ravel())] = np.arange(self.n_components)
+        return rank[raw_labels]
+
+
+def intensity_histogram(img):
+    """Histogram 256 bin dari citra uint8"""
+    # cv2.calcHist beberapa kali lebih cepat dari np.bincount (yang menyalin citra ke int64,
+    # 8 byte/piksel), tetapi hasilnya float32 yang hanya eksak sampai 2^24 piksel per bin.
+    # Citra yang lebih besar dihitung per pita baris lalu dijumlahkan sebagai int64.
+    if img.size < CALCHIST_EXACT:
+        return cv2.calcHist([img], [0], None, [LEVELS], [0, LEVELS]).ravel().astype(np.int64)
+    band = max(1, (CALCHIST_EXACT - 1) // (img.shape[1] if img.ndim > 1 else 1))
+    hist = np.zeros(LEVELS, dtype=np.int64)
+    for r in range(0, img.shape[0], band):
+        part = np.ascontiguousarray(img[r:r + band])
+        hist += cv2.calcHist([part], [0], None, [LEVELS], [0, LEVELS]).ravel().astype(np.int64)
+    return hist
+
+
+# ==========================================================
+# PELATIHAN DARI SAMPEL (CITRA BERESOLUSI TINGGI)
+# ==========================================================
+# Tiga cluster intensitas sudah terestimasi baik dari sebagian kecil piksel.
+# Pada mode "subsample" histogram dibangun dari SAMPLE_SIZE piksel acak yang
+# tersebar merata di grid SAMPLE_STRATA x SAMPLE_STRATA blok (seed tetap agar
+# fitur deterministik), sehingga biaya pelatihan konstan berapa pun ukuran
+# citra. Mode "pyramid" memakai level cv2.pyrDown pertama yang tidak lebih
+# dari PYRAMID_MAX_PIXELS piksel. Pelabelan tetap dilakukan pada citra
+# resolusi penuh lewat LUT.
+
+FIT_MODES = ("full", "subsample", "pyramid")
+SAMPLE_SIZE = 1 << 16
+SAMPLE_STRATA = 16
+PYRAMID_MAX_PIXELS = 1 << 18
+
+
+_sample_index_cache = {}
+SAMPLE_INDEX_CACHE_SIZE = 8 # Satu entri per ukuran citra (~0.5 MB untuk 2^16 sampel)
+
+
+def _sample_index(shape, n_samples, strata, seed):
+    # Seed tetap, jadi posisi sampel hanya bergantung pada ukuran citra dan bisa dipakai ulang
+    key = (shape, n_samples, strata, seed)
+    if key not in _sample_index_cache:
+        rows, cols = shape
+        grid_r, grid_c = min(strata, rows), min(strata, cols)
+        per_block = max(1, n_samples // (grid_r * grid_c))
+        r_edges = np.linspace(0, rows, grid_r + 1).astype(np.intp)
+        c_edges = np.linspace(0, cols, grid_c + 1).astype(np.intp)
+
+        block_r = np.repeat(np.arange(grid_r), grid_c * per_block)
+        block_c = np.tile(np.repeat(np.arange(grid_c), per_block), grid_r)
+        rng = np.random.default_rng(seed)
+        r = r_edges[block_r] + (rng.random(block_r.size) * (r_edges[block_r + 1] - r_edges[block_r])).astype(np.intp)
+        c = c_edges[block_c] + (rng.random(block_c.size) * (c_edges[block_c + 1] - c_edges[block_c])).astype(np.intp)
+
+        if len(_sample_index_cache) >= SAMPLE_INDEX_CACHE_SIZE:
+            _sample_index_cache.pop(next(iter(_sample_index_cache)))
+        _sample_index_cache[key] = r * cols + c
+    return _sample_index_cache[key]
+
+
+def stratified_sample(img, n_samples=SAMPLE_SIZE, strata=SAMPLE_STRATA, seed=0):
+    """Piksel acak (1-D) dengan jumlah sama dari setiap blok grid strata x strata"""
+    index = _sample_index(img.shape[:2], n_samples, strata, seed)
+    return np.take(np.ascontiguousarray(img).ravel(), index)
+
+
+def pyramid_image(img, max_pixels=PYRAMID_MAX_PIXELS):
+    """Level cv2.pyrDown pertama dengan jumlah piksel <= max_pixels"""
+    while img.size > max_pixels and min(img.shape[:2]) > 1:
+        img = cv2.pyrDown(img)
+    return img
+
+
+def fit_pixels(img, mode="full", sample_size=SAMPLE_SIZE, max_pixels=PYRAMID_MAX_PIXELS):
+    """Piksel yang dipakai melatih GMM pada mode ini (seluruh citra jika terlalu kecil)"""
+    if mode not in FIT_MODES:
+        raise ValueError(f"Mode GMM tidak dikenal: {mode}")
+    if mode == "subsample" and img.size > sample_size:
+        return stratified_sample(img, sample_size)
+    if mode == "pyramid" and img.size > max_pixels:
+        return pyramid_image(img, max_pixels)
+    return img
+
+
+def fit_gmm(img, n_components=3, mode="full", sample_size=SAMPLE_SIZE, max_pixels=PYRAMID_MAX_PIXELS, init=None):
+    """HistogramGMM dari seluruh piksel, sampel bertingkat, atau level piramida citra
+
+    init = (weights, means, variances) untuk warm start (mis. dari load_prior), tanpa K-Means.
+    """
+    pixels = fit_pixels(img, mode, sample_size, max_pixels)
+    gmm = HistogramGMM(n_components=n_components, **init_kwargs(init)).fit(pixels)
+    gmm.fit_mode_ = mode if pixels is not img else "full"
+    return gmm
+
+
+def _ratios(class_counts):
+    padat, pori = class_counts[2], class_counts[1]
+    return (padat / pori if pori > 0 else 0.0,
+            padat / (padat + pori) if padat + pori > 0 else 0.0)
+
+
+def deviation_estimate(img, gmm, sample_size=SAMPLE_SIZE, max_pixels=PYRAMID_MAX_PIXELS, parts=4):
+    """Perkiraan galat baku (1 sigma) mean cluster dan rasio fitur GMM dari sampel vs citra penuh
+
+    Tanpa melatih pada citra penuh: piksel sampel dibagi menjadi beberapa bagian
+    saling lepas, GMM dilatih ulang per bagian, lalu sebaran hasilnya diskalakan
+    ke ukuran sampel utuh (std / sqrt(parts)). Galat hitung proporsi kelas dari
+    sampel (binomial) ikut dijumlahkan. Pada mode piramida, bias akibat
+    penghalusan pyrDown diperkirakan dari selisihnya dengan GMM sampel bertingkat
+    citra resolusi penuh (tidak bias, biayanya juga konstan).
+    """
+    mode = getattr(gmm, "fit_mode_", "full")
+    if mode == "full":
+        return {"mean": 0.0, "rasio_p_v_b": 0.0, "rasio_p_v_t": 0.0, "n_samples": int(img.size)}
+
+    pixels = fit_pixels(img, mode, sample_size, max_pixels).ravel()
+    means, ratios = [], []
+    for i in range(parts):
+        part = HistogramGMM(n_components=gmm.n_components).fit(pixels[i::parts])
+        means.append(np.sort(part.means_.ravel()))
+        ratios.append(_ratios(np.bincount(part.label_lut(), weights=gmm.hist_, minlength=gmm.n_components)))
+    mean_se = np.std(means, axis=0, ddof=1) / np.sqrt(parts)
+    ratio_se = np.std(ratios, axis=0, ddof=1) / np.sqrt(parts)
+
+    counts = np.bincount(gmm.label_lut(), weights=gmm.hist_, minlength=gmm.n_components)
+    bone = counts[1] + counts[2]
+    p = counts[2] / bone if bone > 0 else 0.0
+    binom_t = np.sqrt(p * (1 - p) / bone) if bone > 0 else 0.0
+    binom_b = binom_t / (1 - p) ** 2 if p < 1 else 0.0
+    bias_b = bias_t = 0.0
+    if mode == "pyramid":
+        reference = HistogramGMM(n_components=gmm.n_components).fit(stratified_sample(img, sample_size))
+        mean_se = np.hypot(mean_se, np.sort(reference.means_.ravel()) - np.sort(gmm.means_.ravel()))
+        ref_b, ref_t = _ratios(np.bincount(reference.label_lut(), weights=gmm.hist_, minlength=gmm.n_components))
+        own_b, own_t = _ratios(counts)
+        bias_b, bias_t = ref_b - own_b, ref_t - own_t
+    return {"mean": float(mean_se.max()),
+            "rasio_p_v_b": float(np.linalg.norm([ratio_se[0], binom_b, bias_b])),
+            "rasio_p_v_t": float(np.linalg.norm([ratio_se[1], binom_t, bias_t])),
+            "n_samples": int(pixels.size)}
+
+
+# ==========================================================
+# PRIOR POPULASI (WARM START)
+# ==========================================================
+# Semua radiograf sudah dinormalisasi CLAHE, jadi susunan tiga clusternya
+# mirip. Prior populasi adalah median parameter GMM (terurut gelap -> terang)
+# dari citra-citra database latih; EM yang dimulai dari prior ini tidak perlu
+# K-Means. Karena EM dengan tol=1e-3 berhenti jauh sebelum konvergen penuh,
+# titik akhirnya (dan nilai fitur) bergantung pada parameter awal: database
+# latih dan diagnosa harus memakai inisialisasi yang sama (lihat GMM_INIT di
+# pipeline.py, yang ikut masuk sidik cache fitur).
+
+def gmm_params(gmm):
+    """(weights, means, variances) GMM terurut dari cluster paling gelap"""
+    order = np.argsort(gmm.means_.ravel())
+    return gmm.weights_[order], gmm.means_.ravel()[order], gmm.covariances_.ravel()[order]
+
+
+def init_kwargs(init):
+    """Argumen HistogramGMM untuk warm start dari (weights, means, variances), atau {}"""
+    if init is None:
+        return {}
+    weights, means, variances = init
+    return {"weights_init": weights, "means_init": means, "variances_init": variances}
+
+
+def population_prior(params):
+    """Median parameter GMM (terurut) dari banyak citra; bobot dinormalisasi ulang"""
+    weights, means, variances = (np.median([p[i] for p in params], axis=0) for i in range(3))
+    return weights / weights.sum(), means, variances
+
+
+def save_prior(path, prior, n_images):
+    import json
+
+    weights, means, variances = prior
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"weights": list(map(float, weights)), "means": list(map(float, means)),
+                   "variances": list(map(float, variances)), "n_images": n_images}, f, indent=2)
+
+
+def load_prior(path):
+    """(weights, means, variances) dari file prior, atau None jika belum ada"""
+    import json
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    return tuple(np.asarray(data[key], dtype=np.float64) for key in ("weights", "means", "variances"))
+
+
+# ==========================================================
+# PELABELAN DENGAN LOOKUP TABLE
+# ==========================================================
+def segment_image(img, gmm):
+    """Citra label uint8 dan jumlah piksel per kelas dari GMM yang dilatih pada img"""
+    # Karena input uint8, label setiap piksel cukup ditentukan dari tabel 256 entri
+    # yang sudah terurut berdasarkan kecerahan, lalu diterapkan dalam satu lintasan.
+    lut = gmm.label_lut()
+    segmented_image = cv2.LUT(img, lut)
+
+    # Jumlah piksel per kelas langsung dari histogram, tanpa membaca ulang citra.
+    # GMM yang dilatih dari sampel: proporsi sampel diskalakan ke ukuran citra.
+    class_counts = np.bincount(lut, weights=gmm.hist_, minlength=gmm.n_components)
+    n_fit = gmm.hist_.sum()
+    if n_fit != img.size:
+        class_counts = np.rint(class_counts * (img.size / n_fit))
+    return segmented_image, class_counts.astype(np.int64)
+
+
+# ==========================================================
+# CEK KESETARAAN DENGAN SKLEARN
+# ==========================================================
+# K-Means sklearn (k-means++ dengan random_state) pada histogram yang datar
+# sering berhenti di titik tetap Lloyd yang berbeda, dan EM dengan tol=1e-3
+# berhenti sebelum konvergen penuh. Karena itu kesetaraan diuji dengan
+# memberi GaussianMixture parameter awal yang sama: jika EM berbobot setara
+# dengan EM per-piksel, lintasan iterasinya identik sampai galat pembulatan.
+TOLERANCE = {"mean": 1e-6, "std": 1e-6, "weight": 1e-9}
+
+
+def compare_with_sklearn(img, n_components=3, tol=1e-3):
+    """Selisih maksimum HistogramGMM vs GaussianMixture per-piksel (inisialisasi sama)"""
+    from sklearn.mixture import GaussianMixture
+
+    hgmm = HistogramGMM(n_components=n_components, tol=tol).fit(img)
+    weights, means, covariances = hgmm.init_params_
+
+    pixel_values = img.reshape(-1, 1).astype(np.float64)
+    ref = GaussianMixture(n_components=n_components, tol=tol, random_state=42,
+                          weights_init=weights, means_init=means,
+                          precisions_init=1.0 / covariances).fit(pixel_values)
+
+    return {
+        "mean": np.max(np.abs(ref.means_.ravel() - hgmm.means_.ravel())),
+        "std": np.max(np.abs(np.sqrt(ref.covariances_.ravel()) - np.sqrt(hgmm.covariances_.ravel()))),
+        "weight": np.max(np.abs(ref.weights_ - hgmm.weights_)),
+        "n_iter": (ref.n_iter_, hgmm.n_iter_),
+    }
+
+
+# ==========================================================
+# CEK PELATIHAN DARI SAMPEL VS SELURUH PIKSEL
+# ==========================================================
+def compare_with_full(img, mode, n_components=3, sample_size=SAMPLE_SIZE, max_pixels=PYRAMID_MAX_PIXELS):
+    """Selisih mean cluster dan rasio fitur (sampel vs seluruh piksel) beserta perkiraannya"""
+    full = fit_gmm(img, n_components)
+    sampled = fit_gmm(img, n_components, mode, sample_size, max_pixels)
+    full_b, full_t = _ratios(segment_image(img, full)[1])
+    sampled_b, sampled_t = _ratios(segment_image(img, sampled)[1])
+    return {
+        "mean": float(np.max(np.abs(np.sort(full.means_.ravel()) - np.sort(sampled.means_.ravel())))),
+        "rasio_p_v_t": abs(full_t - sampled_t),
+        "rasio_p_v_b": abs(full_b - sampled_b),
+        "estimate": deviation_estimate(img, sampled, sample_size, max_pixels),
+    }
+
+
+# ==========================================================
+# CEK WARM START VS K-MEANS
+# ==========================================================
+def compare_warm_start(img, init, n_components=3):
+    """Iterasi EM, waktu, dan selisih mean cluster: K-Means vs warm start dari init"""
+    import time
+
+    start = time.perf_counter()
+    cold = HistogramGMM(n_components=n_components).fit(img)
+    cold_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    warm = HistogramGMM(n_components=n_components, **init_kwargs(init)).fit(img)
+    warm_ms = (time.perf_counter() - start) * 1000
+    return {
+        "n_iter": (cold.n_iter_, warm.n_iter_),
+        "ms": (cold_ms, warm_ms),
+        "mean": float(np.max(np.abs(gmm_params(cold)[1] - gmm_params(warm)[1]))),
+        "params": gmm_params(cold),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import os
+    import sys
+    import cv2
+
+    parser = argparse.ArgumentParser(description="Cek kesetaraan HistogramGMM vs sklearn GaussianMixture")
+    parser.add_argument("paths", nargs="+", help="File gambar atau folder")
+    parser.add_argument("--mode", choices=FIT_MODES[1:],
+                        help="Bandingkan pelatihan dari sampel dengan seluruh piksel (bukan dengan sklearn)")
+    parser.add_argument("--sample-size", type=int, default=SAMPLE_SIZE, help="Jumlah piksel sampel (mode subsample)")
+    parser.add_argument("--max-pixels", type=int, default=PYRAMID_MAX_PIXELS, help="Batas piksel level piramida")
+    parser.add_argument("--prior", help="File prior populasi (gmm_prior.json): laporkan iterasi EM yang dihemat "
+                                        "warm start dari prior dan dari gambar sebelumnya")
+    args = parser.parse_args()
+    prior = load_prior(args.prior) if args.prior else None
+    if args.prior and prior is None:
+        sys.exit(f"File prior {args.prior} tidak ada. Buat dulu dengan: python train_folder.py <folder> --build-prior")
+    previous = None
+    warm_stats = {"prior": [], "gambar sebelumnya": []}
+
+    files = []
+    for p in args.paths:
+        if os.path.isdir(p):
+            files += sorted(f for f in glob.glob(os.path.join(p, "**", "*"), recursive=True) if os.path.isfile(f))
+        else:
+            files.append(p)
+
+    n_total, n_fail = 0, 0
+    for path in files:
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None: continue
+        n_total += 1
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+        img = cv2.GaussianBlur(clahe.apply(img), (3, 3), 0)
+
+        if args.prior:
+            # Warm start dari prior dan dari GMM gambar sebelumnya (urutan file)
+            previous_params = previous
+            for name, init in (("prior", prior), ("gambar sebelumnya", previous)):
+                if init is None: continue
+                diff = compare_warm_start(img, init)
+                warm_stats[name].append(diff["n_iter"] + diff["ms"] + (diff["mean"],))
+                previous_params = diff["params"]
+            previous = previous_params
+            cold_iter, warm_iter = warm_stats["prior"][-1][:2]
+            print(f"{os.path.basename(path)}: iterasi K-Means {cold_iter}, prior {warm_iter}")
+            continue
+
+        if args.mode:
+            # Selisih nyata vs perkiraan 3 sigma (deviation_estimate) dari sampel
+            diff = compare_with_full(img, args.mode, sample_size=args.sample_size, max_pixels=args.max_pixels)
+            est = diff["estimate"]
+            ok = diff["mean"] <= 3 * est["mean"] + 0.5 and diff["rasio_p_v_t"] <= 3 * est["rasio_p_v_t"] + 1e-3
+            n_fail += not ok
+            print(f"{'OK  ' if ok else 'BEDA'} {os.path.basename(path)} {img.shape[1]}x{img.shape[0]}: "
+                  f"mean={diff['mean']:.3f} (~{est['mean']:.3f}) "
+                  f"p/t={diff['rasio_p_v_t']:.4f} (~{est['rasio_p_v_t']:.4f}) "
+                  f"p/b={diff['rasio_p_v_b']:.4f} (~{est['rasio_p_v_b']:.4f}) n={est['n_samples']}")
+            continue
+
+        diff = compare_with_sklearn(img)
+        ok = all(diff[key] <= TOLERANCE[key] for key in TOLERANCE) and diff["n_iter"][0] == diff["n_iter"][1]
+        n_fail += not ok
+        print(f"{'OK  ' if ok else 'BEDA'} {os.path.basename(path)}: "
+              f"mean={diff['mean']:.2e} std={diff['std']:.2e} weight={diff['weight']:.2e} "
+              f"iterasi={diff['n_iter'][0]}/{diff['n_iter'][1]}")
+
+    if args.prior:
+        # Fitur hanya sebanding jika database latih dibangun dengan inisialisasi yang sama
+        for name, stats in warm_stats.items():
+            if not stats: continue
+            stats = np.array(stats)
+            print(f"\nWarm start {name} ({len(stats)} citra): iterasi EM rata-rata {stats[:, 0].mean():.2f} -> "
+                  f"{stats[:, 1].mean():.2f} (hemat {stats[:, 0].mean() - stats[:, 1].mean():.2f}), "
+                  f"waktu {stats[:, 2].mean():.2f} -> {stats[:, 3].mean():.2f} ms, "
+                  f"selisih mean cluster median {np.median(stats[:, 4]):.2f} level")
+        sys.exit(0)
+
+    print(f"\n{n_total - n_fail}/{n_total} citra sesuai toleransi.")
+    sys.exit(1 if n_fail else 0)
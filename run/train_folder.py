@@ -0,0 +1,129 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline import (FEATURE_BANK, GMM_PRIOR_FILE, csv_header, feature_fingerprint, feature_row,
+                      image_gmm_params, init_worker, normalize_label)
+from segmentasi import population_prior, save_prior
+from augmentasi import augmented_feature_rows
+from variant_archive import is_archive, shard_feature_rows, shard_paths
+import feature_store
+
+# ==========================================================
+# TRAINING BATCH DARI FOLDER BERLABEL (TANPA GUI)
+# ==========================================================
+# Contoh:
+#   python train_folder.py ../data-uji ../data-uji-2 --workers 4
+# Label diambil dari nama folder (Normal/Osteopenia/Osteoporosis, huruf besar
+# kecil bebas), misalnya data-uji/Normal/x.jpg atau data-uji-2/osteoporosis/y.png.
+# Tambahkan --feature-bank untuk menyimpan juga bank fitur GLCM multi sudut,
+# dan --augment untuk menambahkan 30 variasi flip/rotasi/zoom per gambar
+# (dibuat di memori, tanpa file JPEG perantara). Folder arsip variasi
+# (variant_archive.py) juga bisa langsung diberikan sebagai folder dataset.
+# --build-prior hanya menghitung prior populasi GMM (gmm_prior.json) dari
+# citra-citra ini, untuk mode warm start GMM_INIT = "prior" di pipeline.py.
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+
+def collect_labelled_images(root_dir):
+    """Daftar (path, label) dari pohon folder; label = folder terdekat yang dikenali"""
+    jobs = []
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames.sort()
+        rel_parts = os.path.relpath(dirpath, root_dir).split(os.sep)
+        label = None
+        for part in reversed(rel_parts):
+            label = normalize_label(part)
+            if label: break
+        if label is None: continue
+
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                jobs.append((os.path.join(dirpath, name), label))
+    return jobs
+
+
+def _process(job):
+    # Mode bank fitur ikut dikirim per job (proses spawn di Windows tidak mewarisi global)
+    path, label, feature_bank, augment = job
+    try:
+        if label is None:
+            # Satu shard arsip variasi; label diambil dari tabel index shard
+            return shard_feature_rows(path, feature_bank=feature_bank)
+        if augment:
+            return list(augmented_feature_rows(path, label, feature_bank=feature_bank, workers=1))
+        row = feature_row(path, label, feature_bank=feature_bank)
+        return [row] if row is not None else []
+    except Exception as e:
+        print(f"Error {path}: {e}", file=sys.stderr)
+        return []
+
+
+def build_prior(root_dirs, path=GMM_PRIOR_FILE, workers=None):
+    """Prior populasi GMM (median parameter per citra) dari folder latih; jumlah citra"""
+    paths = [p for root_dir in root_dirs for p, _ in collect_labelled_images(root_dir)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        params = [p for p in executor.map(image_gmm_params, paths, chunksize=8) if p is not None]
+    if not params:
+        return 0
+    save_prior(path, population_prior(params), len(params))
+    return len(params)
+
+
+def train_from_folders(root_dirs, store, workers=None, feature_bank=FEATURE_BANK, augment=False):
+    """Ekstraksi fitur semua citra berlabel lalu menulis ke database sekaligus"""
+    jobs = []
+    for root_dir in root_dirs:
+        if is_archive(root_dir):
+            jobs += [(path, None, feature_bank, False) for path in shard_paths(root_dir)]
+            continue
+        jobs += [(path, label, feature_bank, augment) for path, label in collect_labelled_images(root_dir)]
+    if not jobs:
+        print("Tidak ada gambar berlabel yang ditemukan.")
+        return 0
+
+    total = len(jobs)
+    rows = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        # Satu shard arsip sudah berisi ratusan variasi, jadi dibagikan satu per satu
+        chunksize = 1 if any(job[1] is None for job in jobs) else 4
+        for i, image_rows in enumerate(executor.map(_process, jobs, chunksize=chunksize)):
+            rows += image_rows
+            print(f"\rMemproses {i+1}/{total}...", end="", flush=True)
+    print()
+
+    saved = feature_store.append_rows(store, rows, csv_header(feature_bank), feature_fingerprint()) if rows else 0
+
+    elapsed = time.perf_counter() - start
+    print(f"Selesai! {saved}/{len(rows)} data dari {total} gambar/shard disimpan ke {store} ({elapsed:.1f} detik).")
+    if saved < len(rows):
+        print(f"{len(rows) - saved} data dilewati karena sudah ada di database.")
+    return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Training data latih dari folder berlabel (tanpa GUI)")
+    parser.add_argument("folders", nargs="+", help="Folder dataset, mis. ../data-uji")
+    parser.add_argument("--db", default=feature_store.DEFAULT_STORE,
+                        help=f"Folder database fitur (default: {feature_store.DEFAULT_STORE})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Jumlah proses paralel")
+    parser.add_argument("--feature-bank", action="store_true", default=FEATURE_BANK,
+                        help="Simpan juga bank fitur GLCM (jarak 1-3, sudut 0/45/90/135)")
+    parser.add_argument("--augment", action="store_true",
+                        help="Tambahkan 30 variasi flip/rotasi/zoom per gambar (di memori)")
+    parser.add_argument("--build-prior", action="store_true",
+                        help=f"Hanya hitung prior populasi GMM ke {GMM_PRIOR_FILE} (warm start)")
+    args = parser.parse_args()
+
+    if args.build_prior:
+        n = build_prior(args.folders, workers=args.workers)
+        print(f"Prior GMM dari {n} citra ditulis ke {GMM_PRIOR_FILE}." if n else "Tidak ada citra berlabel.")
+        sys.exit(0 if n else 1)
+
+    saved = train_from_folders(args.folders, args.db, workers=args.workers,
+                               feature_bank=args.feature_bank, augment=args.augment)
+    sys.exit(0 if saved else 1)
@@ -1,118 +1,57 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import cv2
-import numpy as np
-from sklearn.mixture import GaussianMixture
-from skimage.feature import graycomatrix, graycoprops # GLCM
-import matplotlib
-matplotlib.use('TkAgg') 
-
-import matplotlib.pyplot as plt
 import os
-import csv 
 
-# ==========================================================
-# FUNGSI PRE-PROCESSING: CLAHE
-# ==========================================================
-def preprocess_image(image_path):
-    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-    if img is None: return None
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    improved_img = clahe.apply(img)
-    improved_img = cv2.GaussianBlur(improved_img, (3, 3), 0)
-    return improved_img
+from lazy_imports import BackgroundLoader
+from worker import WorkerClient
 
 # ==========================================================
-# FUNGSI EKSTRAKSI FITUR TEKSTUR (GLCM & STATISTIK)
+# PUSTAKA BERAT (DIMUAT DI LATAR BELAKANG)
 # ==========================================================
-def extract_additional_features(img):
-    """Menghitung fitur GLCM dan Statistik Tekstur"""
-    # 1. Statistik Tekstur Dasar (Mean & Variance)
-    mean_val = np.mean(img)
-    var_val = np.var(img)
-
-    # 2. GLCM (Gray-Level Co-occurrence Matrix)
-    # Menggunakan jarak 1 piksel dan sudut 0 derajat untuk efisiensi
-    glcm = graycomatrix(img, distances=[1], angles=[0], levels=256, symmetric=True, normed=True)
-    
-    contrast = graycoprops(glcm, 'contrast')[0, 0]
-    homogeneity = graycoprops(glcm, 'homogeneity')[0, 0]
-    energy = graycoprops(glcm, 'energy')[0, 0]
-    correlation = graycoprops(glcm, 'correlation')[0, 0]
-
-    return {
-        "mean": mean_val,
-        "variance": var_val,
-        "contrast": contrast,
-        "homogeneity": homogeneity,
-        "energy": energy,
-        "correlation": correlation
-    }
+# Jendela langsung muncul; matplotlib, OpenCV dan pipeline dimuat selama
+# pengguna memilih label dan gambar (lihat lazy_imports.py).
+def load_libraries():
+    global plt, FEATURE_BANK, analyze_image, csv_header, extract_features_cached, feature_fingerprint, feature_store
+    import matplotlib
+    matplotlib.use('TkAgg')
+    import matplotlib.pyplot as plt
+    from pipeline import FEATURE_BANK, analyze_image, csv_header, extract_features_cached, feature_fingerprint
+    import feature_store
+
+libraries = BackgroundLoader(load_libraries)
+
+# Worker launcher (worker.py); tanpa launcher fitur dihitung di proses ini
+worker = WorkerClient()
 
 # ==========================================================
 # FUNGSI INTI ANALISIS
 # ==========================================================
 def run_analysis(image_path, diagnosis_label, silent_mode=False, n_clusters=3):
     try:
-        img = preprocess_image(image_path)
-        if img is None: return False
-
-        # --- GMM SEGMENTATION ---
-        # Perbaikan: Tambahkan .astype(np.float64) untuk menghindari RuntimeWarning
-        pixel_values = img.reshape(-1, 1).astype(np.float64)
-        gmm = GaussianMixture(n_components=n_clusters, random_state=42)
-        gmm.fit(pixel_values) 
-        labels = gmm.predict(pixel_values)
-
-        # Mengurutkan label cluster berdasarkan kecerahan rata-rata
-        means = gmm.means_.flatten()
-        sorted_indices = np.argsort(means)
-        sorted_labels = np.zeros_like(labels)
-        for i, idx in enumerate(sorted_indices):
-            sorted_labels[labels == idx] = i
-
-        segmented_image = sorted_labels.reshape(img.shape)
-
-        # --- FITUR RASIO ---
-        pixels_padat = np.count_nonzero(segmented_image == 2)
-        pixels_berpori = np.count_nonzero(segmented_image == 1)
-        pixels_total_tulang = pixels_padat + pixels_berpori
-        rasio_p_v_b = pixels_padat / pixels_berpori if pixels_berpori > 0 else 0.0
-        rasio_p_v_t = pixels_padat / pixels_total_tulang if pixels_total_tulang > 0 else 0.0
-
-        # --- FITUR TEKSTUR & STATISTIK ---
-        extra = extract_additional_features(img)
-
-        # --- SIMPAN KE CSV ---
+        # Preprocess, segmentasi GMM dan ekstraksi fitur ada di pipeline.py
+        # (dipakai bersama oleh train_folder.py untuk training tanpa GUI).
+        # Mode batch tidak butuh gambar, jadi fitur boleh diambil dari cache.
+        if silent_mode:
+            features = extract_features_cached(image_path, n_clusters=n_clusters, feature_bank=FEATURE_BANK)
+            if features is None: return False
+        else:
+            result = analyze_image(image_path, n_clusters=n_clusters, feature_bank=FEATURE_BANK)
+            if result is None: return False
+            img, segmented_image, features = result
+
+        # --- SIMPAN KE DATABASE ---
         file_name = os.path.basename(image_path)
-        csv_filename = "database_fitur.csv"
-        file_exists = os.path.isfile(csv_filename)
-        
-        header = [
-            'nama_file', 'rasio_p_v_b', 'rasio_p_v_t', 
-            'glcm_contrast', 'glcm_homogeneity', 'glcm_energy', 'glcm_correlation',
-            'stat_mean', 'stat_variance', 'diagnosa'
-        ]
-
-        with open(csv_filename, mode='a', newline='') as csv_file:
-            writer = csv.writer(csv_file)
-            if not file_exists:
-                writer.writerow(header)
-            
-            writer.writerow([
-                file_name, rasio_p_v_b, rasio_p_v_t,
-                extra['contrast'], extra['homogeneity'], extra['energy'], extra['correlation'],
-                extra['mean'], extra['variance'], diagnosis_label
-            ])
-
-        print(f"Data Berhasil Disimpan: {file_name}")
+        saved = feature_store.append_rows(feature_store.DEFAULT_STORE, [[file_name] + list(features) + [diagnosis_label]],
+                                          csv_header(FEATURE_BANK), feature_fingerprint(n_clusters))
+
+        if saved:
+            print(f"Data Berhasil Disimpan: {file_name}")
+        else:
+            print(f"Data Sudah Ada (dilewati): {file_name}")
 
         # Visualisasi (Jika bukan batch)
         if not silent_mode:
-            plt.figure(figsize=(10, 5))
-            plt.subplot(1, 2, 1); plt.imshow(img, cmap='gray'); plt.title("Original (CLAHE)")
-            plt.subplot(1, 2, 2); plt.imshow(segmented_image, cmap='viridis'); plt.title("GMM Segmentation")
-            plt.show()
+            show_segmentation(img, segmented_image)
 
         return True
 
@@ -120,6 +59,37 @@ def run_analysis(image_path, diagnosis_label, silent_mode=False, n_clusters=3):
         print(f"Error: {e}")
         return False
 
+def show_segmentation(img, segmented_image):
+    plt.figure(figsize=(10, 5))
+    plt.subplot(1, 2, 1); plt.imshow(img, cmap='gray'); plt.title("Original (CLAHE)")
+    plt.subplot(1, 2, 2); plt.imshow(segmented_image, cmap='viridis'); plt.title("GMM Segmentation")
+    plt.show()
+
+def run_in_worker(file_paths, diagnosis_label, silent):
+    """Jumlah citra yang berhasil diproses oleh worker launcher, atau None jika worker tidak tersedia"""
+    def show_progress(event):
+        if event.get("status") == "saved":
+            print(f"Data Berhasil Disimpan: {event['file']}")
+        elif event.get("status") == "skipped":
+            print(f"Data Sudah Ada (dilewati): {event['file']}")
+        if silent and "done" in event:
+            status_label.config(text=f"Memproses {event['done']}/{event['total']}...", foreground="blue")
+        root.update() # Update UI agar tidak freeze
+
+    try:
+        result = worker.submit({"job": "train", "paths": [os.path.abspath(p) for p in file_paths],
+                                "label": diagnosis_label, "images": not silent}, show_progress)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return 0
+    if result is None:
+        return None
+
+    libraries.wait()
+    for _, img, segmented_image in result["images"]:
+        show_segmentation(img, segmented_image)
+    return result["saved"]
+
 # ==========================================================
 # GUI CONTROL
 # ==========================================================
@@ -146,16 +116,27 @@ def select_image_and_run():
     # 4. Cek Jumlah File & Tentukan Mode
     total = len(file_paths)
     silent = total > 1
-    success = 0
-    
-    for i, path in enumerate(file_paths):
-        if silent:
-            status_label.config(text=f"Memproses {i+1}/{total}...", foreground="blue")
-            root.update() # Update UI agar tidak freeze
 
-        # Jalankan Analisis
-        if run_analysis(path, selected_diagnosis, silent_mode=silent):
-            success += 1
+    # Worker launcher sudah memuat pustaka; progres per gambar dikirim balik sebagai event
+    status_label.config(text="Memproses...", foreground="blue")
+    root.update_idletasks()
+    success = run_in_worker(file_paths, selected_diagnosis, silent)
+
+    if success is None:
+        # Tanpa worker: pustaka sudah dimuat di latar belakang selama dialog terbuka
+        status_label.config(text="Memuat pustaka...", foreground="blue")
+        root.update_idletasks()
+        libraries.wait()
+        success = 0
+
+        for i, path in enumerate(file_paths):
+            if silent:
+                status_label.config(text=f"Memproses {i+1}/{total}...", foreground="blue")
+                root.update() # Update UI agar tidak freeze
+
+            # Jalankan Analisis
+            if run_analysis(path, selected_diagnosis, silent_mode=silent):
+                success += 1
 
     # 5. Laporan Selesai
     msg = f"Selesai! {success}/{total} data berhasil disimpan."
@@ -187,4 +168,5 @@ if __name__ == "__main__":
 
     ttk.Button(main_frame, text="Pilih Gambar & Proses", command=select_image_and_run).pack(pady=10, ipady=5)
 
+    libraries.start()
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,302 @@
+import os
+import subprocess
+import sys
+import threading
+import traceback
+from multiprocessing.connection import Client, Listener
+
+from lazy_imports import BackgroundLoader
+import profiling
+
+# ==========================================================
+# WORKER PERSISTEN DI BELAKANG LAUNCHER
+# ==========================================================
+# Tanpa worker, setiap klik di launcher membuka interpreter baru yang mengimpor
+# ulang OpenCV/sklearn dan (untuk diagnosa) memuat atau melatih ulang Random
+# Forest. Launcher kini menjalankan satu proses worker.py yang hidup selama
+# launcher terbuka; pustaka, prior GMM, cache indeks sampel dan model terlatih
+# tetap di memori. Jendela training/diagnosa mengirim job ke worker lewat
+# soket lokal (multiprocessing.connection, 127.0.0.1 + authkey acak) dan
+# menerima event progres lalu hasil akhirnya:
+#
+#   {"job": "diagnose", "path": ..., "profile": False, "original": False}
+#   {"job": "train", "paths": [...], "label": "Normal", "images": True}
+#   -> {"event": "progress", ...} x n, lalu {"event": "result", ...} atau {"event": "error", ...}
+#
+# Alamat dan kunci diteruskan launcher lewat variabel lingkungan ENV_ADDRESS
+# dan ENV_KEY. Jika worker tidak ada (alat dibuka langsung) atau mati, alat
+# kembali menghitung sendiri di prosesnya. Job dijalankan satu per satu; worker
+# berhenti sendiri saat launcher ditutup (stdin-nya tertutup).
+#
+# Cek tanpa layar (menjalankan worker lalu tiga diagnosa berturut-turut beserta waktunya):
+#   python worker.py --check ../data-uji
+
+ENV_ADDRESS = "AGUNG_WORKER"
+ENV_KEY = "AGUNG_WORKER_KEY"
+HOST = "127.0.0.1"
+CONNECT_TIMEOUT = 10.0 # Detik menunggu worker menulis alamatnya saat start
+
+
+def load_libraries():
+    global np
+    global analyze_image, extract_features_cached, csv_header, FEATURE_BANK
+    global preprocess_image, decode_image, fit_image_gmm, segment_image, extract_features_complete, file_cache_key
+    global feature_fingerprint, DIAGNOSE_IMAGE_CACHE
+    global get_features, put_features, fitted_forest, feature_store
+    import numpy as np
+
+    from segmentasi import segment_image
+    from pipeline import (DIAGNOSE_IMAGE_CACHE, FEATURE_BANK, analyze_image, csv_header, extract_features_cached,
+                          decode_image, extract_features_complete, feature_fingerprint, file_cache_key,
+                          fit_image_gmm, preprocess_image)
+    from feature_cache import get_features, put_features
+    from model_store import fitted_forest
+    import feature_store
+
+libraries = BackgroundLoader(load_libraries)
+
+_job_lock = threading.Lock()
+
+
+# ==========================================================
+# JOB (DIJALANKAN DI PROSES WORKER)
+# ==========================================================
+def run_diagnose(job, send):
+    """Diagnosa satu citra; tahapnya sama dengan diagnose.py (lihat profiling.py)"""
+    path = job["path"]
+    profiling.set_enabled(job.get("profile", False))
+    with profiling.session() as profile:
+        with profiling.stage("model"):
+            model, n_data = fitted_forest(job.get("database", feature_store.DEFAULT_STORE))
+        if model is None:
+            return {"warning": n_data}
+        send({"event": "progress", "text": "Memproses citra..."})
+
+        with profiling.stage("preprocess"):
+            original = decode_image(path, DIAGNOSE_IMAGE_CACHE) if job.get("original") else None
+            img = preprocess_image(path, DIAGNOSE_IMAGE_CACHE)
+            if img is None:
+                raise ValueError(f"Gambar tidak terbaca: {path}")
+        with profiling.stage("gmm_fit") as info:
+            gmm = fit_image_gmm(img, n_clusters=3)
+            info.update(profiling.gmm_info(gmm))
+        with profiling.stage("label"):
+            segmented_image, class_counts = segment_image(img, gmm)
+        with profiling.stage("features") as info:
+            cache_key, _ = file_cache_key(path)
+            features = get_features(cache_key)
+            info["cache_hit"] = features is not None
+            if features is None:
+                features = extract_features_complete(img, segmented_image, class_counts)
+                put_features(cache_key, features)
+        with profiling.stage("predict"):
+            # Satu penelusuran forest datar: label (argmax) dan probabilitasnya sekaligus
+            labels, proba = model.predict_with_proba([features])
+            diagnosa = labels[0]
+            probabilitas = float(np.max(proba[0]) * 100)
+
+    return {"diagnosa": str(diagnosa), "probabilitas": probabilitas, "n_data": n_data,
+            "img": img, "segmented": segmented_image, "original": original,
+            "stages": profile.stages if profile is not None else None}
+
+
+def run_train(job, send):
+    """Ekstraksi fitur + simpan ke database untuk sekumpulan citra berlabel (sama dengan training.py)"""
+    paths, label = job["paths"], job["label"]
+    database = job.get("database", feature_store.DEFAULT_STORE)
+    keep_images = job.get("images", False)
+    saved, images = 0, []
+    for i, path in enumerate(paths):
+        status = "failed"
+        try:
+            if keep_images:
+                result = analyze_image(path, feature_bank=FEATURE_BANK)
+                features = None if result is None else result[2]
+            else:
+                features = extract_features_cached(path, feature_bank=FEATURE_BANK)
+            if features is not None:
+                row = [os.path.basename(path)] + list(features) + [label]
+                saved_row = feature_store.append_rows(database, [row], csv_header(FEATURE_BANK), feature_fingerprint())
+                status = "saved" if saved_row else "skipped"
+                saved += 1
+                if keep_images:
+                    images.append((path, result[0], result[1]))
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+        send({"event": "progress", "done": i + 1, "total": len(paths), "file": os.path.basename(path), "status": status})
+    return {"saved": saved, "total": len(paths), "images": images}
+
+
+JOBS = {"diagnose": run_diagnose, "train": run_train}
+
+
+def _serve_connection(conn):
+    with conn:
+        while True:
+            try:
+                job = conn.recv()
+                if not _job_lock.acquire(blocking=False):
+                    conn.send({"event": "progress", "text": "Menunggu worker siap..."})
+                    _job_lock.acquire()
+            except (EOFError, OSError):
+                return
+            try:
+                libraries.wait()
+                reply = {"event": "result", **JOBS[job["job"]](job, conn.send)}
+            except (EOFError, ConnectionError):
+                return # Jendela ditutup sebelum job selesai
+            except Exception as e:
+                traceback.print_exc()
+                reply = {"event": "error", "message": f"{type(e).__name__}: {e}"}
+            finally:
+                _job_lock.release()
+                if job.get("job") == "train":
+                    _warm_model() # Database berubah: latih ulang sekarang, bukan saat diagnosa berikutnya
+            try:
+                conn.send(reply)
+            except OSError:
+                return
+
+
+def _warm_model(database=None):
+    """Memuat pustaka dan model di latar belakang agar diagnosa pertama pun sudah hangat"""
+    def warm():
+        with _job_lock:
+            try:
+                libraries.wait()
+                fitted_forest(database or feature_store.DEFAULT_STORE)
+            except Exception:
+                traceback.print_exc()
+    threading.Thread(target=warm, daemon=True).start()
+
+
+def _exit_with_parent():
+    # Launcher memegang ujung tulis stdin worker; EOF berarti launcher sudah berhenti
+    try:
+        sys.stdin.read()
+    finally:
+        os._exit(0)
+
+
+def serve(authkey):
+    """Loop utama worker: alamat ditulis ke stdout, lalu melayani setiap koneksi di thread sendiri"""
+    listener = Listener((HOST, 0), authkey=authkey)
+    print(f"{HOST}:{listener.address[1]}", flush=True)
+    # Launcher hanya membaca baris alamat; keluaran berikutnya (juga dari OpenCV) ke stderr
+    # agar pipa stdout yang tidak dibaca tidak penuh dan menghentikan worker
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    threading.Thread(target=_exit_with_parent, daemon=True).start()
+    _warm_model()
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception:
+            continue # Klien dengan kunci salah atau koneksi terputus saat handshake
+        threading.Thread(target=_serve_connection, args=(conn,), daemon=True).start()
+
+
+# ==========================================================
+# LAUNCHER DAN KLIEN
+# ==========================================================
+def spawn(cwd=None):
+    """Menjalankan worker.py sebagai proses anak; (proses, env untuk alat) atau (None, {}) jika gagal
+
+    cwd harus sama dengan folder kerja alat, karena database dan cache dibuka relatif terhadapnya.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+    authkey = os.urandom(16).hex()
+    env = dict(os.environ, **{ENV_KEY: authkey})
+    try:
+        process = subprocess.Popen([sys.executable, script], cwd=cwd, env=env,
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    except OSError as e:
+        print(f"Worker tidak bisa dijalankan: {e}")
+        return None, {}
+
+    # Alamat ditulis sebelum pustaka berat dimuat, jadi biasanya tersedia dalam <1 detik
+    address = []
+    reader = threading.Thread(target=lambda: address.append(process.stdout.readline().strip()), daemon=True)
+    reader.start()
+    reader.join(CONNECT_TIMEOUT)
+    if not address or not address[0]:
+        process.kill()
+        print("Worker tidak merespons, alat akan berjalan tanpa worker.")
+        return None, {}
+    return process, {ENV_ADDRESS: address[0], ENV_KEY: authkey}
+
+
+def connect():
+    """Koneksi ke worker milik launcher, atau None (alat dibuka langsung / worker mati)"""
+    address, authkey = os.environ.get(ENV_ADDRESS), os.environ.get(ENV_KEY)
+    if not address or not authkey:
+        return None
+    host, port = address.rsplit(":", 1)
+    try:
+        return Client((host, int(port)), authkey=authkey.encode("ascii"))
+    except (OSError, EOFError, ValueError) as e:
+        print(f"Worker tidak tersedia ({e}), memproses di jendela ini.")
+        return None
+
+
+class WorkerClient:
+    """Koneksi satu jendela alat ke worker; dibuka saat job pertama dan dibuka ulang jika terputus"""
+
+    def __init__(self):
+        self._conn = None
+
+    def submit(self, job, progress=None):
+        """Hasil job dari worker, atau None jika worker tidak tersedia (alat menghitung sendiri)"""
+        if self._conn is None:
+            self._conn = connect()
+            if self._conn is None:
+                return None
+        try:
+            return submit(self._conn, job, progress)
+        except (OSError, EOFError) as e:
+            print(f"Koneksi ke worker terputus ({e}), memproses di jendela ini.")
+            self._conn = None
+            return None
+
+
+def submit(conn, job, progress=None):
+    """Mengirim satu job dan menunggu hasilnya; event progres diteruskan ke progress(event)"""
+    conn.send(job)
+    while True:
+        event = conn.recv()
+        if event["event"] == "progress":
+            if progress:
+                progress(event)
+        elif event["event"] == "error":
+            raise RuntimeError(event["message"])
+        else:
+            return event
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--check":
+        import glob
+        import time
+
+        folder = sys.argv[2] if len(sys.argv) > 2 else os.path.join("..", "data-uji")
+        images = sorted(glob.glob(os.path.join(folder, "**", "*.jpg"), recursive=True))[:3]
+        if not images:
+            sys.exit(f"Tidak ada gambar di {folder}")
+
+        process, env = spawn()
+        if process is None:
+            sys.exit(1)
+        os.environ.update(env)
+        conn = connect()
+        for i, path in enumerate(images):
+            start = time.perf_counter()
+            result = submit(conn, {"job": "diagnose", "path": os.path.abspath(path), "profile": True})
+            elapsed = (time.perf_counter() - start) * 1000
+            if "warning" in result:
+                sys.exit(f"Worker: {result['warning']}")
+            stages = ", ".join(f"{s['name']} {s['wall_ms']:.0f}" for s in result["stages"])
+            print(f"Diagnosa {i + 1}: {result['diagnosa']} ({result['probabilitas']:.0f}%) {elapsed:.0f} ms [{stages}]")
+        conn.close()
+        process.stdin.close()
+        process.wait(5)
+    else:
+        serve(os.environ[ENV_KEY].encode("ascii"))
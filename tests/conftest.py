@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul aplikasi ada di run/ (salinan rpi/ identik untuk modul bersama), bukan paket
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "run"))
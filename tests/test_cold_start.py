@@ -0,0 +1,19 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from lazy_imports import HEAVY_MODULES, TOOLS
+
+RUN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "run")
+
+
+@pytest.mark.parametrize("tool", TOOLS)
+def test_tool_import_skips_heavy_libraries(tool):
+    # Proses baru agar sys.modules bersih dari impor test lain
+    code = f"import json, sys, {tool}; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=RUN_DIR, check=True)
+    loaded = {name.split(".")[0] for name in json.loads(result.stdout.splitlines()[-1])}
+    assert not loaded & set(HEAVY_MODULES)
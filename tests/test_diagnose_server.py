@@ -0,0 +1,55 @@
+import http.client
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+import diagnose_server
+import feature_store
+from pipeline import CSV_HEADER, feature_fingerprint
+
+LABELS = ["Normal", "Osteopenia", "Osteoporosis"]
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = str(tmp_path / "database_fitur.store")
+    rng = np.random.default_rng(0)
+    rows = [[f"citra_{i}.jpg"] + list(rng.normal(size=8) + i % 3) + [LABELS[i % 3]] for i in range(30)]
+    feature_store.append_rows(store, rows, CSV_HEADER, feature_fingerprint())
+
+    service = diagnose_server.DiagnosisService(store, workers=1, queue_limit=1)
+    httpd = diagnose_server.make_server(service, port=0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield service, httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+    service.close()
+
+
+def test_full_queue_answers_503_before_reading_body(server):
+    service, port = server
+    service.reserve() # Semua slot (1 worker + 1 antrian) dipegang
+    service.reserve()
+
+    # Header menjanjikan 10 MB tetapi body tidak pernah dikirim: jawaban 503 hanya
+    # bisa datang jika server tidak menunggu body
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.putrequest("POST", "/diagnose")
+        conn.putheader("Content-Length", str(10 * 1024 * 1024))
+        conn.endheaders()
+        response = conn.getresponse()
+        assert response.status == 503
+        assert response.getheader("Retry-After") == "1"
+    finally:
+        conn.close()
+
+    metrics = service.metrics.snapshot()
+    assert metrics["rejected"] == 1 and metrics["in_flight"] == 2
+    service.release()
+    service.release()
+    assert service.metrics.snapshot()["in_flight"] == 0
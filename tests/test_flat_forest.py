@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+sklearn_ensemble = pytest.importorskip("sklearn.ensemble")
+
+from flat_forest import export_forest, load_forest, save_forest
+
+
+def _synthetic(n_rows=150, n_features=8, seed=0):
+    rng = np.random.default_rng(seed)
+    y = rng.choice(np.array(["Normal", "Osteopenia", "Osteoporosis"], dtype=object), n_rows)
+    centers = {"Normal": 0.0, "Osteopenia": 1.0, "Osteoporosis": 2.0}
+    X = rng.normal(size=(n_rows, n_features)) + np.array([centers[label] for label in y])[:, np.newaxis]
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def model_and_rows():
+    X, y = _synthetic()
+    model = sklearn_ensemble.RandomForestClassifier(n_estimators=25, random_state=42).fit(X, y)
+    # Data latih + titik acak + nilai tepat di ambang pohon pertama (kasus <=)
+    random_rows = np.random.default_rng(1).uniform(X.min() - 1, X.max() + 1, (500, X.shape[1]))
+    tree = model.estimators_[0].tree_
+    at_threshold = np.tile(X.mean(axis=0), (tree.node_count, 1))
+    for i, (f, t) in enumerate(zip(tree.feature, tree.threshold)):
+        if f >= 0:
+            at_threshold[i, f] = t
+    return model, np.vstack([X, random_rows, at_threshold])
+
+
+def test_predict_proba_identical_to_sklearn(model_and_rows):
+    model, rows = model_and_rows
+    labels, proba = export_forest(model).predict_with_proba(rows)
+    assert np.array_equal(proba, model.predict_proba(rows))
+    assert np.array_equal(labels, model.predict(rows))
+
+
+def test_single_row_identical_to_sklearn(model_and_rows):
+    model, rows = model_and_rows
+    forest = export_forest(model)
+    for row in rows[:20]:
+        assert np.array_equal(forest.predict_proba(row), model.predict_proba(row[np.newaxis, :]))
+
+
+def test_npz_roundtrip(model_and_rows, tmp_path):
+    model, rows = model_and_rows
+    path = tmp_path / "model.forest.npz"
+    save_forest(str(path), export_forest(model), {"n_data": 150})
+    forest, meta = load_forest(str(path))
+    assert meta["n_data"] == 150
+    assert np.array_equal(forest.predict_proba(rows), model.predict_proba(rows))
+    assert list(forest.classes_) == list(model.classes_)
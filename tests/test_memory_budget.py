@@ -0,0 +1,24 @@
+import pytest
+
+import benchmark
+import pipeline
+
+
+@pytest.fixture(scope="module")
+def results():
+    if benchmark.peak_rss_mb() is None:
+        pytest.skip("Peak RSS tidak tersedia di platform ini")
+    return benchmark.memory_results()
+
+
+def test_low_memory_peak_within_budget(results):
+    stages = results["low"]["stages_mb"]
+    assert max(stages.values()) <= pipeline.MEMORY_BUDGET_MB, stages
+    assert results["low"]["label_dtype"] == "uint8"
+
+
+def test_low_memory_features_match_normal_mode(results):
+    # Hanya mean/variance (dari histogram) yang boleh bergeser di digit terakhir
+    assert benchmark.max_feature_diff(results) < benchmark.LOW_MEMORY_TOLERANCE
+    full, low = results["full"]["features"], results["low"]["features"]
+    assert full[:6] == low[:6] # rasio + GLCM identik
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+import feature_store
+import model_store
+from pipeline import CSV_HEADER, feature_fingerprint
+
+LABELS = ["Normal", "Osteopenia", "Osteoporosis"]
+
+
+def _rows(start, n, seed):
+    rng = np.random.default_rng(seed)
+    return [[f"citra_{start + i}.jpg"] + list(rng.normal(size=8) + i % 3) + [LABELS[i % 3]] for i in range(n)]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path) # gmm_prior.json relatif folder kerja
+    path = str(tmp_path / "database_fitur.store")
+    feature_store.append_rows(path, _rows(0, 30, 0), CSV_HEADER, feature_fingerprint())
+    return path
+
+
+def test_fitted_forest_cached_until_store_changes(store):
+    model, n_data = model_store.fitted_forest(store)
+    assert n_data == 30
+    assert model_store.fitted_forest(store)[0] is model # Tetap di memori selama database tidak berubah
+
+    feature_store.append_rows(store, _rows(30, 6, 1), CSV_HEADER, feature_fingerprint())
+    assert model_store.load_forest(store) is None # Forest .npz lama tidak cocok lagi dengan isi database
+    new_model, new_n_data = model_store.fitted_forest(store)
+    assert new_n_data == 36
+    assert new_model is not model
+
+
+def test_fitted_forest_refuses_other_pipeline(store):
+    feature_store.append_rows(store, _rows(30, 3, 2), CSV_HEADER, "pipeline lain")
+    model, message = model_store.fitted_forest(store)
+    assert model is None
+    assert "pipeline" in message
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from segmentasi import TOLERANCE, HistogramGMM, compare_with_sklearn, intensity_histogram, segment_image
+
+
+def _trimodal_image(seed=0, shape=(120, 160)):
+    # Tiga populasi intensitas (latar gelap, pori, tulang padat) seperti citra hasil CLAHE
+    rng = np.random.default_rng(seed)
+    centers = rng.choice([50.0, 120.0, 200.0], size=shape, p=[0.3, 0.3, 0.4])
+    return np.clip(rng.normal(centers, 15.0), 0, 255).astype(np.uint8)
+
+
+def test_histogram_matches_bincount():
+    img = _trimodal_image()
+    assert np.array_equal(intensity_histogram(img), np.bincount(img.ravel(), minlength=256))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_histogram_gmm_matches_sklearn(seed):
+    pytest.importorskip("sklearn")
+    diff = compare_with_sklearn(_trimodal_image(seed))
+    for key, tolerance in TOLERANCE.items():
+        assert diff[key] <= tolerance, (key, diff[key])
+    assert diff["n_iter"][0] == diff["n_iter"][1]
+
+
+def test_segment_labels_follow_sorted_means():
+    img = _trimodal_image()
+    gmm = HistogramGMM(n_components=3).fit(img)
+    segmented, class_counts = segment_image(img, gmm)
+
+    # Label LUT = prediksi per piksel, diurutkan dari cluster paling gelap
+    rank = np.argsort(np.argsort(gmm.means_.ravel()))
+    expected = rank[gmm.predict(img.ravel())].reshape(img.shape)
+    assert segmented.dtype == np.uint8
+    assert np.array_equal(segmented, expected)
+    assert np.array_equal(class_counts, np.bincount(expected.ravel(), minlength=3))
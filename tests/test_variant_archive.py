@@ -0,0 +1,33 @@
+import cv2
+import numpy as np
+
+from variant_archive import archive_index, load_variant, read_index, shard_paths, write_archive
+
+PARAMS = [(False, 0, 1.0), (True, 5, 1.05)]
+
+
+def _write_image(path, value):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    img = np.full((40, 48), value, np.uint8)
+    img[10:30, 12:36] = 255 - value # Pola agar variasi tidak seragam
+    assert cv2.imwrite(str(path), img)
+    return img
+
+
+def test_same_file_name_in_two_label_folders(tmp_path):
+    dataset = tmp_path / "dataset"
+    normal = _write_image(dataset / "Normal" / "12.png", 40)
+    osteo = _write_image(dataset / "Osteoporosis" / "12.png", 200)
+    jobs = [(str(dataset / "Normal" / "12.png"), None), (str(dataset / "Osteoporosis" / "12.png"), None)]
+
+    archive = tmp_path / "variasi.arsip"
+    assert write_archive(jobs, str(archive), params=PARAMS) == 2 * len(PARAMS)
+
+    index = archive_index(str(archive))
+    assert len(index) == 2 * len(PARAMS)
+    sources = {str(row["source"]): str(row["label"]) for shard in shard_paths(str(archive)) for row in read_index(shard)}
+    assert sources == {"Normal/12.png": "Normal", "Osteoporosis/12.png": "Osteoporosis"}
+
+    # Variasi identitas = citra aslinya, masing-masing dari folder labelnya sendiri
+    np.testing.assert_array_equal(load_variant(str(archive), "Normal/12.png", False, 0, 1.0, index), normal)
+    np.testing.assert_array_equal(load_variant(str(archive), "Osteoporosis/12.png", False, 0, 1.0, index), osteo)